@@ -38,7 +38,7 @@ import time
 import subprocess
 import matplotlib.pyplot as plt
 from matplotlib.patches import Circle, Patch, Rectangle, Annulus, Wedge
-from matplotlib.collections import PatchCollection
+from matplotlib.collections import PatchCollection, EllipseCollection
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from pretty_print_xml import pretty_print
@@ -48,10 +48,11 @@ from BIWT_parameters.xml_defaults import xml_defaults
 from pathlib import Path
 import xml.etree.ElementTree as ET  # https://docs.python.org/2/library/xml.etree.elementtree.html
 from PyQt5 import QtCore, QtGui
-from PyQt5.QtWidgets import QApplication,QWidget,QLineEdit,QHBoxLayout,QVBoxLayout,QRadioButton,QPushButton, QLabel,QCheckBox,QComboBox,QScrollArea,QGridLayout, QFileDialog, QButtonGroup, QSplitter, QSizePolicy, QSpinBox, QCompleter
+from PyQt5.QtWidgets import QApplication,QWidget,QLineEdit,QHBoxLayout,QVBoxLayout,QRadioButton,QPushButton, QLabel,QCheckBox,QComboBox,QScrollArea,QGridLayout, QFileDialog, QButtonGroup, QSplitter, QSizePolicy, QSpinBox, QCompleter, QMessageBox
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import QStringListModel, Qt
 
+from positions_writer import write_positions, positions_from_dict
 from studio_classes import QHLine, QVLine, QCheckBox_custom, QRadioButton_custom, LegendWindow, QLineEdit_custom, ExtendedCombo
 from abc import ABC, abstractmethod, ABCMeta
 
@@ -1277,9 +1278,7 @@ class BioinformaticsWalkthroughWindow_WritePositions(BioinformaticsWalkthroughWi
     def finish_write_button_cb(self):
         self.check_for_new_celldefs()
         self.set_file_name()
-        with open(self.full_fname, 'w') as f:
-            f.write('x,y,z,type\n')
-        self.add_cell_positions_to_file()
+        self.add_cell_positions_to_file(mode='w')
 
     def finish_append_button_cb(self):
         self.check_for_new_celldefs()
@@ -1338,29 +1337,66 @@ class BioinformaticsWalkthroughWindow_WritePositions(BioinformaticsWalkthroughWi
         self.biwt.csv_file.setText(self.csv_file.text())
         self.biwt.full_fname = self.full_fname
 
-    def add_cell_positions_to_file(self):
-        with open(self.full_fname, 'a') as f:
-            if self.biwt.perform_spot_deconvolution:
-                for spot_info in self.biwt.plotted_cell_types_per_spot:
-                    spot_coords = spot_info['spot_coords']      # The center coordinate of the spot
-                    cell_types = spot_info['cell_types']        # List of cell types assigned to this spot
-                    sub_spots = spot_info['sub_spots']
-
-                    for i in range(len(cell_types)):
-                        x, y = sub_spots[i][0], sub_spots[i][1]
-                        z = spot_coords[2] if len(spot_coords) > 2 else 0
-                        cell_type = cell_types[i]
-                        f.write(f"{x},{y},{z},{cell_type}\n")
-
-            else: 
-                for cell_type in self.biwt.csv_array.keys():
-                    for pos in self.biwt.csv_array[cell_type]:
-                        f.write(f'{pos[0]},{pos[1]},{pos[2]},{cell_type}\n')
+    def add_cell_positions_to_file(self, mode='a'):
+        # mode 'w' writes the x,y,z,type header first
+        xyz, codes, names = positions_from_dict(self.biwt.csv_array)
+        write_positions(self.full_fname, xyz, codes, names, header='x,y,z,type', mode=mode)
 
     def process_window(self):
         self.biwt.full_fname = self.full_fname
         self.biwt.close_up()
 
+def apportion_cells(prob_matrix, n_per_spot):
+    """
+    Split n_per_spot cells of every spot among the cell types, for all spots at once.
+    prob_matrix is spots x types; returns the spots x types cell counts.
+
+    Each cell goes to the type with the highest priority p / sqrt((count+1)*(count+2)), the first type
+    winning ties. This is a variation on the Equal Proportions Method
+    (https://www.census.gov/topics/public-sector/congressional-apportionment/about/computing.html)
+    for computing state representation in the US House of Representatives, but starting with 0 in each
+    "state" (cell type) rather than 1, hence the denominator sqrt((n+1)*(n+2)) rather than sqrt(n*(n+1)).
+    This favors higher probability cell types more strongly at low counts, which seems desirable here.
+    """
+    prob_matrix = np.asarray(prob_matrix, dtype=float)
+    num_spots, num_types = prob_matrix.shape
+    counts = np.zeros((num_spots, num_types), dtype=np.int64)
+    if num_spots == 0 or num_types == 0:
+        return counts
+    priority = lambda p, c: p / np.sqrt((c + 1.0) * (c + 2.0))
+
+    # All cells with a priority above lam = sum(p)/n_per_spot come first in the one-at-a-time order,
+    # and there are at most n_per_spot of them (and at least n_per_spot - 2*num_types):
+    # count them per type at once, then hand out the few remaining cells one at a time.
+    total = prob_matrix.sum(axis=1)
+    positive = total > 0
+    lam = np.where(positive, total / n_per_spot, np.inf)[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(positive[:, np.newaxis], prob_matrix / lam, 0.0)
+    counts[:] = np.maximum(np.ceil(np.sqrt(ratio**2 + 0.25) - 1.5), 0)   # solves (c+1)(c+2) < ratio^2 for the # of c
+    # make it exact for the priorities as computed below
+    while True:
+        over = (counts > 0) & (priority(prob_matrix, np.maximum(counts - 1, 0)) <= lam)
+        if not over.any():
+            break
+        counts[over] -= 1
+    while True:
+        under = priority(prob_matrix, counts) > lam
+        if not under.any():
+            break
+        counts[under] += 1
+    counts[~positive, 0] = n_per_spot   # all priorities are 0: the first type gets every cell
+
+    remaining = n_per_spot - counts.sum(axis=1)
+    rows = np.flatnonzero(remaining > 0)
+    while len(rows) > 0:
+        next_type = np.argmax(priority(prob_matrix[rows], counts[rows]), axis=1)
+        counts[rows, next_type] += 1
+        remaining[rows] -= 1
+        rows = rows[remaining[rows] > 0]
+    return counts
+
+
 class BioinformaticsWalkthroughPlotWindow(QWidget):
     def __init__(self, positions_window, biwt, config_tab):
         super().__init__()
@@ -1817,71 +1853,35 @@ class BioinformaticsWalkthroughPlotWindow(QWidget):
                 selected_cell_types = {
                     ct for ct, checkbox in self.pw.checkbox_dict.items() if checkbox.isChecked()
                 }
-                self.plotted_cell_types_per_spot = []
 
                 cell_radius = np.sqrt((((9*np.pi*2494**2) / 16) ** (1./3))  / np.pi)
                 cell_coords = np.hstack((self.spatial_base_coords[:, 0:2] * [width, height] + [x0, y0], np.zeros((self.spatial_base_coords.shape[0], 1))))
-                idx_inbounds = [(cc[0] >= self.plot_xmin and cc[0] <= self.plot_xmax and cc[1] >= self.plot_ymin and cc[1] <= self.plot_ymax) for cc in cell_coords]
-                
-                for idx, pos in enumerate(cell_coords):
-                    prob_values = self.biwt.cell_prob_feature_dicts[idx]
-                    filtered_probs = {k: v for k, v in prob_values.items() if k in selected_cell_types}
-                    # priorities are proportional to the probability and...
-                    # the (inverse of the) geometric mean of (current count +1) and (current count +2)
-                    # this is a variation on the Equal Proportions Method (https://www.census.gov/topics/public-sector/congressional-apportionment/about/computing.html)
-                    # for computing state representation in the US House of Representatives
-                    # but this starts with 0 in each "state" (cell type) rather than 1 
-                    # hence the denominator cannot be sqrt(n*(n+1)) but rather sqrt((n+1)*(n+2))
-                    # this proves to favor higher probability cell types more strongly at low counts, a result that seems desirable here
-                    priorities = {k: v / np.sqrt(2) for k, v in filtered_probs.items()}
-                    spot_counts = {k: 0 for k in filtered_probs.keys()}
-                    for i in range(n_per_spot):
-                        next_key = max(priorities, key=priorities.get)
-                        spot_counts[next_key] += 1
-                        priorities[next_key] = filtered_probs[next_key] / np.sqrt((spot_counts[next_key] + 1) * (spot_counts[next_key] + 2))
-
-                    color_sequence = []
-                    cell_type_sequence = []
-                    
-                    for prob_feature, count in spot_counts.items():
-                        feature_name = prob_feature
-                        color =  self.color_by_celltype[feature_name]
-                        color_sequence.extend([color] * count)
-                        cell_type_sequence.extend([feature_name] * count)
-
-                    if len(color_sequence) == 0:
-                        # Assign default grey color to avoid crash if no cell types pass 10% threshold
-                        color_sequence = ['gray'] * n_per_spot
-                        cell_type_sequence = ['Unknown'] * n_per_spot
-                    else:
-                        while len(color_sequence) < n_per_spot:
-                            color_sequence.append(color_sequence[0]) 
-                            cell_type_sequence.append(cell_type_sequence[0])
-                    color_sequence = color_sequence[:n_per_spot]
-                    cell_type_sequence = cell_type_sequence[:n_per_spot]
-
-                    if n_per_spot == 1:
-                        ct = cell_type_sequence[0]
-                        color = color_sequence[0]
-                        coord = np.array(pos).reshape(1, 3)
-                        if ct not in self.biwt.csv_array:
-                            self.biwt.csv_array[ct] = coord
-                        else:
-                            self.biwt.csv_array[ct] = np.vstack((self.biwt.csv_array[ct], coord))
-                        self.circles(coord, s=cell_radius, color=color, edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-
-                    else:
-                        r = cell_radius * np.sqrt(n_per_spot)
-                        sub_spots = self.wedge_sample_2d(n_per_spot, pos[0], pos[1], r)                        
-                        for i, color in enumerate(color_sequence):
-                            self.circles(sub_spots[i], s=cell_radius, color=color, edgecolor='none', linewidth=0.5, alpha=self.alpha_value)
-
-
-                        self.plotted_cell_types_per_spot.append({
-                            'spot_coords': pos,
-                            'cell_types': cell_type_sequence,
-                            'sub_spots': sub_spots
-                        })
+                idx_inbounds = (cell_coords[:,0] >= self.plot_xmin) & (cell_coords[:,0] <= self.plot_xmax) & (cell_coords[:,1] >= self.plot_ymin) & (cell_coords[:,1] <= self.plot_ymax)
+
+                # cells per spot and type, for all (in bounds) spots at once, from the spots x types probabilities
+                type_columns = [k for k, ct in enumerate(self.biwt.cell_prob_types) if ct in selected_cell_types]
+                prob_matrix = self.biwt.cell_prob_matrix[idx_inbounds][:, type_columns]
+                cell_coords = cell_coords[idx_inbounds]
+                # spots with no probability for any selected cell type are skipped, rather than given to one of them
+                idx_assigned = prob_matrix.sum(axis=1) > 0
+                prob_matrix = prob_matrix[idx_assigned]
+                cell_coords = cell_coords[idx_assigned]
+                counts = apportion_cells(prob_matrix, n_per_spot)
+                self.report_skipped_spots(np.count_nonzero(~idx_inbounds), np.count_nonzero(~idx_assigned))
+
+                if n_per_spot == 1:
+                    positions = cell_coords   # one cell at each spot
+                else:
+                    positions = self.disk_sample_2d(cell_coords, n_per_spot, cell_radius * np.sqrt(n_per_spot)).reshape(-1, 3)
+                # the cells of a spot are in type order, so the sub-spots of each type are picked with one mask
+                spot_types = np.repeat(np.tile(np.arange(len(type_columns)), len(counts)), counts.ravel())
+                for k, column in enumerate(type_columns):
+                    ct = self.biwt.cell_prob_types[column]
+                    coords = positions[spot_types == k]
+                    if len(coords) == 0:
+                        continue
+                    self.biwt.csv_array[ct] = np.vstack((self.biwt.csv_array.get(ct, np.empty((0,3))), coords))
+                    self.circles(coords, s=cell_radius, color=self.color_by_celltype[ct], edgecolor='black' if n_per_spot == 1 else 'none', linewidth=0.5, alpha=self.alpha_value)
 
                 for cell_name in self.color_by_celltype:
                     if cell_name in selected_cell_types:
@@ -1952,6 +1952,23 @@ class BioinformaticsWalkthroughPlotWindow(QWidget):
         # If control passes here, then all the buttons are disabled and the plotting is done
         self.pw.continue_to_write_button.setEnabled(True)
 
+    def report_skipped_spots(self, num_outside, num_unassigned):
+        msg = []
+        if num_outside > 0:
+            msg.append(f"{num_outside} spot(s) lie outside the domain.")
+        if num_unassigned > 0:
+            msg.append(f"{num_unassigned} spot(s) have no probability for any of the selected cell types.")
+        if len(msg) == 0:
+            return
+        msg.append("No cells were placed at these spots.")
+        print("BIWT: " + " ".join(msg))
+        # not modal, so the cells are drawn behind it
+        self.skipped_spots_msg = QMessageBox(self)
+        self.skipped_spots_msg.setIcon(QMessageBox.Information)
+        self.skipped_spots_msg.setText("\n".join(msg))
+        self.skipped_spots_msg.setStandardButtons(QMessageBox.Ok)
+        self.skipped_spots_msg.show()
+
     def wedge_sample_2d(self, N, x0, y0, r1, r0=0.0, th_lim=(0,2*np.pi)):
         i_start = 0
         new_pos = np.empty((N,3))
@@ -1973,6 +1990,22 @@ class BioinformaticsWalkthroughPlotWindow(QWidget):
             i_start += xy.shape[0]
         return new_pos
 
+    def disk_sample_2d(self, centers, N, r1):
+        # N uniform positions in the disk of radius r1 around each center, within the plot bounds: (num_centers, N, 3)
+        new_pos = np.zeros((len(centers), N, 3))
+        todo = np.ones((len(centers), N), dtype=bool)
+        while todo.any():
+            ispot, icell = np.nonzero(todo)
+            d = r1*np.sqrt(np.random.uniform(size=len(ispot)))
+            th = 2*np.pi * np.random.uniform(size=len(ispot))
+            x = centers[ispot, 0] + d * np.cos(th)
+            y = centers[ispot, 1] + d * np.sin(th)
+            ok = (x>=self.plot_xmin) & (x<=self.plot_xmax) & (y>=self.plot_ymin) & (y<=self.plot_ymax)
+            new_pos[ispot[ok], icell[ok], 0] = x[ok]
+            new_pos[ispot[ok], icell[ok], 1] = y[ok]
+            todo[ispot[ok], icell[ok]] = False
+        return new_pos
+
     def circles(self, pos, s, c='b', vmin=None, vmax=None, **kwargs):
         """
         See https://gist.github.com/syrte/592a062c562cd2a98a83
@@ -2002,7 +2035,7 @@ class BioinformaticsWalkthroughPlotWindow(QWidget):
             norm, cmap, transform, etc.
         Returns
         -------
-        paths : `~matplotlib.collections.PathCollection`
+        paths : `~matplotlib.collections.EllipseCollection`
         Examples
         --------
         a = np.arange(11)
@@ -2029,12 +2062,12 @@ class BioinformaticsWalkthroughPlotWindow(QWidget):
         # You can set `facecolor` with an array for each patch,
         # while you can only set `facecolors` with a value for all.
 
-        zipped = np.broadcast(x, y, s)
-        patches = [Circle((x_, y_), s_)
-                for x_, y_, s_ in zipped]
-        collection = PatchCollection(patches, **kwargs)
+        x, y, s = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(s, dtype=float))
+        x, y, s = x.ravel(), y.ravel(), s.ravel()
+        collection = EllipseCollection(2*s, 2*s, np.zeros(len(s)), units='xy',
+                                       offsets=np.column_stack([x, y]), offset_transform=self.ax0.transData, **kwargs)
         if c is not None:
-            c = np.broadcast_to(c, zipped.shape).ravel()
+            c = np.broadcast_to(c, x.shape).ravel()
             collection.set_array(c)
             collection.set_clim(vmin, vmax)
 
@@ -3219,7 +3252,6 @@ class BioinformaticsWalkthrough(QWidget):
         self.probability_columns = []
         self.perform_spot_deconvolution = False
         self.spatial_data_found = False
-        self.plotted_cell_types_per_spot = []
         
         if BIWT_DEV_MODE:
             biwt_dev_mode(self)
@@ -3516,13 +3548,9 @@ class BioinformaticsWalkthrough(QWidget):
             self.cell_types_max = [str(x) for x in cell_type_labels]
             self.cell_types_list_max = sorted(set(self.cell_types_max))
 
-            self.cell_prob_feature_dicts = []
-            for idx in range(len(cell_type_labels)):
-                cell_dict = {
-                    prob_feature.replace("_probability", ""): self.data_columns[prob_feature][idx]
-                    for prob_feature in probability_columns
-                }
-                self.cell_prob_feature_dicts.append(cell_dict)
+            # spots x types probabilities, one column per cell type
+            self.cell_prob_types = cell_types
+            self.cell_prob_matrix = np.column_stack([np.asarray(self.data_columns[prob_feature], dtype=float) for prob_feature in probability_columns])
 
             self.edit_cell_types()
 
@@ -3579,22 +3607,21 @@ class BioinformaticsWalkthrough(QWidget):
     def continue_from_rename_check(self):  
         if self.perform_spot_deconvolution:
             renamed_mapping = self.cell_type_dict_on_rename
-            updated_dicts = []
-            cell_types_final_set = set()
-            self.spatial_data_final = np.empty((0, len(self.spatial_data[0])))  # initialize as an 0 x d array, where d is the dimension of spatial data
-            for prob_dict, spatial_data in zip(self.cell_prob_feature_dicts, self.spatial_data):
-                new_prob_dict = {}
-                for orig_ct, prob_value in prob_dict.items():
-                    if orig_ct not in renamed_mapping.keys():
-                        continue
-                    renamed_ct = renamed_mapping.get(orig_ct, orig_ct)
-                    new_prob_dict[renamed_ct] = new_prob_dict.get(renamed_ct, 0.0) + prob_value
-                    cell_types_final_set.add(renamed_ct)
-                if sum(new_prob_dict.values()) > 0:
-                    updated_dicts.append(new_prob_dict)
-                    self.spatial_data_final = np.vstack([self.spatial_data_final, spatial_data])
-            self.cell_prob_feature_dicts = updated_dicts
-            self.cell_types_final = sorted(cell_types_final_set)
+            # sum the probability columns of the types renamed to the same name (in order of first appearance), drop the deleted types,
+            # then drop the spots with no probability left
+            renamed_types = []
+            for orig_ct in self.cell_prob_types:
+                if (orig_ct in renamed_mapping.keys()) and (renamed_mapping[orig_ct] not in renamed_types):
+                    renamed_types.append(renamed_mapping[orig_ct])
+            prob_matrix = np.zeros((self.cell_prob_matrix.shape[0], len(renamed_types)))
+            for k, orig_ct in enumerate(self.cell_prob_types):
+                if orig_ct in renamed_mapping.keys():
+                    prob_matrix[:, renamed_types.index(renamed_mapping[orig_ct])] += self.cell_prob_matrix[:, k]
+            idx_keep = prob_matrix.sum(axis=1) > 0
+            self.cell_prob_types = renamed_types
+            self.cell_prob_matrix = prob_matrix[idx_keep]
+            self.spatial_data_final = np.asarray(self.spatial_data, dtype=float)[idx_keep]
+            self.cell_types_final = sorted(renamed_types)
         else:
             if self.use_spatial_data:
                 self.cell_types_final, self.spatial_data_final = zip(*[(self.cell_type_dict_on_rename[ctn], pos) for ctn, pos in zip(self.cell_types_original, self.spatial_data) if ctn in self.cell_type_dict_on_rename.keys()])
@@ -87,13 +87,20 @@ class FilterUI2DWindow(QWidget):
 
         msg = """
 This overlays edges representing cell-cell interactions on the Plot tab. Note the following:
-- If plotting with SVG, requires the SVG and full data saves to be synced.
+- If plotting with SVG, the cell IDs in the .svg snapshot are used, so its graph .txt files must be from the same time.
 - If filtering on cell types, ALL edges will still be plotted, including for filtered out cells.
+- "color by type" colors an edge between two cells of the same type by that type; other edges are gray.
         """
         self.attachments_question_label = HoverQuestion(msg)
         self.attachments_question_label.show_icon()
         glayout.addWidget(self.attachments_question_label, idx_row,3,1,1) # w, row, column, rowspan, colspan
 
+        idx_row += 1
+        self.graph_color_checkbox = QCheckBox_custom('color by type')
+        self.graph_color_checkbox.setChecked(False)
+        self.graph_color_checkbox.clicked.connect(self.graph_color_cb)
+        glayout.addWidget(self.graph_color_checkbox, idx_row,1,1,2) # w, row, column, rowspan, colspan
+
         idx_row += 1
         glayout.addWidget(QHLine(), idx_row,0,1,4) # w, row, column, rowspan, colspan
         idx_row += 1
@@ -289,6 +296,10 @@ This overlays edges representing cell-cell interactions on the Plot tab. Note th
     def graph_display_changed_cb(self):
         self.vis_tab.graph_display_type = self.graph_display_combobox.currentText()
         self.vis_tab.update_plots()
+
+    def graph_color_cb(self):
+        self.vis_tab.graph_color_by_type = self.graph_color_checkbox.isChecked()
+        self.vis_tab.update_plots()
     
 
     def contour_mesh_cb(self):
@@ -0,0 +1,332 @@
+"""
+frame_cache.py - bounded LRU cache of decoded output frames for the Plot tab.
+
+Frames are decoded into ready-to-draw numpy arrays (cell positions, radii, colors, substrate slices).
+While animating, a worker thread decodes the frames ahead of the playhead so the Play timer only
+has to do the matplotlib updates.
+
+Rf. Credits.md
+"""
+
+import functools
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas
+import scipy.io
+import matplotlib.colors as mplc
+
+from pyMCDS import pyMCDS, graphfile_csr_parser, graph_edge_parser
+
+
+def file_stamp(fname):
+    # (size, mtime) identifies the version of a file; None if it does not exist (yet)
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def value_nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pandas.DataFrame, pandas.Series)):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, dict):
+        return sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(v) for v in value)
+    return 64
+
+
+class FrameCache():
+    def __init__(self, max_mbytes=512, num_workers=1):
+        self.max_bytes = int(max_mbytes * 1024 * 1024)
+        self.num_workers = num_workers
+        self.entries = OrderedDict()   # key -> (stamp, value, nbytes), least recently used first
+        self.total_bytes = 0
+        self.pending = {}              # key -> Future of a prefetch in flight
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def set_max_mbytes(self, max_mbytes):
+        with self.lock:
+            self.max_bytes = int(max_mbytes * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get(self, key, stamp_file, loader, *args):
+        # return the decoded frame, loading it on the calling thread if it is neither cached nor being prefetched
+        stamp = file_stamp(stamp_file)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                return entry[1]
+            future = self.pending.get(key)
+
+        if future is not None:
+            try:
+                future.result()   # wait for the worker rather than decoding the same frame twice
+            except Exception:
+                pass
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry and entry[0] == stamp:
+                    self.entries.move_to_end(key)
+                    return entry[1]
+
+        value = loader(*args)
+        self.put(key, stamp, value)
+        return value
+
+    def has(self, key, stamp_file):
+        # True if get() would return without loading
+        stamp = file_stamp(stamp_file)
+        with self.lock:
+            entry = self.entries.get(key)
+            return bool(entry) and entry[0] == stamp
+
+    def get_all(self, jobs):
+        # load (key, stamp_file, loader, args) jobs, e.g. all that one frame needs, on the calling (worker) thread.
+        # A failure is left for the drawing code's own get() to report.
+        for key, stamp_file, loader, args in jobs:
+            try:
+                self.get(key, stamp_file, loader, *args)
+            except Exception as e:
+                print(f"frame_cache.py: loading {key} failed: {e}")
+
+    def prefetch(self, key, stamp_file, loader, *args):
+        # queue a frame for decoding on the worker thread; no-op if it is cached, queued or not written yet
+        stamp = file_stamp(stamp_file)
+        if stamp is None:
+            return
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry and entry[0] == stamp) or (key in self.pending):
+                return
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="frame_cache")
+            self.pending[key] = self.executor.submit(self._prefetch_job, key, stamp, loader, *args)
+
+    def _prefetch_job(self, key, stamp, loader, *args):
+        try:
+            value = loader(*args)
+            self.put(key, stamp, value)
+        except Exception as e:
+            # leave it to the synchronous get() to report the problem, if this frame is ever drawn
+            print(f"frame_cache.py: prefetch of {key} failed: {e}")
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def put(self, key, stamp, value):
+        nbytes = value_nbytes(value)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.total_bytes -= old[2]
+            if nbytes > self.max_bytes:
+                return
+            self.entries[key] = (stamp, value, nbytes)
+            self.total_bytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self.entries and (self.total_bytes > self.max_bytes):
+            key, (stamp, value, nbytes) = self.entries.popitem(last=False)
+            self.total_bytes -= nbytes
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+#-----------------------------------------------------
+# Loaders: run on the worker thread, so they must not touch any Qt widget or plot state.
+
+# one token per cell group (its ID and the attributes after the id) or circle (all its attributes), in document order
+svg_tag_re = re.compile(rb'<g\s+id="cell(\d+)"([^>]*)>|<circle\b([^>]*)>')
+svg_attr_re = {key: re.compile(rb' ' + key.encode() + rb'="([^"]*)"') for key in ['cx', 'cy', 'r', 'fill', 'type']}
+svg_title_re = re.compile(rb'>\s*(Current time[^<]*)<')
+
+
+@functools.lru_cache(maxsize=1024)
+def svg_fill_to_rgba(s):
+    if( s[0:4] == "rgba" ):
+        rgba_float = list(map(float,s[5:-1].split(",")))
+        alpha = rgba_float[3]
+        alpha *= 2.0; # cell_alpha_toggle
+        if( alpha > 1.0 ):
+            alpha = 1.0
+        return (np.round(rgba_float[0])/255., np.round(rgba_float[1])/255., np.round(rgba_float[2])/255., alpha)
+    elif (s[0:3] == "rgb"):  # if an rgb string, e.g. "rgb(175,175,80)"
+        rgb = list(map(int, s[4:-1].split(",")))
+        return (rgb[0]/255., rgb[1]/255., rgb[2]/255., 1.0)
+    else:     # otherwise, must be a color name
+        rgb_tuple = mplc.to_rgb(mplc.cnames[s])  # a tuple
+        return (rgb_tuple[0], rgb_tuple[1], rgb_tuple[2], 1.0)
+
+
+def svg_title(text):
+    svals = text.split()
+    # remove the ".00" on minutes
+    return svals[2] + " days, " + svals[4] + " hrs, " + svals[7][:-3] + " mins"
+
+
+def load_svg_frame(full_fname):
+    # one row per <circle>: SVG coordinates, radius, RGBA, the index of its cell and whether it is the nucleus.
+    # Regex passes over the raw bytes, so there is no per-circle Python object other than the matched strings.
+    with open(full_fname, 'rb') as f:
+        buf = f.read()
+
+    title_str = ""
+    m = svg_title_re.search(buf)
+    if m:
+        title_str = svg_title(m.group(1).decode())
+
+    istart = buf.find(b'<g id="cells"')
+    if istart < 0:
+        return load_svg_frame_etree(full_fname)
+    tokens = svg_tag_re.findall(buf, istart)
+    group_ids = [tok[0] for tok in tokens]      # b'' for a circle
+    group_attrs = [tok[1] for tok in tokens]
+    circle_attrs = [tok[2] for tok in tokens]   # b'' for a cell group
+
+    is_cell = np.array([cell_id != b'' for cell_id in group_ids], dtype=bool)
+    itok = np.arange(len(tokens))
+    last_cell = np.maximum.accumulate(np.where(is_cell, itok, -1))   # the <g> token each circle belongs to
+    is_circle = ~is_cell & (last_cell >= 0)   # circles ahead of the first cell group are not cells
+    ncircle = int(is_circle.sum())
+
+    blob = b''.join(attrs for attrs, keep in zip(circle_attrs, is_circle) if keep)
+    values = {key: svg_attr_re[key].findall(blob) for key in ['cx', 'cy', 'r', 'fill']}
+    if any(len(v) != ncircle for v in values.values()):
+        return load_svg_frame_etree(full_fname)   # missing attributes or unusual whitespace
+
+    # decode each distinct color string, and cell type, only once
+    fills, ifill = np.unique(np.array(values['fill'], dtype=bytes), return_inverse=True)
+    color_table = np.array([svg_fill_to_rgba(fill.decode()) for fill in fills], dtype=float).reshape(-1, 4)
+    group_attrs = [attrs for attrs, cell in zip(group_attrs, is_cell) if cell]
+    types, itype = np.unique(np.array(group_attrs + [b''], dtype=bytes), return_inverse=True)
+    type_table = []
+    for attrs in types:
+        m = svg_attr_re['type'].search(attrs)
+        type_table.append(m.group(1).decode() if m else '')
+    type_table = np.array(type_table, dtype=object)
+
+    return {
+        'title_str': title_str,
+        'x': np.array(list(map(float, values['cx'])), dtype=float),
+        'y': np.array(list(map(float, values['cy'])), dtype=float),
+        'r': np.array(list(map(float, values['r'])), dtype=float),
+        'rgba': color_table[ifill.ravel()].reshape(-1, 4),
+        'cell_idx': (np.cumsum(is_cell) - 1)[is_circle].astype(np.int32),
+        'nucleus': (itok - last_cell)[is_circle] > 1,
+        'cell_type': type_table[itype.ravel()[:-1]],
+        'cell_id': np.array([int(cell_id) for cell_id in group_ids if cell_id], dtype=np.int64),
+    }
+
+
+def load_svg_frame_etree(full_fname):
+    # ElementTree fallback for snapshots the regex decoder does not recognize
+    tree = ET.parse(full_fname)
+    root = tree.getroot()
+
+    title_str = ""
+    tissue_parent = None
+    for child in root:
+        if child.text and "Current time" in child.text:
+            title_str += svg_title(child.text)
+        if ('id' in child.attrib.keys()):
+            tissue_parent = child
+            break
+
+    cells_parent = []
+    if tissue_parent is not None:
+        for child in tissue_parent:
+            if (child.attrib['id'] == 'cells'):
+                cells_parent = child
+                break
+
+    xlist = []
+    ylist = []
+    rlist = []
+    rgba_list = []
+    cell_idx = []
+    nucleus = []
+    cell_types = []
+    cell_ids = []
+    for icell, child in enumerate(cells_parent):
+        cell_types.append(child.attrib.get('type', ''))
+        try:
+            cell_ids.append(int(child.attrib['id'][4:]))   # "cell<ID>"
+        except (KeyError, ValueError):
+            cell_ids.append(-1)
+        icircle = 0
+        for circle in child:  # two circles in each child: outer + nucleus
+            try:
+                xval = float(circle.attrib['cx'])
+            except:
+                continue
+            xlist.append(xval)
+            ylist.append(float(circle.attrib['cy']))
+            rlist.append(float(circle.attrib['r']))
+            rgba_list.append(svg_fill_to_rgba(circle.attrib['fill']))
+            cell_idx.append(icell)
+            nucleus.append(icircle > 0)
+            icircle += 1
+
+    return {
+        'title_str': title_str,
+        'x': np.array(xlist, dtype=float),
+        'y': np.array(ylist, dtype=float),
+        'r': np.array(rlist, dtype=float),
+        'rgba': np.array(rgba_list, dtype=float).reshape(-1, 4),
+        'cell_idx': np.array(cell_idx, dtype=np.int32),
+        'nucleus': np.array(nucleus, dtype=bool),
+        'cell_type': np.array(cell_types, dtype=object),
+        'cell_id': np.array(cell_ids, dtype=np.int64),
+    }
+
+
+def load_cells_frame(xml_file_root, output_dir, columns=None):
+    mcds = pyMCDS(xml_file_root, output_dir, microenv=False, graph=False, verbose=False, columns=columns)
+    return {
+        'time': mcds.get_time(),
+        'df': mcds.get_cell_df(),
+    }
+
+
+def load_graph_edges(graph_file):
+    # (cell ID, cell ID) rows, each undirected edge once
+    return graph_edge_parser(*graphfile_csr_parser(graph_file), undirected=True)
+
+
+def load_substrate_frame(xml_file, mat_file, field_index, numx, numy):
+    tree = ET.parse(xml_file)
+    root = tree.getroot()
+    mins = float(root.find(".//current_time").text)
+
+    info_dict = {}
+    scipy.io.loadmat(mat_file, info_dict)
+    M = info_dict['multiscale_microenvironment']
+
+    # keep only the slice that gets drawn, not the whole .mat block
+    return {
+        'mins': mins,
+        'xgrid': np.ascontiguousarray(M[0, :].reshape(numy, numx)),
+        'ygrid': np.ascontiguousarray(M[1, :].reshape(numy, numx)),
+        'zvals': np.ascontiguousarray(M[field_index, :].reshape(numy, numx)),
+    }
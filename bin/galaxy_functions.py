@@ -3,10 +3,13 @@ import glob
 import zipfile
 from PyQt5.QtWidgets import QMessageBox
 
+from output_archiver import start_archive_job
+
 try:
     from galaxy_ie_helpers import put
 except:
-    pass
+    def put(fname):   # reported by the archive job, like any other put() failure
+        raise RuntimeError("galaxy_ie_helpers is not available")
 
 #-----------------------------------------------------------------
 # Helper functions for Galaxy
@@ -86,26 +89,9 @@ def download_zipped_csv_galaxy(self):
         return
     fname = "all_csv.zip"
     print("download_zipped_csv_galaxy():  cwd= ",os.getcwd())
-    try:
-        # file_str = "/opt/pcstudio/output/*.csv"
-        file_str = "output/*.csv"
-        file_str = os.path.join(os.getcwd(), file_str)
-        print('-------- download_zipped_csv_galaxy(): zip up all ',file_str)
-        # fname = "/opt/pcstudio/output/all_csv.zip"
-        with zipfile.ZipFile(fname, 'w') as myzip:
-            # csv_files = glob.glob(file_str)
-            # print("csv_files = ",csv_files)
-            for f in glob.glob(file_str):
-                myzip.write(f, os.path.basename(f))   # 2nd arg avoids full filename 
-    except:
-        self.show_error_message(f"Error zipping all output/*.csv")
-        return
-
-    try:
-        put(fname)
-        # print("dummy put...")
-    except:
-        self.show_error_message(f"Error: put({fname})")
+    print('-------- download_zipped_csv_galaxy(): zip up all output/*.csv')
+    # zip (only what is new since the last export) and put() in a worker thread, so the GUI stays responsive
+    start_archive_job(self, fname, ["*.csv"], root_dir=os.path.join(os.getcwd(), "output"), post=put)
 
 def download_all_zipped_galaxy(self):
     # fname = "/opt/pcstudio/all_output.zip"
@@ -119,23 +105,5 @@ def download_all_zipped_galaxy(self):
 
     fname = "all_output.zip"
     print("download_all_zipped_galaxy():  cwd= ",os.getcwd())
-    try:
-        # file_str = "/opt/pcstudio/output/*.csv"
-        file_str = "output/*"
-        file_str = os.path.join(os.getcwd(), file_str)
-        print('-------- download_all_zipped_galaxy(): zip up all ',file_str)
-        # fname = "/opt/pcstudio/output/all_csv.zip"
-        with zipfile.ZipFile(fname, 'w') as myzip:
-            # all_files = glob.glob(file_str)
-            # print("all_files = ",all_files)
-            for f in glob.glob(file_str):
-                myzip.write(f, os.path.basename(f))   # 2nd arg avoids full filename 
-    except:
-        self.show_error_message(f"Error zipping all output/*")
-        return
-
-    try:
-        put(fname)
-        # print("dummy put")
-    except:
-        self.show_error_message(f"Error: put({fname})")
+    print('-------- download_all_zipped_galaxy(): zip up all output/*')
+    start_archive_job(self, fname, ["*"], root_dir=os.path.join(os.getcwd(), "output"), post=put)
@@ -13,12 +13,13 @@ import os
 import logging
 import time
 import csv
+import gzip
 # import xml.etree.ElementTree as ET  # https://docs.python.org/2/library/xml.etree.elementtree.html
 from pathlib import Path
 
 from matplotlib.colors import BoundaryNorm
 from matplotlib.ticker import MaxNLocator
-from matplotlib.collections import LineCollection
+from matplotlib.collections import LineCollection, EllipseCollection
 from matplotlib.patches import Circle
 from matplotlib.collections import PatchCollection
 import matplotlib.colors as mplc
@@ -34,9 +35,11 @@ from PyQt5.QtGui import QRegExpValidator
 from studio_classes import QHLine, DoubleValidatorWidgetBounded, HoverQuestion, QLineEdit_custom, QCheckBox_custom, DoubleValidatorOpenInterval, StudioTab
 
 from studio_functions import style_sheet_template
-from biwt_tab import BioinformaticsWalkthrough
+from positions_writer import write_positions, read_sidecar, sidecar_file
+from lazy_tab import LazyTab
 
 import numpy as np
+import pandas as pd
 import matplotlib
 matplotlib.use('Qt5Agg')
 import matplotlib.pyplot as plt
@@ -44,6 +47,95 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 
+class CellChunks():
+    """
+    Cells placed on the ICs tab: (x,y,z,cell_type_index) rows plus radii, kept as one chunk per
+    Plot (or click) action. Adding is O(chunk), Undo just drops the last chunk, and the
+    concatenated array is only built when asked for.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.chunks = []
+        self.radii_chunks = []
+        self.cached = None
+
+    def append(self, xyzt, radii):
+        self.chunks.append(xyzt)
+        self.radii_chunks.append(radii)
+        self.cached = None
+
+    def pop(self):
+        # returns the # of cells removed, or None if there is nothing to undo
+        if not self.chunks:
+            return None
+        self.radii_chunks.pop()
+        self.cached = None
+        return len(self.chunks.pop())
+
+    def __len__(self):
+        return sum(len(c) for c in self.chunks)
+
+    def arrays(self):
+        if self.cached is None:
+            if self.chunks:
+                self.cached = (np.concatenate(self.chunks), np.concatenate(self.radii_chunks))
+            else:
+                self.cached = (np.empty((0,4)), np.empty(0))
+        return self.cached
+
+
+def parse_floats(col):
+    # float values of a str column, nan where invalid; exact, unlike pd.to_numeric, which can be an ulp off
+    values = pd.to_numeric(col, errors='coerce')
+    valid = values.notna().values
+    values = values.values.astype(float)
+    values[valid] = col[valid].astype(float).values
+    return values
+
+
+def read_cells_csv(fname, cell_types_l):
+    """
+    Parse a cells .csv in one pass: v2 (header row starting with x/X; x,y,z,type name[,extra columns])
+    or v1 (no header; x,y,z,type index). Returns (xyzt, errors): an (n,4) float array
+    of the valid rows and a list of "line N: ..." strings for the skipped ones.
+    """
+    side = read_sidecar(fname)
+    if side is not None:
+        # the binary copy written along with the .csv (rows are lines 2,...)
+        xyz, cell_names = side
+        type_index = pd.Series(cell_names).map({name: k for k, name in enumerate(cell_types_l)}).values.astype(float)
+        bad_type = np.isnan(type_index)
+        errors = [f"line {k+2}: invalid cell type '{name}'" for k, name in zip(np.flatnonzero(bad_type), cell_names[bad_type])]
+        return np.column_stack([xyz[~bad_type], type_index[~bad_type]]), errors
+
+    with (gzip.open(fname, 'rt') if fname.endswith('.gz') else open(fname, newline='')) as f:
+        first = f.readline()
+    v2 = first.strip().split(',')[0].strip().lower() == 'x'
+    df = pd.read_csv(fname, header=0 if v2 else None, usecols=range(4), dtype=str, skipinitialspace=True, skip_blank_lines=False)
+    lines = df.index.values + (2 if v2 else 1)   # file line numbers, for the error report
+    blank = df.isna().all(axis=1).values
+    df, lines = df[~blank], lines[~blank]
+
+    xyz = np.column_stack([parse_floats(df.iloc[:, k]) for k in range(3)])
+    type_col = df.iloc[:, 3].fillna('').str.strip()
+    if v2:
+        type_index = type_col.map({name: k for k, name in enumerate(cell_types_l)}).values.astype(float)
+    else:
+        type_index = np.array(pd.to_numeric(type_col, errors='coerce'), dtype=float)
+        type_index[(type_index < 0) | (type_index >= len(cell_types_l)) | (type_index != np.round(type_index))] = np.nan
+
+    bad_xyz = np.isnan(xyz).any(axis=1)
+    bad_type = np.isnan(type_index) & ~bad_xyz
+    errors = [f"line {line}: invalid x,y,z" for line in lines[bad_xyz]]
+    errors += [f"line {line}: invalid cell type '{name}'" for line, name in zip(lines[bad_type], type_col.values[bad_type])]
+    errors.sort(key=lambda e: int(e.split(':')[0][5:]))
+
+    good = ~(bad_xyz | bad_type)
+    return np.column_stack([xyz[good], type_index[good]]), errors
+
+
 class ICs(StudioTab):
     def __init__(self, xml_creator):
         super().__init__(xml_creator)
@@ -66,9 +158,7 @@ class ICs(StudioTab):
         self.color_by_celltype = ['gray','red','yellow','green','blue','magenta','orange','lime','cyan','hotpink','peachpuff','darkseagreen','lightskyblue']
         self.alpha_value = 1.0
 
-        self.csv_array = np.empty([1,4])  # default floats (x,y,z,cell_type_index)
-        self.csv_array = np.delete(self.csv_array,0,0)
-        # print("--------------- csv_array= ",self.csv_array)
+        self.cells = CellChunks()  # self.csv_array: default floats (x,y,z,cell_type_index)
 
         self.plot_xmin = -500
         self.plot_xmax = 500
@@ -89,8 +179,6 @@ class ICs(StudioTab):
 
         self.show_plot_range = False
 
-        self.numcells_l = []    # list containing # of cells per "Plot" action
-        self.cell_radii = []   # master list for *all* cells' (radii) plotted in ICs
 
         self.x0_value = 0.
         self.y0_value = 0.
@@ -175,8 +263,9 @@ class ICs(StudioTab):
         self.tab_widget = QTabWidget()
         self.base_tab_id = self.tab_widget.addTab(self.create_base_ics_tab(),"Base")
         if self.xml_creator.biwt_flag:
-            self.xml_creator.biwt_tab = BioinformaticsWalkthrough(self.xml_creator.config_tab, self.xml_creator.celldef_tab, self, self.xml_creator)
-            self.tab_widget.addTab(self.xml_creator.biwt_tab,"BIWT")
+            # the walkthrough (and anndata/rpy2) is imported and built when its tab is first shown
+            self.biwt_lazy_tab = LazyTab(self.tab_widget, "BIWT", "biwt_tab", self.build_biwt_tab)
+            self.tab_widget.addTab(self.biwt_lazy_tab,"BIWT")
 
         self.layout = QVBoxLayout(self)
         self.layout.addWidget(self.tab_widget)
@@ -536,6 +625,11 @@ class ICs(StudioTab):
         self.use_names.setChecked(True)
         hbox.addWidget(self.use_names)
 
+        self.save_sidecar = QCheckBox_custom("+ binary copy (.npz)")
+        self.save_sidecar.setChecked(False)
+        self.save_sidecar.setToolTip("also save the cells to <file>.npz, which Import reads much faster than the .csv")
+        hbox.addWidget(self.save_sidecar)
+
         hbox.addWidget(QLabel(''))
 
         # self.zeq0 = QCheckBox_custom("z=0")
@@ -799,6 +893,16 @@ class ICs(StudioTab):
 
         return splitter
 
+    @property
+    def csv_array(self):
+        # all cells placed so far, as one (N,4) array of (x,y,z,cell_type_index)
+        return self.cells.arrays()[0]
+
+    @property
+    def cell_radii(self):
+        # master array for *all* cells' (radii) plotted in ICs
+        return self.cells.arrays()[1]
+
     def fill_celltype_combobox(self):
         logging.debug(f'ics_tab.py: fill_celltype_combobox(): {self.xml_creator.celldef_tab.celltypes_list}')
         for cdef in self.xml_creator.celldef_tab.celltypes_list:
@@ -1090,10 +1194,7 @@ class ICs(StudioTab):
         self.celltype_combobox.clear()
         self.fill_celltype_combobox()
         self.fill_substrate_combobox()
-        self.csv_array = np.empty([1,4])
-        self.csv_array = np.delete(self.csv_array,0,0)
-        self.numcells_l = []
-        self.cell_radii = []
+        self.cells.clear()
 
         self.plot_xmin = float(self.xml_creator.config_tab.xmin.text())
         self.plot_xmax = float(self.xml_creator.config_tab.xmax.text())
@@ -1128,11 +1229,8 @@ class ICs(StudioTab):
                 cell_type_index = self.celltype_combobox.currentIndex()
                 xlist.append(xval)
                 ylist.append(yval)
-                self.csv_array = np.append(self.csv_array,[[xval,yval,zval, cell_type_index]],axis=0)
+                self.cells.append(np.array([[xval,yval,zval, cell_type_index]]), np.array([self.cell_radius]))
                 rlist.append(rval)
-                self.cell_radii.append(self.cell_radius)
-
-                self.numcells_l.append(1)
 
                 xvals = np.array(xlist)
                 yvals = np.array(ylist)
@@ -1335,7 +1433,7 @@ class ICs(StudioTab):
             norm, cmap, transform, etc.
         Returns
         -------
-        paths : `~matplotlib.collections.PathCollection`
+        paths : `~matplotlib.collections.EllipseCollection`
         Examples
         --------
         a = np.arange(11)
@@ -1362,12 +1460,12 @@ class ICs(StudioTab):
         # You can set `facecolor` with an array for each patch,
         # while you can only set `facecolors` with a value for all.
 
-        zipped = np.broadcast(x, y, s)
-        patches = [Circle((x_, y_), s_)
-                for x_, y_, s_ in zipped]
-        collection = PatchCollection(patches, **kwargs)
+        x, y, s = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(s, dtype=float))
+        x, y, s = x.ravel(), y.ravel(), s.ravel()
+        collection = EllipseCollection(2*s, 2*s, np.zeros(len(s)), units='xy',
+                                       offsets=np.column_stack([x, y]), offset_transform=self.ax0.transData, **kwargs)
         if c is not None:
-            c = np.broadcast_to(c, zipped.shape).ravel()
+            c = np.broadcast_to(c, x.shape).ravel()
             collection.set_array(c)
             collection.set_clim(vmin, vmax)
 
@@ -1451,33 +1549,26 @@ class ICs(StudioTab):
     def undo_cb(self):
         # print("----- undo_cb(): self.numcells_l = ",self.numcells_l)
         # nlast = self.numcells_l[-1]
-        try:
-            nlast = self.numcells_l.pop()
-        except:
-            print("Error self.numcells_l.pop()")
+        # drop the cells of the last Plot action (no copy of the remaining ones)
+        nlast = self.cells.pop()
+        if nlast is None:
+            print("Error self.cells.pop()")
             return
-        ntotal = len(self.csv_array)
         
         self.reset_plot_range()
         # erase everything, redraw below
         self.ax0.cla()
 
-        self.csv_array = self.csv_array[0:ntotal-nlast, :]
-        self.cell_radii = self.cell_radii[0:ntotal-nlast]
         # print("---after:")
         # print("csv_array=",self.csv_array)
         # print("csv_array.shape=",self.csv_array.shape)
         xvals = self.csv_array[:, 0]
         yvals = self.csv_array[:, 1]
         zvals = self.csv_array[:, 2]
-        cell_colors = []
-
         # rvals = 8
         rvals = self.cell_radii
 
-        for idx in range(len(xvals)):
-            cell_type = int(self.csv_array[idx,3])
-            cell_colors.append(self.color_by_celltype[cell_type])
+        cell_colors = [self.color_by_celltype[cell_type] for cell_type in self.csv_array[:, 3].astype(int)]
         # print(cell_colors)
 
         if (self.cells_edge_checked_flag):
@@ -1500,117 +1591,24 @@ class ICs(StudioTab):
         self.canvas.draw()
 
     #----------------------------------
-    def hex_pts_box(self):
-        xlist = deque()
-        ylist = deque()
-        rlist = deque()
-        rgba_list = deque()
-
-        rval = self.cell_radius
-
-        colors = np.empty((0,4))
-        count = 0
-        # zval = 0.0
-        cell_type_index = self.celltype_combobox.currentIndex()
-        
-        ncells = int(self.num_cells.text())
-        # print("self.r1_value= ", self.r1_value)
-
-        x_min = -self.r1_value
-        x_max =  self.r1_value
-        y_min = -self.r2_value
-        y_max =  self.r2_value
-        y_idx = -1
-        # hex packing constants
-        x_spacing = self.cell_radius * 2 * self.spacing
-        y_spacing = self.cell_radius * 1.7320508 * self.spacing  # np.sqrt(3) = 1.7320508 
-
-        # cells_x = np.array([])
-        # cells_y = np.array([])
-
-        # cells_x2 = np.array([])
-        # cells_y2 = np.array([])
-
-        y_idx = 0
-        z_idx = 0
-
-        if self.zeq0.isChecked():  # 2D
-            zval = 0.0
-            for yval in np.arange(y_min,y_max, y_spacing):
-                y_idx += 1
-                for xval in np.arange(x_min,x_max, x_spacing):
-                    # xval_offset = xval + (y_idx%2) * self.cell_radius
-                    xval_offset = self.x0_value + xval + (y_idx%2) * self.cell_radius
-                    yval_offset = yval + self.y0_value
-
-                    if xval_offset < self.plot_xmin or xval_offset > self.plot_xmax \
-                        or yval_offset < self.plot_ymin or yval_offset > self.plot_ymax:
-                        continue
-                    else:
-                        xlist.append(xval_offset)
-                        ylist.append(yval_offset)
-                        # self.csv_array = np.append(self.csv_array,[[xval,yval,zval, cell_type_index]],axis=0)
-                        self.csv_array = np.append(self.csv_array,[[xval_offset,yval_offset, zval, cell_type_index]],axis=0)
-                        rlist.append(rval)
-                        self.cell_radii.append(self.cell_radius)
-                        count+=1
-        else:   # 3D
-
-            # for z in np.arange(z_min, z_max, z_spacing):
-            #     zc += 1
-            #     z_xoffset = (zc % 2) * cell_radius
-            #     z_yoffset = (zc % 2) * eq_tri_yctr   # 0.5773502691896256
-            #     zsq = z * z
-            #     term3 = (z - z0_e) * (z - z0_e)
-            #     # print("z_xoffset=",z_xoffset)
-            #     # print("z_yoffset=",z_yoffset)
-            #     for y in np.arange(y_min, y_max, y_spacing):
-            #         yc += 1
-            #         y2 = y + z_yoffset 
-            #         ysq = y2 * y2
-            #         term2 = (y2 - y0_e) * (y2 - y0_e)
-            #         # print('--------')
-            #         for x in np.arange(x_min, x_max, x_spacing):
-            #             x2 = x + (yc%2) * self.cell_radius + z_xoffset
-            #             xsq = x2 * x2
-            #             term1 = (x2 - x0_e) * (x2 - x0_e)
-            #             # print(x2,y2,z)
-            #             if ( (z<0.0) and (xsq + ysq + zsq) < sphere_radius2):  # assume centered about origin
-            #                 xyz = np.append(xyz, np.array([[x2,y2,z]]), axis=0)
-            #                 # val = (xsq + ysq)/a2 + zsq/c2
-            #                 val = (term1 + term2)/a2 + term3/c2
-            #                 # print(val)
-
-#------
-            for yval in np.arange(y_min,y_max, y_spacing):
-                y_idx += 1
-                for xval in np.arange(x_min,x_max, x_spacing):
-                    # xval_offset = xval + (y_idx%2) * self.cell_radius
-                    xval_offset = self.x0_value + xval + (y_idx%2) * self.cell_radius
-
-                    xlist.append(xval_offset)
-                    yval_offset = yval + self.y0_value
-                    ylist.append(yval_offset)
-                    # self.csv_array = np.append(self.csv_array,[[xval,yval,zval, cell_type_index]],axis=0)
-                    self.csv_array = np.append(self.csv_array,[[xval_offset,yval_offset, zval, cell_type_index]],axis=0)
-                    rlist.append(rval)
-                    self.cell_radii.append(self.cell_radius)
-                    count+=1
-
-        self.numcells_l.append(count)
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        # rgbas = np.array(rgba_list)
+    def add_cells(self, xvals, yvals, zvals, cell_type_index):
+        # store the cells of one Plot action as one chunk (so Undo can drop it) and draw them
+        ncells = len(xvals)
+        xyzt = np.empty((ncells, 4))
+        xyzt[:, 0] = xvals
+        xyzt[:, 1] = yvals
+        xyzt[:, 2] = zvals
+        xyzt[:, 3] = cell_type_index
+        rvals = np.full(ncells, self.cell_radius)
+        self.cells.append(xyzt, rvals)
 
         if (self.cells_edge_checked_flag):
             try:
-                self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
+                self.circles(xyzt[:, 0],xyzt[:, 1], s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
             except (ValueError):
                 pass
         else:
-            self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
+            self.circles(xyzt[:, 0],xyzt[:, 1], s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
 
         self.ax0.set_aspect(1.0)
 
@@ -1621,329 +1619,125 @@ class ICs(StudioTab):
         self.canvas.update()
         self.canvas.draw()
 
+    def in_plot_range(self, xvals, yvals):
+        return (xvals >= self.plot_xmin) & (xvals <= self.plot_xmax) & (yvals >= self.plot_ymin) & (yvals <= self.plot_ymax)
+
+    def hex_lattice(self, x_min, x_max, y_min, y_max, x_spacing, y_spacing):
+        # whole hex lattice at once: every other row is shifted by one cell radius
+        yvals = np.arange(y_min,y_max, y_spacing)
+        xvals = np.arange(x_min,x_max, x_spacing)
+        y_idx = np.arange(1, len(yvals)+1)
+        xgrid = xvals[np.newaxis, :] + ((y_idx%2) * self.cell_radius)[:, np.newaxis]
+        ygrid = np.broadcast_to(yvals[:, np.newaxis], xgrid.shape)
+        return xgrid.ravel(), ygrid.ravel()
+
     #----------------------------------
-    def hex_pts_annulus(self):
-        xlist = deque()
-        ylist = deque()
-        rlist = deque()
-        rgba_list = deque()
+    def hex_pts_box(self):
+        cell_type_index = self.celltype_combobox.currentIndex()
 
-        rval = self.cell_radius
+        x_min = -self.r1_value
+        x_max =  self.r1_value
+        y_min = -self.r2_value
+        y_max =  self.r2_value
+        # hex packing constants
+        x_spacing = self.cell_radius * 2 * self.spacing
+        y_spacing = self.cell_radius * 1.7320508 * self.spacing  # np.sqrt(3) = 1.7320508 
 
-        colors = np.empty((0,4))
-        count = 0
-        zval = 0.0
+        xvals, yvals = self.hex_lattice(x_min, x_max, y_min, y_max, x_spacing, y_spacing)
+        xvals = xvals + self.x0_value
+        yvals = yvals + self.y0_value
+
+        if self.zeq0.isChecked():  # 2D
+            zval = 0.0
+            keep = self.in_plot_range(xvals, yvals)
+            xvals = xvals[keep]
+            yvals = yvals[keep]
+        else:   # 3D: a single (unclipped) layer at z0
+            zval = self.z0_value
+
+        self.add_cells(xvals, yvals, zval, cell_type_index)
+
+    #----------------------------------
+    def hex_pts_annulus(self):
         cell_type_index = self.celltype_combobox.currentIndex()
-        ncells = int(self.num_cells.text())
-        # print("self.r1_value= ", self.r1_value)
 
         x_min = -self.r2_value
         x_max =  self.r2_value
         y_min = -self.r2_value
         y_max =  self.r2_value
-        y_idx = -1
         # hex packing constants
         x_spacing = self.cell_radius * 2
         x_spacing *= self.spacing
         y_spacing = self.cell_radius * np.sqrt(3)
         y_spacing *= self.spacing
 
-        xctr = 0.0
-        yctr = 0.0
-
-        y_idx = 0
-        for yval in np.arange(y_min,y_max, y_spacing):
-            y_idx += 1
-            for xval in np.arange(x_min,x_max, x_spacing):
-                xval_offset = xval + (y_idx%2) * self.cell_radius
-
-                xdist = xval_offset - xctr
-                ydist = yval - yctr
-                dist = np.sqrt(xdist*xdist + ydist*ydist)
-                if (dist >= self.r1_value) and (dist <= self.r2_value):
-                    xval_offset += self.x0_value
-                    yval_offset = yval + self.y0_value
-
-                    if xval_offset < self.plot_xmin or xval_offset > self.plot_xmax \
-                        or yval_offset < self.plot_ymin or yval_offset > self.plot_ymax:
-                        continue
-                    else:
-                        xlist.append(xval_offset)
-                        ylist.append(yval_offset)
-                        self.csv_array = np.append(self.csv_array,[[xval_offset,yval_offset,zval, cell_type_index]],axis=0)
-                        rlist.append(rval)
-                        self.cell_radii.append(self.cell_radius)
-                        count+=1
-
-        self.numcells_l.append(count)
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        # rgbas = np.array(rgba_list)
-
-        if (self.cells_edge_checked_flag):
-            try:
-                self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-            except (ValueError):
-                pass
-        else:
-            self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
-
-        self.ax0.set_aspect(1.0)
+        xvals, yvals = self.hex_lattice(x_min, x_max, y_min, y_max, x_spacing, y_spacing)
+        dist = np.sqrt(xvals*xvals + yvals*yvals)
+        xvals = xvals + self.x0_value
+        yvals = yvals + self.y0_value
+        keep = (dist >= self.r1_value) & (dist <= self.r2_value) & self.in_plot_range(xvals, yvals)
 
-        self.ax0.set_xlim(self.plot_xmin, self.plot_xmax)
-        self.ax0.set_ylim(self.plot_ymin, self.plot_ymax)
-
-        # self.update_plots()
-        self.canvas.update()
-        self.canvas.draw()
+        self.add_cells(xvals[keep], yvals[keep], 0.0, cell_type_index)
 
     #----------------------------------
     def hex_pts_annulus_percentage(self):
-        xlist = deque()
-        ylist = deque()
-        rlist = deque()
-        rgba_list = deque()
-
-        rval = self.cell_radius
-
-        colors = np.empty((0,4))
-        count = 0
-        zval = 0.0
         cell_type_index = self.celltype_combobox.currentIndex()
-        ncells = int(self.num_cells.text())
-        # print("self.r1_value= ", self.r1_value)
 
         x_min = -self.r2_value
         x_max =  self.r2_value
         y_min = -self.r2_value
         y_max =  self.r2_value
-        y_idx = -1
         # hex packing constants
         x_spacing = self.cell_radius * 2
         y_spacing = self.cell_radius * np.sqrt(3)
 
-        xctr = 0.0
-        yctr = 0.0
-
-        y_idx = 0
-        for yval in np.arange(y_min,y_max, y_spacing):
-            y_idx += 1
-            for xval in np.arange(x_min,x_max, x_spacing):
-                xval_offset = xval + (y_idx%2) * self.cell_radius
-                # xval_offset = self.x0_value + xval + (y_idx%2) * self.cell_radius
-
-                # ixval = int(xval_offset)
-                # print(ixval)
-                # idx = np.where(x_values == ixval)
-                xdist = xval_offset - xctr
-                ydist = yval - yctr
-                dist = np.sqrt(xdist*xdist + ydist*ydist)
-                if (dist >= self.r1_value) and (dist <= self.r2_value):
-                    xval_offset += self.x0_value
-                    xlist.append(xval_offset)
-                    yval_offset = yval + self.y0_value
-                    ylist.append(yval_offset)
-                    # self.csv_array = np.append(self.csv_array,[[xval_offset,yval,zval, cell_type_index]],axis=0)
-                    self.csv_array = np.append(self.csv_array,[[xval_offset,yval_offset,zval, cell_type_index]],axis=0)
-                    rlist.append(rval)
-                    self.cell_radii.append(self.cell_radius)
-                    count+=1
-
-        self.numcells_l.append(count)
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        # rgbas = np.array(rgba_list)
-
-        if (self.cells_edge_checked_flag):
-            try:
-                self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-            except (ValueError):
-                pass
-        else:
-            self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
-
-        self.ax0.set_aspect(1.0)
+        xvals, yvals = self.hex_lattice(x_min, x_max, y_min, y_max, x_spacing, y_spacing)
+        dist = np.sqrt(xvals*xvals + yvals*yvals)
+        keep = (dist >= self.r1_value) & (dist <= self.r2_value)
 
-        self.ax0.set_xlim(self.plot_xmin, self.plot_xmax)
-        self.ax0.set_ylim(self.plot_ymin, self.plot_ymax)
-
-        # self.update_plots()
-        self.canvas.update()
-        self.canvas.draw()
+        self.add_cells(xvals[keep] + self.x0_value, yvals[keep] + self.y0_value, 0.0, cell_type_index)
 
     #----------------------------------
     def uniform_random_pts_box(self):
-        xlist = deque()
-        ylist = deque()
-        zlist = deque()
-        rlist = deque()
-        rgba_list = deque()
-
-        rval = self.cell_radius
-
-        colors = np.empty((0,4))
-        count = 0
-        zval = 0.0
         cell_type_index = self.celltype_combobox.currentIndex()
         ncells = int(self.num_cells.text())
-        self.numcells_l.append(ncells)
-        # print("self.r1_value= ", self.r1_value)
-        while True:
-            sign = 1
-            if np.random.uniform() > 0.5:
-                sign = -1
-            xval = self.x0_value + sign * np.random.uniform() * self.r1_value
-
-            sign = 1
-            if np.random.uniform() > 0.5:
-                sign = -1
-            yval = self.y0_value + sign * np.random.uniform() * self.r2_value
-
-            sign = 1
-            if np.random.uniform() > 0.5:
-                sign = -1
-            zval = self.z0_value + sign * np.random.uniform() * self.r3_value
-
-            xlist.append(xval)
-            ylist.append(yval)
-            zlist.append(yval)
-            self.csv_array = np.append(self.csv_array,[[xval,yval,zval, cell_type_index]],axis=0)
-            rlist.append(rval)
-            self.cell_radii.append(self.cell_radius)
-            count+=1
-            if count == ncells:
-                break
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        # rgbas = np.array(rgba_list)
 
-        if (self.cells_edge_checked_flag):
-            try:
-                self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-            except (ValueError):
-                pass
-        else:
-            self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
-
-        self.ax0.set_aspect(1.0)
-
-        self.ax0.set_xlim(self.plot_xmin, self.plot_xmax)
-        self.ax0.set_ylim(self.plot_ymin, self.plot_ymax)
+        xvals = self.x0_value + np.random.uniform(-self.r1_value, self.r1_value, ncells)
+        yvals = self.y0_value + np.random.uniform(-self.r2_value, self.r2_value, ncells)
+        zvals = self.z0_value + np.random.uniform(-self.r3_value, self.r3_value, ncells)
 
-        # self.update_plots()
-        self.canvas.update()
-        self.canvas.draw()
+        self.add_cells(xvals, yvals, zvals, cell_type_index)
 
     #------------------------------------------------
     def uniform_random_pts_annulus(self):
-        xlist = deque()
-        ylist = deque()
-        rlist = deque()
-        rgba_list = deque()
-
-        # V = 4/3 * pi * r^3
-        # r = (V * 3/4 / pi) ** 0.3333
-
-        rval = self.cell_radius
-        # xyz = np.empty((0,3))
-        colors = np.empty((0,4))
-        # R1 = 300
-        # R1_cbrt = np.cbrt(R1)
-        # R2 = 400
-        count = 0
-        zval = 0.0
         cell_type_index = self.celltype_combobox.currentIndex()
-
         ncells = int(self.num_cells.text())
-        self.numcells_l.append(ncells)
-
-        # R1 = float(self.r1val.text())
-        # R1 = self.r1_value
-        R1 = self.r1_value - self.x0_value
-        # print("R1=",R1)
-        R1_sq = R1*R1
-        # print("R1_sq=",R1_sq)
-        # R2 = float(self.r2val.text())
-        R2 = self.r2_value
-        # print("R2=",R2)
-        # k = 0
-        while True:
-            # k += 1
-            t = 2.0 * np.pi * np.random.uniform()
-            u = np.random.uniform() + np.random.uniform()
-            if u > 1: 
-                r = 2.0 - u 
-            else: 
-                r = u
-            xval = self.x0_value + R2*r * np.cos(t)
-            yval = self.y0_value + R2*r * np.sin(t)
-
-            # print("xval,yval= ",xval,yval)
-            xval2 = xval - self.x0_value
-            yval2 = yval - self.y0_value
-            d2 = np.sqrt(xval2*xval2 + yval2*yval2)
-            # print(f'{k}) d2= {d2}, R1_sq={R1_sq}')
-            # if k > 300:
-                # break
-            if d2 >= self.r1_value:
-                xlist.append(xval)
-                ylist.append(yval)
-                rlist.append(rval)
-                # print(count,xval,yval)
-                self.csv_array = np.append(self.csv_array,[[xval,yval,zval, cell_type_index]],axis=0)
-                self.cell_radii.append(self.cell_radius)
-                count+=1
-                if count == ncells:
-                    break
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        # rgbas = np.array(rgba_list)
-
-        # print("idx, # celltypes=",cell_type_index , len(self.color_by_celltype[cell_type_index]))
-        # if cell_type_index >= len(self.color_by_celltype[cell_type_index]):
-        #     print("Error: exceeded # of colors. Grow it.")
-        #     self.color_by_celltype.append('red')
-
-        if (self.cells_edge_checked_flag):
-            try:
-                self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-            # except (ValueError):
-            except:
-                pass
-        else:
-            self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
+        if ncells <= 0:
+            return
 
-        self.ax0.set_aspect(1.0)
+        # uniform in the disk of radius R2 (r = u1+u2, folded), rejecting points inside R1; in batches
+        R2 = self.r2_value
+        xlist = []
+        ylist = []
+        count = 0
+        while count < ncells:
+            nbatch = max(2 * (ncells - count), 1024)
+            t = 2.0 * np.pi * np.random.uniform(size=nbatch)
+            u = np.random.uniform(size=nbatch) + np.random.uniform(size=nbatch)
+            r = np.where(u > 1, 2.0 - u, u)
+            keep = (R2*r >= self.r1_value)
+            xlist.append(R2*r[keep] * np.cos(t[keep]))
+            ylist.append(R2*r[keep] * np.sin(t[keep]))
+            count += keep.sum()
 
-        self.ax0.set_xlim(self.plot_xmin, self.plot_xmax)
-        self.ax0.set_ylim(self.plot_ymin, self.plot_ymax)
+        xvals = self.x0_value + np.concatenate(xlist)[:ncells]
+        yvals = self.y0_value + np.concatenate(ylist)[:ncells]
 
-        # self.update_plots()
-        self.canvas.update()
-        self.canvas.draw()
+        self.add_cells(xvals, yvals, 0.0, cell_type_index)
 
     #----------------------------------
     def ring(self):
-        xlist = deque()
-        ylist = deque()
-        rlist = deque()
-        rgba_list = deque()
-
-
-        colors = np.empty((0,4))
-        count = 0
-        zval = 0.0
         cell_type_index = self.celltype_combobox.currentIndex()
-        # ncells = int(self.num_cells.text())
-        # print("self.r1_value= ", self.r1_value)
 
         rval = self.cell_radius
         R = self.r2_value
@@ -1963,55 +1757,15 @@ class ICs(StudioTab):
             return
         print("ring(): rmod= ",rmod)
 
-        # cells_x = np.array([])
-        # cells_y = np.array([])
-
-        xctr = 0.0
-        yctr = 0.0
-
-        y_idx = 0
         start_radians = self.o1_value * np.pi/180.
         end_radians = self.o2_value * np.pi/180.
 
-        for theta in np.arange(start_radians, end_radians, rmod*2*delta_theta):
-            # print("theta= ",theta)
-            xval = self.x0_value + R * np.cos(theta)
-            yval = self.y0_value + R * np.sin(theta)
-
-            if xval < self.plot_xmin or xval > self.plot_xmax \
-                or yval < self.plot_ymin or yval > self.plot_ymax:
-                continue
-            else:
-                xlist.append(xval)
-                ylist.append(yval)
-                self.csv_array = np.append(self.csv_array,[[xval,yval,zval, cell_type_index]],axis=0)
-                rlist.append(rval)
-                self.cell_radii.append(self.cell_radius)
-                count+=1
-
-        self.numcells_l.append(count)
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        # rgbas = np.array(rgba_list)
-
-        if (self.cells_edge_checked_flag):
-            try:
-                self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-            except (ValueError):
-                pass
-        else:
-            self.circles(xvals,yvals, s=rvals, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
-
-        self.ax0.set_aspect(1.0)
+        theta = np.arange(start_radians, end_radians, rmod*2*delta_theta)
+        xvals = self.x0_value + R * np.cos(theta)
+        yvals = self.y0_value + R * np.sin(theta)
+        keep = self.in_plot_range(xvals, yvals)
 
-        self.ax0.set_xlim(self.plot_xmin, self.plot_xmax)
-        self.ax0.set_ylim(self.plot_ymin, self.plot_ymax)
-
-        # self.update_plots()
-        self.canvas.update()
-        self.canvas.draw()
+        self.add_cells(xvals[keep], yvals[keep], 0.0, cell_type_index)
 
     #------------------------------------------------
     def clear_cb(self):
@@ -2026,9 +1780,7 @@ class ICs(StudioTab):
         self.canvas.update()
         self.canvas.draw()
 
-        self.csv_array = np.empty([1,4])  # should probably *just* np.delete, but meh
-        self.csv_array = np.delete(self.csv_array,0,0)
-        self.cell_radii = []
+        self.cells.clear()
 
     def save_cb(self):
         if len(self.csv_array) == 0:
@@ -2064,15 +1816,15 @@ class ICs(StudioTab):
             # print(self.csv_array)
             cell_name = list(self.xml_creator.celldef_tab.param_d.keys())
             # print("cell_name=",cell_name)
-            with open(full_fname, 'w') as f:
-                f.write('x,y,z,type,volume,cycle entry,custom:GFP,custom:sample\n')  # PhysiCell checks for "x" or "X"
-                for idx in range(len(self.csv_array)):
-                    ict = int(self.csv_array[idx,3])  # cell type index
-                    f.write(f'{self.csv_array[idx,0]},{self.csv_array[idx,1]},{self.csv_array[idx,2]},{cell_name[ict]}\n')
+            # PhysiCell checks for "x" or "X"
+            write_positions(full_fname, self.csv_array[:, 0:3], self.csv_array[:, 3].astype(int), cell_name,
+                            header='x,y,z,type,volume,cycle entry,custom:GFP,custom:sample', sidecar=self.save_sidecar.isChecked())
         else:
             print("----- Writing v1 (with cell indices) .csv file for cells")
             print("----- full_fname=",full_fname)
             np.savetxt(full_fname, self.csv_array, delimiter=',')
+            if os.path.isfile(sidecar_file(full_fname)):   # a binary copy of an earlier save is stale now
+                os.remove(sidecar_file(full_fname))
 
     def save_substrate_cb(self):
         folder = self.substrate_save_folder.text()
@@ -2141,78 +1893,47 @@ class ICs(StudioTab):
             cell_types_l = [self.celltype_combobox.itemText(i) for i in range(self.celltype_combobox.count())]
             print(cell_types_l)
 
-            # xlist = deque()
-            # ylist = deque()
-            # rlist = deque()
-            # rgba_list = deque()
-
-            rval = self.cell_radius
-
-            colors = np.empty((0,4))
-            count = 0
-            # zval = 0.0
-            # cell_type_index = self.celltype_combobox.currentIndex()
-            # cell_type_name = self.celltype_combobox.currentText()
-
             # x,y,z,type,volume,cycle entry,custom:GFP,custom:sample
             # -49.52373671227464,-85.42875790157267,0.0,acell
-            zval = 0.0   # only doing 2D now
-            with open(full_path_rules_name, newline='') as csvfile:
-                states_reader = csv.reader(csvfile, delimiter=',')
-                count = 0
-                for row in states_reader:
-                    # print(count,row)
-                    if count == 0:
-                        # print("skipping header row")
-                        # print("row[0]=",row[0])
-                        if row[0] != 'x':
-                            msgBox = QMessageBox()
-                            msgBox.setIcon(QMessageBox.Information)
-                            msgBox.setText("Invalid first row. Expecting 'x' in 1st column.")
-                            msgBox.setStandardButtons(QMessageBox.Ok)
-                            returnValue = msgBox.exec()
-                            return
-                        # count+=1
-                    else:
-                        xval = float(row[0])
-                        yval = float(row[1])
-                        # zval = float(row[2])
-                        cell_type_name = row[3]
+            try:
+                xyzt, errors = read_cells_csv(full_path_rules_name, cell_types_l)
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                msgBox = QMessageBox()
+                msgBox.setIcon(QMessageBox.Information)
+                msgBox.setText(f"Invalid cells .csv file: {e}")
+                msgBox.setStandardButtons(QMessageBox.Ok)
+                returnValue = msgBox.exec()
+                return
+
+            if errors:
+                # one report for all bad rows; the valid ones are still imported
+                print(f"import_from_file(): skipped {len(errors)} rows:")
+                for error in errors:
+                    print("   ", error)
+                msg = f"Skipped {len(errors)} invalid rows (imported {len(xyzt)} cells):\n" + "\n".join(errors[:10])
+                if len(errors) > 10:
+                    msg += f"\n... (see the terminal for all {len(errors)})"
+                msgBox = QMessageBox()
+                msgBox.setIcon(QMessageBox.Information)
+                msgBox.setText(msg)
+                msgBox.setStandardButtons(QMessageBox.Ok)
+                returnValue = msgBox.exec()
+
+            if len(xyzt) > 0:
+                # the whole file is one chunk (one Undo), drawn with one collection per cell type
+                rvals = np.full(len(xyzt), self.cell_radius)
+                self.cells.append(xyzt, rvals)
+                itypes = xyzt[:, 3].astype(int)
+                for cell_type_index in np.unique(itypes):
+                    idx = itypes == cell_type_index
+                    if (self.cells_edge_checked_flag):
                         try:
-                            cell_type_index = cell_types_l.index(cell_type_name)
-                        except:
-                            msgBox = QMessageBox()
-                            msgBox.setIcon(QMessageBox.Information)
-                            msgBox.setText(f"Invalid cell type name: {cell_type_name}")
-                            msgBox.setStandardButtons(QMessageBox.Ok)
-                            returnValue = msgBox.exec()
-                            return
-
-                        # print('xval,yval=',xval,yval)
-                        # volume = float(self.xml_creator.celldef_tab.param_d[cdef]["volume_total"])
-                        # volume = float(self.xml_creator.celldef_tab.param_d[cell_type_name]["volume_total"])
-                        # rval = (volume * 0.75 / np.pi) ** (1./3)
-                        rval = self.cell_radius
-
-                        self.csv_array = np.append(self.csv_array,[[xval,yval, zval, cell_type_index]],axis=0)
-                        # rlist.append(rval)
-                        self.cell_radii.append(rval)
-                        # count+=1
-
-                        if (self.cells_edge_checked_flag):
-                            try:
-                                # print(f"calling self.circles with {xval}, {yval}")
-                                self.circles(xval,yval, s=rval, color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
-                            except (ValueError):
-                                print("Exception:  self.circles")
-                                pass
-                        else:
-                            self.circles(xval,yval, s=rval, color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
-
-                        self.numcells_l.append(1)
-
-                    count+=1
-                    # self.numcells_l.append(count)
+                            self.circles(xyzt[idx, 0],xyzt[idx, 1], s=rvals[idx], color=self.get_cell_type_color(cell_type_index), edgecolor='black', linewidth=0.5, alpha=self.alpha_value)
+                        except (ValueError):
+                            print("Exception:  self.circles")
+                            pass
+                    else:
+                        self.circles(xyzt[idx, 0],xyzt[idx, 1], s=rvals[idx], color=self.get_cell_type_color(cell_type_index), alpha=self.alpha_value)
 
             self.ax0.set_aspect(1.0)
 
@@ -2230,9 +1951,14 @@ class ICs(StudioTab):
         self.output_file.setText(self.xml_creator.config_tab.csv_file.text())
         self.fill_substrate_combobox()
         self.fill_ic_substrates_widgets()
-        if self.xml_creator.biwt_flag:
+        if self.xml_creator.biwt_flag and self.biwt_lazy_tab.built:
             self.xml_creator.biwt_tab.fill_gui()
 
+    def build_biwt_tab(self, biwt_module):
+        self.xml_creator.biwt_tab = biwt_module.BioinformaticsWalkthrough(self.xml_creator.config_tab, self.xml_creator.celldef_tab, self, self.xml_creator)
+        self.xml_creator.biwt_tab.fill_gui()
+        return self.xml_creator.biwt_tab
+
     def fill_ic_substrates_widgets(self):
         substrate_initial_condition_element = self.xml_creator.config_tab.xml_root.find(".//microenvironment_setup//options//initial_condition")
         if substrate_initial_condition_element is None or substrate_initial_condition_element.attrib["enabled"].lower() == "false":
@@ -0,0 +1,101 @@
+"""
+lazy_tab.py - tabs that are imported and constructed the first time they are shown, and the startup profile.
+
+A LazyTab is a lightweight placeholder page in a QTabWidget. When the page is first selected (or its tab is
+asked for through widget()), the tab's module is imported and build(module) constructs the real tab, which
+then takes the placeholder's place. This keeps heavy modules (e.g., matplotlib/VTK for the Plot tab,
+anndata/rpy2 for the BIWT) out of the Studio's startup.
+
+startup_profile records the import and construction time per module; studio.py --profile-startup prints it.
+
+Rf. Credits.md
+"""
+
+import importlib
+import time
+from contextlib import contextmanager
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+
+
+class StartupProfile:
+    def __init__(self):
+        self.enabled = False
+        self.t0 = time.perf_counter()
+        self.times = {}   # key: module name, value: [import secs, construct secs]
+        self.reported = False
+
+    @contextmanager
+    def timed(self, module_name, stage):   # stage: 'import' or 'construct'
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t
+            self.times.setdefault(module_name, [0., 0.])[stage == 'construct'] += dt
+            if self.enabled and self.reported:   # a lazy tab, built after startup
+                print(f"startup profile: {module_name} {stage} {dt:.3f} s (on first use)")
+
+    def import_module(self, module_name):
+        with self.timed(module_name, 'import'):
+            return importlib.import_module(module_name)
+
+    def report(self):
+        # import time is cumulative: it includes dependencies first imported by that module
+        self.reported = True
+        if not self.enabled:
+            return
+        print(f"\n{'module':<28}{'import (s)':>12}{'construct (s)':>15}")
+        for module_name, (t_import, t_construct) in sorted(self.times.items(), key=lambda item: -sum(item[1])):
+            print(f"{module_name:<28}{t_import:>12.3f}{t_construct:>15.3f}")
+        print(f"{'startup total':<28}{time.perf_counter() - self.t0:>27.3f}\n")
+
+
+startup_profile = StartupProfile()
+
+
+class LazyTab(QWidget):
+    def __init__(self, tab_widget, title, module_name, build):
+        super().__init__()
+        self.tab_widget = tab_widget
+        self.title = title
+        self.module_name = module_name
+        self.build = build   # build(module) -> the tab's widget
+        self.tab = None
+
+        label = QLabel(f"Loading {title} ...")
+        label.setAlignment(Qt.AlignCenter)
+        layout = QVBoxLayout(self)
+        layout.addWidget(label)
+
+        self.tab_widget.currentChanged.connect(self.current_changed_cb)
+
+    @property
+    def built(self):
+        return self.tab is not None
+
+    def current_changed_cb(self, index):
+        if self.tab is None and self.tab_widget.widget(index) is self:
+            self.widget()
+
+    def widget(self):
+        # the real tab, imported and constructed on the first call
+        if self.tab is None:
+            module = startup_profile.import_module(self.module_name)
+            with startup_profile.timed(self.module_name, 'construct'):
+                self.tab = self.build(module)
+            self.tab_widget.currentChanged.disconnect(self.current_changed_cb)
+
+            index = self.tab_widget.indexOf(self)
+            if index >= 0:   # swap the placeholder for the tab, quietly (it's the same page to the user)
+                current = (self.tab_widget.currentIndex() == index)
+                enabled = self.tab_widget.isTabEnabled(index)
+                self.tab_widget.blockSignals(True)
+                self.tab_widget.removeTab(index)
+                self.tab_widget.insertTab(index, self.tab, self.title)
+                self.tab_widget.setTabEnabled(index, enabled)
+                if current:
+                    self.tab_widget.setCurrentIndex(index)
+                self.tab_widget.blockSignals(False)
+        return self.tab
@@ -0,0 +1,75 @@
+"""
+loader_service.py - run file parsing and array preparation on worker threads, and hand the (draw-ready)
+results back to the GUI thread through a Qt signal, so the Plot tab stays responsive on large outputs.
+
+Each request belongs to a channel (e.g. "frame", "cell_counts"). A newer request on a channel supersedes the
+older one: it is canceled if it has not started yet, and its result is dropped if it has.
+Functions run by the service must not touch any Qt widget or plot state.
+
+Rf. Credits.md
+"""
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class LoaderService(QObject):
+    finished = pyqtSignal(int, object, object)   # request id, result, exception (None on success)
+
+    def __init__(self, num_workers=2, parent=None):
+        super().__init__(parent)
+        self.num_workers = num_workers
+        self.executor = None
+        self.ids = itertools.count(1)
+        self.latest = {}     # channel -> id of its current request
+        self.requests = {}   # request id -> (channel, future, on_done, on_error)
+        self.finished.connect(self.finished_cb)
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None):
+        # run fn(*args) on a worker; on_done(result) or on_error(exception) is called on the GUI thread,
+        # unless a newer request on the same channel came in first
+        self.cancel(channel)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="loader_service")
+        request_id = next(self.ids)
+        future = self.executor.submit(fn, *args)
+        self.latest[channel] = request_id
+        self.requests[request_id] = (channel, future, on_done, on_error)
+        future.add_done_callback(lambda future, request_id=request_id: self._emit(request_id, future))
+        return request_id
+
+    def _emit(self, request_id, future):
+        # runs on the worker thread; the signal queues the result to the GUI thread
+        if future.cancelled():
+            self.finished.emit(request_id, None, None)
+            return
+        error = future.exception()
+        self.finished.emit(request_id, None if error else future.result(), error)
+
+    def finished_cb(self, request_id, result, error):
+        channel, future, on_done, on_error = self.requests.pop(request_id, (None, None, None, None))
+        if (channel is None) or (self.latest.get(channel) != request_id) or future.cancelled():
+            return   # superseded
+        del self.latest[channel]
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            else:
+                print(f"loader_service.py: {channel} request failed: {error}")
+        elif on_done is not None:
+            on_done(result)
+
+    def cancel(self, channel):
+        request_id = self.latest.pop(channel, None)
+        if request_id in self.requests:
+            self.requests[request_id][1].cancel()
+
+    def is_busy(self, channel):
+        return channel in self.latest
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
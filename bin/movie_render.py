@@ -0,0 +1,335 @@
+"""
+movie_render.py - render the 2D Plot tab overlays (substrate and/or cells) without the GUI and stream them into ffmpeg.
+
+Each worker process keeps one Agg figure and redraws it for every frame it is handed. The rendered frames are
+piped, in order, as raw RGBA into ffmpeg's stdin, so memory stays bounded however many frames the movie has.
+Runs without a display:
+
+    python movie_render.py <output_dir> [-o movie.mp4] [--cells svg|<cell scalar>] [--substrate <name>] [-n N]
+
+Rf. Credits.md
+"""
+
+import argparse
+import collections
+import glob
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import EllipseCollection
+from matplotlib.colors import LinearSegmentedColormap
+
+import cmaps
+from frame_cache import load_svg_frame, load_cells_frame, load_substrate_frame
+
+
+def default_spec(output_dir):
+    # what the Plot tab shows by default, read from the first output*.xml; the caller overrides what it needs
+    spec = {
+        'output_dir': output_dir,
+        'frames': [],
+        'figsize': (8.0, 7.0),
+        'dpi': 100,
+        'xlim': (-500., 500.), 'ylim': (-500., 500.),
+        'domain_min': (-500., -500.),   # maps SVG coordinates into the domain
+        'aspect_equal': True,
+        'bgcolor': 'white',
+        'title_fontsize': 10,
+        'cells': 'svg',     # None, 'svg', or a cell scalar name from the .mat files
+        'cell_fill': True,
+        'cell_edge': True,
+        'cell_line_width': 0.5,
+        'show_nucleus': False,
+        'cell_cmap': 'viridis', 'cell_vmin': None, 'cell_vmax': None,
+        'cell_discrete': False,         # color a discrete cell scalar as the Plot tab does, by its position in
+        'cell_discrete_values': None,   # these sorted values (None: the values in each frame)
+        'celltype_filter': [],          # cell type IDs to draw (empty: all); for SVG, by name:
+        'celltype_filter_names': [],
+        'substrate_index': None,    # row of the microenvironment .mat (4 + substrate #); None for no substrate
+        'numx': 0, 'numy': 0,
+        'substrate_cmap': 'viridis', 'substrate_vmin': None, 'substrate_vmax': None,
+        'shading': 'auto',
+    }
+
+    xml_files = sorted(glob.glob(os.path.join(output_dir, 'output*.xml')))
+    if xml_files:
+        root = ET.parse(xml_files[0]).getroot()
+        bbox = root.find('.//microenvironment//domain//mesh//bounding_box')
+        if bbox is not None:
+            xmin, ymin, zmin, xmax, ymax, zmax = [float(v) for v in bbox.text.split()]
+            spec['xlim'] = (xmin, xmax)
+            spec['ylim'] = (ymin, ymax)
+            spec['domain_min'] = (xmin, ymin)
+        coords = root.find('.//microenvironment//domain//mesh//x_coordinates')
+        if coords is not None:
+            spec['numx'] = len(coords.text.split(coords.get('delimiter', ' ')))
+        coords = root.find('.//microenvironment//domain//mesh//y_coordinates')
+        if coords is not None:
+            spec['numy'] = len(coords.text.split(coords.get('delimiter', ' ')))
+    return spec
+
+
+def substrate_names(output_dir):
+    xml_files = sorted(glob.glob(os.path.join(output_dir, 'output*.xml')))
+    if not xml_files:
+        return []
+    root = ET.parse(xml_files[0]).getroot()
+    return [var.get('name') for var in root.findall('.//microenvironment//domain//variables//variable')]
+
+
+def output_frames(output_dir, svg):
+    name_re = re.compile(r'snapshot(\d{8})\.svg$' if svg else r'output(\d{8})\.xml$')
+    frames = []
+    for fname in os.listdir(output_dir):
+        m = name_re.match(fname)
+        if m:
+            frames.append(int(m.group(1)))
+    return sorted(frames)
+
+
+def frame_size(spec):
+    # libx264/yuv420p needs even pixel dimensions
+    width = int(round(spec['figsize'][0] * spec['dpi'])) // 2 * 2
+    height = int(round(spec['figsize'][1] * spec['dpi'])) // 2 * 2
+    return width, height
+
+
+#-----------------------------------------------------
+# Worker side: one Agg figure per process, reused for every frame.
+
+worker = {}
+
+
+def init_worker(spec):
+    width, height = frame_size(spec)
+    fig = Figure(figsize=(width / spec['dpi'], height / spec['dpi']), dpi=spec['dpi'])
+    FigureCanvasAgg(fig)
+    worker['spec'] = spec
+    worker['fig'] = fig
+    worker['ax'] = fig.add_subplot(1, 1, 1)
+
+
+def title_from_minutes(mins):
+    hrs = int(mins/60)
+    days = int(hrs/24)
+    return '%d days, %d hrs, %d mins' % (days, hrs-days*24, mins-hrs*60)
+
+
+def add_circles(ax, xvals, yvals, rvals, spec, **kwargs):
+    # circles with radii in data units, as one vectorized collection
+    if spec['cell_edge']:
+        kwargs.setdefault('edgecolors', 'black')
+        kwargs.setdefault('linewidths', spec['cell_line_width'])
+    collection = EllipseCollection(2*rvals, 2*rvals, np.zeros(len(rvals)), units='xy',
+                                   offsets=np.column_stack([xvals, yvals]), offset_transform=ax.transData, **kwargs)
+    ax.add_collection(collection)
+    return collection
+
+
+def draw_substrate(ax, spec, frame):
+    output_dir = spec['output_dir']
+    xml_file = os.path.join(output_dir, "output%08d.xml" % frame)
+    mat_file = os.path.join(output_dir, "output%08d_microenvironment0.mat" % frame)
+    if not (os.path.isfile(xml_file) and os.path.isfile(mat_file)):
+        return None
+    substrate = load_substrate_frame(xml_file, mat_file, spec['substrate_index'], spec['numx'], spec['numy'])
+    ax.pcolormesh(substrate['xgrid'], substrate['ygrid'], substrate['zvals'], shading=spec['shading'],
+                  cmap=spec['substrate_cmap'], vmin=spec['substrate_vmin'], vmax=spec['substrate_vmax'])
+    return title_from_minutes(substrate['mins'])
+
+
+def draw_cells_svg(ax, spec, frame):
+    full_fname = os.path.join(spec['output_dir'], "snapshot%08d.svg" % frame)
+    if not os.path.isfile(full_fname):
+        return None
+    svg = load_svg_frame(full_fname)
+    if spec['celltype_filter_names']:
+        keep_cell = np.isin(svg['cell_type'], spec['celltype_filter_names'])
+    else:
+        keep_cell = np.ones(len(svg['cell_type']), dtype=bool)
+    num_cells = np.count_nonzero(keep_cell)
+    keep = keep_cell[svg['cell_idx']]
+    if not spec['show_nucleus']:
+        keep &= ~svg['nucleus']
+    xvals = svg['x'][keep] + spec['domain_min'][0]
+    yvals = svg['y'][keep] + spec['domain_min'][1]
+    rgbas = svg['rgba'][keep]
+    if spec['cell_fill']:
+        add_circles(ax, xvals, yvals, svg['r'][keep], spec, facecolors=rgbas)
+    else:
+        add_circles(ax, xvals, yvals, svg['r'][keep], spec, facecolors=(1,1,1,0), edgecolors=rgbas)
+    return svg['title_str'] + " (" + str(num_cells) + " agents)"
+
+
+def discrete_colormap(num_values):
+    # the Plot tab's (vis_tab.py plot_cell_scalar) colors for a discrete cell scalar with this many values
+    if num_values == 1:
+        return LinearSegmentedColormap.from_list(None, cmaps.gray_gray[0:2], 1)
+    return LinearSegmentedColormap.from_list(None, cmaps.paint_clist[0:num_values], num_values)
+
+
+def draw_cells_scalar(ax, spec, frame):
+    output_dir = spec['output_dir']
+    if not os.path.isfile(os.path.join(output_dir, "output%08d.xml" % frame)):
+        return None
+    name = spec['cells']
+    columns = ('total_volume', name, 'cell_type') if spec['celltype_filter'] else ('total_volume', name)
+    cells = load_cells_frame("output%08d.xml" % frame, output_dir, columns=columns)
+    df = cells['df']
+    if spec['celltype_filter']:
+        df = df.loc[df['cell_type'].isin(spec['celltype_filter'])]
+    rvals = np.power(df['total_volume'].values / 4.188790204786391, 1./3.)
+    values = df[name].values
+    title_str = title_from_minutes(cells['time']) + " (" + str(len(df)) + " agents)"
+
+    if spec['cell_discrete']:
+        # value i of the discrete values is drawn as color i; other values keep their own value, as in the Plot tab
+        discrete = spec['cell_discrete_values']
+        if discrete is None:
+            discrete = sorted(set(int(v) for v in values))
+        if len(discrete) == 0:
+            return title_str
+        discrete = np.array(discrete)
+        pos = np.minimum(np.searchsorted(discrete, values), len(discrete) - 1)
+        values = np.where(discrete[pos] == values, pos, values)
+        collection = add_circles(ax, df['position_x'].values, df['position_y'].values, rvals, spec, cmap=discrete_colormap(len(discrete)))
+        collection.set_array(values)
+        collection.set_clim(-0.5, len(discrete) - 0.5)
+    else:
+        collection = add_circles(ax, df['position_x'].values, df['position_y'].values, rvals, spec, cmap=spec['cell_cmap'])
+        collection.set_array(values)
+        collection.set_clim(spec['cell_vmin'], spec['cell_vmax'])
+    return title_str
+
+
+def render_frame(frame):
+    # returns the frame as raw RGBA bytes
+    spec = worker['spec']
+    fig = worker['fig']
+    ax = worker['ax']
+    ax.cla()
+
+    title_str = None
+    if spec['substrate_index'] is not None:
+        title_str = draw_substrate(ax, spec, frame)
+    if spec['cells'] == 'svg':
+        title_str = draw_cells_svg(ax, spec, frame) or title_str
+    elif spec['cells']:
+        title_str = draw_cells_scalar(ax, spec, frame) or title_str
+
+    ax.set_title(title_str or "", fontsize=spec['title_fontsize'])
+    ax.set_xlim(*spec['xlim'])
+    ax.set_ylim(*spec['ylim'])
+    ax.set_facecolor(spec['bgcolor'])
+    ax.set_aspect('equal' if spec['aspect_equal'] else 'auto')
+
+    fig.canvas.draw()
+    return bytes(fig.canvas.buffer_rgba())
+
+
+#-----------------------------------------------------
+# Main side: keep a bounded window of frames in flight and feed ffmpeg in frame order.
+
+def render_movie(spec, movie_name, num_workers=None, fps=10, progress=None):
+    # progress(num_done, num_frames) is called after each frame; returning False cancels. Returns True if the movie was written.
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg is not installed")
+    frames = list(spec['frames'])
+    if not frames:
+        raise ValueError("no frames to render in " + spec['output_dir'])
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    width, height = frame_size(spec)
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+           '-c:v', 'libx264', '-pix_fmt', 'yuv420p', movie_name]
+    ffmpeg = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    # spawn, not fork: the caller may be the (multi-threaded) Qt GUI
+    executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=init_worker, initargs=(spec,))
+    pending = collections.deque()
+    next_frame = iter(frames)
+    completed = False
+    try:
+        for frame in next_frame:
+            pending.append(executor.submit(render_frame, frame))
+            if len(pending) >= 2 * num_workers:
+                break
+        num_done = 0
+        while pending:
+            ffmpeg.stdin.write(pending.popleft().result())
+            num_done += 1
+            for frame in next_frame:
+                pending.append(executor.submit(render_frame, frame))
+                break
+            if progress is not None and progress(num_done, len(frames)) is False:
+                break
+        else:
+            completed = True
+    finally:
+        executor.shutdown(wait=completed, cancel_futures=True)
+        try:
+            ffmpeg.stdin.close()
+        except BrokenPipeError:
+            pass
+        if completed:
+            completed = (ffmpeg.wait() == 0)
+        else:
+            ffmpeg.kill()
+            ffmpeg.wait()
+            if os.path.isfile(movie_name):
+                os.remove(movie_name)
+    return completed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='render a movie of a PhysiCell output folder (2D), headless.')
+    parser.add_argument('output_dir', type=str, help='PhysiCell output folder')
+    parser.add_argument('-o', '--output', type=str, default='movie.mp4', help='movie file name (default: movie.mp4)')
+    parser.add_argument('--cells', type=str, default='svg', help="'svg' (default), 'none', or a cell scalar, e.g. pressure")
+    parser.add_argument('--substrate', type=str, default=None, help='substrate name to draw underneath the cells')
+    parser.add_argument('--cmap', type=str, default='viridis', help='colormap for the cell scalar and substrate')
+    parser.add_argument('--fps', type=int, default=10, help='frames per second (default: 10)')
+    parser.add_argument('--dpi', type=int, default=100, help='dots per inch of the 8x7 inch figure (default: 100)')
+    parser.add_argument('-n', '--workers', type=int, default=None, help='number of worker processes (default: number of cpus)')
+    args = parser.parse_args()
+    if not os.path.isdir(args.output_dir):
+        print(f'movie_render.py: Error: no such directory: {args.output_dir}')
+        sys.exit(1)
+
+    spec = default_spec(args.output_dir)
+    spec['dpi'] = args.dpi
+    spec['cells'] = None if args.cells.lower() == 'none' else args.cells
+    spec['cell_cmap'] = args.cmap
+    spec['substrate_cmap'] = args.cmap
+    if args.substrate:
+        names = substrate_names(args.output_dir)
+        if args.substrate not in names:
+            print(f'movie_render.py: Error: substrate {args.substrate} not in {names}')
+            sys.exit(1)
+        spec['substrate_index'] = 4 + names.index(args.substrate)
+    spec['frames'] = output_frames(args.output_dir, svg=(spec['cells'] == 'svg'))
+
+    def print_progress(num_done, num_frames):
+        print(f'\rframe {num_done}/{num_frames}', end='', flush=True)
+
+    try:
+        ok = render_movie(spec, args.output, num_workers=args.workers, fps=args.fps, progress=print_progress)
+    except Exception as e:
+        print()
+        print(f'movie_render.py: Error: {e}')
+        sys.exit(1)
+    print()
+    print(f"Movie saved as {args.output}" if ok else "movie_render.py: Error: ffmpeg failed")
+    sys.exit(0 if ok else 1)
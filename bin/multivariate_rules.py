@@ -13,18 +13,23 @@ from matplotlib.figure import Figure
 
 from studio_classes import QCheckBox_custom
 
+def hill_function(signals, halfmaxs, hillpowers):
+    # H = sum/(1+sum), sum = sum_i (signal_i/halfmax_i)^hillpower_i, over all signals at once:
+    # the signals (scalars or arrays) are broadcast and stacked into one (num_signals, ...) array
+    if len(signals) == 0:
+        return 0.0
+    signals = np.stack(np.broadcast_arrays(*[np.asarray(signal, dtype=float) for signal in signals]))
+    shape = (-1,) + (1,)*(signals.ndim - 1)
+    sum_H = ((signals/np.asarray(halfmaxs, dtype=float).reshape(shape))**np.asarray(hillpowers, dtype=float).reshape(shape)).sum(axis=0)
+    return sum_H/(1+sum_H)
+
 def Multivariate_hillFunc(signals_U, halfmaxs_U, hillpowers_U, signals_D, halfmaxs_D, hillpowers_D):
-    sum_U = 0; sum_D = 0 
-    for id_Up in range(len(signals_U)):
-        sum_U += (signals_U[id_Up]/halfmaxs_U[id_Up])**hillpowers_U[id_Up]
-        if ( type(signals_U[id_Up]) == np.ndarray):
-            proj_signal = signals_U[id_Up]
-    for id_Dw in range(len(signals_D)):
-        sum_D += (signals_D[id_Dw]/halfmaxs_D[id_Dw])**hillpowers_D[id_Dw]
-        if ( type(signals_D[id_Dw]) == np.ndarray):
-            proj_signal = signals_D[id_Dw]
-    H_U = sum_U/(1+sum_U)
-    H_D = sum_D/(1+sum_D)
+    proj_signal = None
+    for signal in list(signals_U) + list(signals_D):
+        if ( type(signal) == np.ndarray):
+            proj_signal = signal
+    H_U = hill_function(signals_U, halfmaxs_U, hillpowers_U)
+    H_D = hill_function(signals_D, halfmaxs_D, hillpowers_D)
     return proj_signal, H_U, H_D
 
 class LabeledSlider(QWidget):
@@ -132,11 +137,14 @@ class MplCanvas(FigureCanvas):
         super(MplCanvas, self).__init__(self.fig)
 
 class MainPlot(QMainWindow):
-    def __init__(self, combobox_cell, combobox_behavior, combobox_behaviorplot, layout_behavior_sliders, layout_signals, checkbox, min_signal, max_signal):
+    num_points = 1000   # along the plotted signal
+    num_grid = 200      # per axis of the 2-signal response surface
+    def __init__(self, combobox_cell, combobox_behavior, combobox_behaviorplot, layout_behavior_sliders, layout_signals, checkbox, min_signal, max_signal, combobox_behaviorplot2=None):
         super(MainPlot, self).__init__()
         self.combobox_cell = combobox_cell
         self.combobox_behavior = combobox_behavior
         self.combobox_behaviorplot = combobox_behaviorplot
+        self.combobox_behaviorplot2 = combobox_behaviorplot2
         self.layout_behavior_sliders = layout_behavior_sliders
         self.layout_signals = layout_signals
         self.checkbox = checkbox
@@ -144,19 +152,45 @@ class MainPlot(QMainWindow):
         self.max_signal = max_signal
         self.canvas = MplCanvas(self, width=5, height=4, dpi=100)
         self.setCentralWidget(self.canvas)
+        # the artists are created once and updated in place
+        self.line, = self.canvas.axes.plot([], [], 'r')
+        self.halfmax_xlines = [self.canvas.axes.axvline(0, ls='--', color = 'k', visible=False) for i in range(2)]
+        self.halfmax_ylines = [self.canvas.axes.axhline(0, ls='--', color = 'w', visible=False) for i in range(2)]
+        self.surface = None
+        self.colorbar = None
+        self.grid = (None, None, None)   # (signal ranges, x, y) of the sampled signal values
+        self.layout_key = None
+        self.update_pending = False
         self.update_plot()
         self.show()
-        # Setup a timer to trigger the redraw by calling update_plot.
-        self.timer = QtCore.QTimer()
-        self.timer.setInterval(100)
-        self.timer.timeout.connect(self.update_plot)
-        self.timer.start()
+    def schedule_update(self, *args):
+        # redraw once control returns to the event loop, however many sliders changed in between
+        if not self.update_pending:
+            self.update_pending = True
+            QtCore.QTimer.singleShot(0, self.update_plot)
+    def signal_grid(self, x_range, y_range):
+        # signal values along x (and y, for a response surface), recomputed only when a range changes
+        if self.grid[0] != (x_range, y_range):
+            if y_range is None:
+                self.grid = ((x_range, y_range), np.linspace(*x_range, num=self.num_points), None)
+            else:
+                self.grid = ((x_range, y_range), np.linspace(*x_range, num=self.num_grid)[np.newaxis, :], np.linspace(*y_range, num=self.num_grid)[:, np.newaxis])
+        return self.grid[1], self.grid[2]
+    def remove_surface(self):
+        if self.surface is not None:
+            self.colorbar.remove()
+            self.surface.remove()
+            self.surface = None
+            self.colorbar = None
     def update_plot(self):
-        self.canvas.axes.cla()  # Clear the canvas.
+        self.update_pending = False
+        axes = self.canvas.axes
         listSigUpReg = [];  listHalfMaxUpReg = []; listHillPowerUpReg = []
         listSigDownReg = [];  listHalfMaxDownReg = []; listHillPowerDownReg = []
         AxesFixed = True
         Selected_sig = self.combobox_behaviorplot.currentText()
+        Selected_sig2 = self.combobox_behaviorplot2.currentText() if self.combobox_behaviorplot2 is not None else 'none'
+        Surface = Selected_sig2 not in ('none', '', Selected_sig)
         # Layout of behavior sliders (Only one)
         for i in range(self.layout_behavior_sliders.layout().count()):
             widget = self.layout_behavior_sliders.layout().itemAt(i).widget()
@@ -164,8 +198,16 @@ class MainPlot(QMainWindow):
             b_0 = float( widget.slider_base_behavior.tickValue( widget.slider_base_behavior.slider.value() ) )
             b_M = float( widget.slider_up_behavior.tickValue( widget.slider_up_behavior.slider.value() ) )
             b_m = float( widget.slider_down_behavior.tickValue( widget.slider_down_behavior.slider.value() ) )
+        # Signal values sampled along the x axis (and the y axis of a response surface)
+        y_range = None
+        for i in range(self.layout_signals.layout().count()):
+            widget = self.layout_signals.layout().itemAt(i).widget()
+            if Surface and (Selected_sig2 == widget.sig_name) and (y_range is None):
+                y_range = (widget.sig_min, widget.sig_max)
+        Surface = Surface and (y_range is not None)
+        x_values, y_values = self.signal_grid((self.min_signal.value(), self.max_signal.value()), y_range)
         # Layout of signals sliders (Dynamic quantity)
-        halfMax_value = None; halfMax_value2 = None
+        halfMax_x = []; halfMax_y = []
         for i in range(self.layout_signals.layout().count()):
             widget = self.layout_signals.layout().itemAt(i).widget()
             sig_halfmax = float( widget.slider_halfmax_signal.tickValue( widget.slider_halfmax_signal.slider.value() ) )
@@ -179,13 +221,15 @@ class MainPlot(QMainWindow):
                 widget.slider_halfmax_signal.slider.setValue(5) # it is 5 because the slider is discretized to 11 values. 
                 return
             sig_hillpower = float( widget.slider_hillpower.tickValue( widget.slider_hillpower.slider.value() ) )
-            if (Selected_sig == widget.sig_name):
-                sig_value = np.linspace(self.min_signal.value(), self.max_signal.value(), num=1000)
+            if (Selected_sig == widget.sig_name) or (Surface and (Selected_sig2 == widget.sig_name)):
+                if (Selected_sig == widget.sig_name):
+                    sig_value = x_values
+                    halfMax_x.append(sig_halfmax) # two rules to same signal and behavior with different directions (increase and decrease)
+                else:
+                    sig_value = y_values
+                    halfMax_y.append(sig_halfmax)
                 widget.slider_signal.slider.setEnabled(False)
                 widget.slider_signal.label.setStyleSheet("color: gray;") # gray color on the label
-                # If have two rules to same signal and behavior with different directions (increase and decrease)
-                if (halfMax_value): halfMax_value2 = sig_halfmax # If it is the second rule
-                else: halfMax_value = sig_halfmax # If it is the first rules
             else:
                 widget.slider_signal.slider.setEnabled(True)
                 widget.slider_signal.label.setStyleSheet("color: black;") # black color on the label
@@ -200,20 +244,49 @@ class MainPlot(QMainWindow):
         # checkbox is unchecked.
         if (self.checkbox.checkState() == 0): 
             AxesFixed = False
-        # Calculate the hill function
+        # Calculate the hill function, for all sampled signal values at once
         if ((len(listSigUpReg) > 0) | (len(listSigDownReg) > 0)):
             signal, H_U, H_D = Multivariate_hillFunc(listSigUpReg, listHalfMaxUpReg, listHillPowerUpReg, listSigDownReg, listHalfMaxDownReg, listHillPowerDownReg)
-            self.canvas.axes.set_title(f"Behavior: {behavior_name}")
-            self.canvas.axes.plot(signal, (b_0 + (b_M - b_0)*H_U)*(1-H_D) + H_D*b_m, 'r')
-            # self.canvas.axes.plot(signal, b_0 + H_U*(b_M-b_0) + H_D*(b_m - b_0), 'r')
-            self.canvas.axes.axvline(halfMax_value, ls='--', color = 'k')
-            if (halfMax_value2): self.canvas.axes.axvline(halfMax_value2, ls='--', color = 'k') # If have two rules to same signal and behavior with different directions (increase and decrease)
-            self.canvas.axes.set_ylabel('b(U,D)')
-            self.canvas.axes.set_xlabel(Selected_sig)
-            if (  (AxesFixed) and (b_M > b_m) ): self.canvas.axes.set_ylim(b_m, b_M)
-        # Trigger the canvas to update and redraw.
-        self.canvas.fig.tight_layout()
-        self.canvas.draw()
+            behavior = (b_0 + (b_M - b_0)*H_U)*(1-H_D) + H_D*b_m
+            # behavior = b_0 + H_U*(b_M-b_0) + H_D*(b_m - b_0)
+            axes.set_title(f"Behavior: {behavior_name}")
+            axes.set_xlabel(Selected_sig)
+            for line, value in zip(self.halfmax_xlines, halfMax_x + [None]):
+                line.set_visible(value is not None)
+                if value is not None: line.set_xdata([value, value])
+            for line, value in zip(self.halfmax_ylines, halfMax_y + [None]):
+                line.set_visible(value is not None)
+                if value is not None: line.set_ydata([value, value])
+            if Surface:
+                self.line.set_visible(False)
+                extent = (x_values[0, 0], x_values[0, -1], y_values[0, 0], y_values[-1, 0])
+                if self.surface is None:
+                    self.surface = axes.imshow(behavior, origin='lower', extent=extent, aspect='auto', interpolation='bilinear', cmap='viridis')
+                    self.colorbar = self.canvas.fig.colorbar(self.surface, ax=axes)
+                    self.colorbar.set_label('b(U,D)')
+                else:
+                    self.surface.set_data(behavior)
+                    self.surface.set_extent(extent)
+                if (AxesFixed) and (b_M > b_m): self.surface.set_clim(b_m, b_M)
+                else: self.surface.set_clim(behavior.min(), behavior.max())
+                axes.set_ylabel(Selected_sig2)
+                axes.set_xlim(extent[0], extent[1])
+                axes.set_ylim(extent[2], extent[3])
+            else:
+                self.remove_surface()
+                self.line.set_data(x_values, behavior)
+                self.line.set_visible(True)
+                axes.set_ylabel('b(U,D)')
+                axes.set_autoscale_on(True)
+                axes.relim(visible_only=True)
+                axes.autoscale_view()
+                if (  (AxesFixed) and (b_M > b_m) ): axes.set_ylim(b_m, b_M)
+        # Trigger the canvas to update and redraw (the layout only when the labels changed).
+        layout_key = (axes.get_title(), axes.get_xlabel(), axes.get_ylabel(), self.surface is None)
+        if layout_key != self.layout_key:
+            self.layout_key = layout_key
+            self.canvas.fig.tight_layout()
+        self.canvas.draw_idle()
     
 class CSVLoader(QWidget):
     def __init__(self, parent=None):
@@ -286,6 +359,10 @@ class Window_plot_rules(QMainWindow):
         signal_hbox_plot.addWidget(QLabel('Plot the signal:'))
         self.combobox_signal_plot = QComboBox()
         signal_hbox_plot.addWidget( self.combobox_signal_plot )
+        # Second signal: plot the response surface over both signals
+        signal_hbox_plot.addWidget(QLabel('vs:'))
+        self.combobox_signal_plot2 = QComboBox()
+        signal_hbox_plot.addWidget( self.combobox_signal_plot2 )
         # Variance of signals to plot
         signal_hbox_plot.addWidget(QLabel('\t Signal range scale +/- (%):'))
         self.signal_variation = QSpinBox()
@@ -316,8 +393,14 @@ class Window_plot_rules(QMainWindow):
         signal_hbox_plot_options.addWidget( self.float_max_signal )
         self.layout.addLayout(signal_hbox_plot_options)
         # Add the plot
-        self.Figure = MainPlot(self.combobox_cell,self.combobox_behavior,self.combobox_signal_plot,self.layout_behavior_sliders, self.layout_signals, self.checkbox, self.float_min_signal, self.float_max_signal)
+        self.Figure = MainPlot(self.combobox_cell,self.combobox_behavior,self.combobox_signal_plot,self.layout_behavior_sliders, self.layout_signals, self.checkbox, self.float_min_signal, self.float_max_signal, self.combobox_signal_plot2)
         self.layout.addWidget( self.Figure )
+        # Redraw when something changes (the sliders are connected in update_rules)
+        self.combobox_signal_plot.currentIndexChanged.connect(self.Figure.schedule_update)
+        self.combobox_signal_plot2.currentIndexChanged.connect(self.Figure.schedule_update)
+        self.checkbox.stateChanged.connect(self.Figure.schedule_update)
+        self.float_min_signal.valueChanged.connect(self.Figure.schedule_update)
+        self.float_max_signal.valueChanged.connect(self.Figure.schedule_update)
         # Initialize if the dataframe is defined
         if isinstance(dataframe, pd.DataFrame): 
             # Clear the combo box of cells and populate
@@ -398,6 +481,8 @@ class Window_plot_rules(QMainWindow):
         # Clear the combo box of signals to plot
         self.combobox_signal_plot.clear()
         self.combobox_signal_plot.addItems(list_signals)
+        self.combobox_signal_plot2.clear()
+        self.combobox_signal_plot2.addItems(['none'] + list_signals)
         
         # Remove the signals widgets from layout
         while self.layout_signals.count():
@@ -437,6 +522,13 @@ class Window_plot_rules(QMainWindow):
         # Set initial value of plot signal (customizable)
         self.float_min_signal.setValue(halfmax_max*(1-frac_var))
         self.float_max_signal.setValue(halfmax_max*(1+frac_var))
+
+        # Redraw on any slider change
+        for layout in (self.layout_behavior_sliders, self.layout_signals):
+            for i in range(layout.count()):
+                for slider in layout.itemAt(i).widget().findChildren(QSlider):
+                    slider.valueChanged.connect(self.Figure.schedule_update)
+        self.Figure.schedule_update()
     
 
 if __name__ == "__main__":
@@ -0,0 +1,329 @@
+"""
+output_archiver.py - zip (selected) output files for download, off the GUI thread.
+
+Files are deflated in parallel 1 MB chunks (each chunk is an independent raw deflate block sequence, as pigz does),
+already-compressed files (.mat, .png, .svgz, ...) are stored as is, and a small index next to the archive
+remembers what it holds, so a repeated export of a growing output folder only adds the new files.
+
+zipfile has no public way to write a member from data deflated elsewhere, so DeflatedMember does it with zipfile
+internals, on the Python versions it was checked against only; on others files are deflated by zipfile itself,
+one at a time.
+
+Rf. Credits.md
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QProgressDialog
+
+# extensions whose content does not get any smaller by deflating it again
+stored_exts = ('.mat', '.png', '.svgz', '.jpg', '.jpeg', '.gif', '.gz', '.zip', '.mp4')
+
+chunk_size = 1024 * 1024
+
+# Python versions (inclusive) whose zipfile internals DeflatedMember was checked against (tests/test_output_archiver.py)
+deflated_member_versions = ((3, 6), (3, 13))
+
+
+def index_file(zip_path):
+    # hidden, so an output/* pattern does not pick it up
+    head, tail = os.path.split(os.path.abspath(zip_path))
+    return os.path.join(head, '.' + tail + '.index')
+
+
+def select_files(root_dir, patterns, exclude=()):
+    # regular files matching any of the glob patterns (relative to root_dir) -> {arcname: path}, in sorted order
+    exclude = set(os.path.abspath(f) for f in exclude)
+    files = {}
+    for pattern in patterns:
+        for f in glob.glob(os.path.join(root_dir, pattern)):
+            if os.path.isfile(f) and os.path.abspath(f) not in exclude:
+                files[os.path.relpath(f, root_dir)] = f
+    return dict(sorted(files.items()))
+
+
+def file_stamp(fname):
+    st = os.stat(fname)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def read_index(zip_path):
+    # {arcname: [size, mtime_ns]} of what the archive holds, or None if the archive or its index is missing or stale
+    try:
+        with open(index_file(zip_path)) as f:
+            index = json.load(f)
+        with zipfile.ZipFile(zip_path) as zf:
+            if sorted(zf.namelist()) != sorted(index.keys()):
+                return None
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    return index
+
+
+def write_index(zip_path, index):
+    tmp = index_file(zip_path) + '.part'
+    with open(tmp, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp, index_file(zip_path))
+
+
+def deflate_chunk(data, level, last):
+    c = zlib.compressobj(level, zlib.DEFLATED, -15)   # raw deflate, as stored in a zip
+    return c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def deflated_member_supported(zf):
+    return (deflated_member_versions[0] <= sys.version_info[:2] <= deflated_member_versions[1]) and \
+        all(hasattr(zf, name) for name in ('fp', 'start_dir', '_didModify', 'filelist', 'NameToInfo')) and \
+        hasattr(zipfile.ZipInfo, 'FileHeader')
+
+
+class DeflatedMember:
+    # Writes one ZIP_DEFLATED member of zf from raw deflate chunks, i.e., what ZipFile.open(zinfo, 'w') does minus
+    # the compressing. zinfo must hold the CRC and file size of the uncompressed data by the time close() is called.
+    # The only code here that uses zipfile internals; see deflated_member_supported().
+    def __init__(self, zf, zinfo, zip64):
+        self.zf = zf
+        self.zinfo = zinfo
+        self.zip64 = zip64
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.flag_bits = 0   # sizes in the local header, not in a data descriptor
+        zinfo.compress_size = 0
+        zf.fp.seek(zf.start_dir)
+        zinfo.header_offset = zf.fp.tell()
+        zf._didModify = True
+        zf.fp.write(zinfo.FileHeader(zip64))
+
+    def write(self, data):
+        self.zf.fp.write(data)
+        self.zinfo.compress_size += len(data)
+
+    def close(self):
+        zf, zinfo = self.zf, self.zinfo
+        end = zf.fp.tell()
+        zf.fp.seek(zinfo.header_offset)
+        zf.fp.write(zinfo.FileHeader(self.zip64))   # now with the CRC and sizes
+        zf.fp.seek(end)
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+        zf.start_dir = end
+
+    @staticmethod
+    def discard_partial(zf):
+        # drop a partly written member; the central directory goes where the last complete member ends
+        if zf._didModify:
+            zf.fp.seek(zf.start_dir)
+            zf.fp.truncate()
+
+
+def update_archive(zip_path, root_dir, patterns, num_workers=None, level=6, progress=None):
+    # Bring zip_path up to date with the files in root_dir matching patterns.
+    # If no archived file changed or vanished, only the new files are appended; otherwise the archive is rebuilt.
+    # progress(bytes_done, bytes_total) is called as data is written; returning False cancels, keeping the files
+    # archived so far (and the index of them). Returns True if the archive is complete.
+    zip_path = os.path.abspath(zip_path)
+    tmp_path = os.path.join(os.path.dirname(zip_path), '.' + os.path.basename(zip_path) + '.part')
+    files = select_files(root_dir, patterns, exclude=(zip_path, tmp_path, index_file(zip_path)))
+
+    index = read_index(zip_path)
+    if index is not None:
+        for arcname, stamp in index.items():
+            try:
+                if files.get(arcname) is None or file_stamp(files[arcname]) != stamp:
+                    index = None   # a zip member cannot be replaced in place
+                    break
+            except OSError:
+                index = None
+                break
+    if index is None:
+        index = {}
+        mode, out_path = 'w', tmp_path
+    else:
+        mode, out_path = 'a', zip_path
+    todo = [(arcname, f) for arcname, f in files.items() if arcname not in index]
+
+    total = 0
+    for arcname, f in todo:
+        try:
+            total += os.path.getsize(f)
+        except OSError:
+            pass
+    if num_workers is None:
+        num_workers = min(8, os.cpu_count() or 1)
+    window = 4 * num_workers   # chunks in flight, which bounds the memory used
+
+    done = 0
+    complete = True
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="output_archiver") as executor, \
+            zipfile.ZipFile(out_path, mode, zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        parallel = deflated_member_supported(zf)
+
+        def items():
+            # read the files in order, handing each chunk to a worker as soon as it is read
+            for arcname, f in todo:
+                try:
+                    zinfo = zipfile.ZipInfo.from_file(f, arcname)
+                    stamp = file_stamp(f)
+                    if os.path.splitext(f)[1].lower() in stored_exts:
+                        yield ('stored', zinfo, stamp, f, zinfo.file_size)
+                        continue
+                    if not parallel:
+                        yield ('deflated', zinfo, stamp, f, zinfo.file_size)
+                        continue
+                    fh = open(f, 'rb')
+                except OSError as e:
+                    print(f"output_archiver.py: skipping {f}: {e}")
+                    continue
+                with fh:
+                    zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+                    zinfo.CRC = 0
+                    zinfo.file_size = 0
+                    data = fh.read(chunk_size)
+                    first = True
+                    while True:
+                        next_data = fh.read(chunk_size)
+                        last = not next_data
+                        zinfo.CRC = zlib.crc32(data, zinfo.CRC)
+                        zinfo.file_size += len(data)
+                        future = executor.submit(deflate_chunk, data, level, last)
+                        yield ('chunk', zinfo, stamp, (future, zip64, first, last), len(data))
+                        if last:
+                            break
+                        data = next_data
+                        first = False
+
+        member = None
+
+        def write_item(item):
+            nonlocal member
+            kind, zinfo, stamp, job, nbytes = item
+            if kind == 'stored':
+                zf.write(job, zinfo.filename, compress_type=zipfile.ZIP_STORED)
+                index[zinfo.filename] = stamp
+                return nbytes
+            if kind == 'deflated':
+                zf.write(job, zinfo.filename, compress_type=zipfile.ZIP_DEFLATED, compresslevel=level)
+                index[zinfo.filename] = stamp
+                return nbytes
+            future, zip64, first, last = job
+            if first:
+                member = DeflatedMember(zf, zinfo, zip64)
+            member.write(future.result())
+            if last:
+                member.close()
+                member = None
+                index[zinfo.filename] = stamp
+            return nbytes
+
+        queue = deque()
+        try:
+            for item in items():
+                queue.append(item)
+                while len(queue) > window:
+                    done += write_item(queue.popleft())
+                    if progress is not None and progress(done, total) is False:
+                        complete = False
+                        break
+                if not complete:
+                    break
+            while complete and queue:
+                done += write_item(queue.popleft())
+                if progress is not None and progress(done, total) is False:
+                    complete = False
+        finally:
+            for item in queue:
+                if item[0] == 'chunk':
+                    item[3][0].cancel()
+            if parallel:
+                DeflatedMember.discard_partial(zf)
+
+    if out_path != zip_path:
+        os.replace(out_path, zip_path)
+    write_index(zip_path, index)
+    return complete
+
+
+class ArchiveJob(QThread):
+    progress = pyqtSignal(int)   # percent done
+    done = pyqtSignal(str, str)  # archive path, error message ('' on success)
+
+    def __init__(self, zip_path, root_dir, patterns, post=None, parent=None):
+        super().__init__(parent)
+        self.zip_path = zip_path
+        self.root_dir = root_dir
+        self.patterns = patterns
+        self.post = post        # called with the archive path on this thread once it is written, e.g. Galaxy's put()
+        self.cancelled = threading.Event()
+        self.percent = -1
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def report(self, done, total):
+        percent = int(100 * done / total) if total else 100
+        if percent != self.percent:
+            self.percent = percent
+            self.progress.emit(percent)
+        return not self.cancelled.is_set()
+
+    def run(self):
+        try:
+            if not update_archive(self.zip_path, self.root_dir, self.patterns, progress=self.report):
+                self.done.emit(self.zip_path, f"Creating {self.zip_path} was canceled")
+                return
+        except Exception as e:
+            self.done.emit(self.zip_path, f"Error zipping {self.patterns} into {self.zip_path}: {e}")
+            return
+        if self.post is not None:
+            try:
+                self.post(self.zip_path)
+            except Exception as e:
+                self.done.emit(self.zip_path, f"Error: {self.post.__name__}({self.zip_path}): {e}")
+                return
+        self.done.emit(self.zip_path, '')
+
+
+def start_archive_job(self, zip_name, patterns, root_dir='.', post=None, finished=None):
+    # self is the Studio main window; one archive job at a time.
+    # finished(zip_name) is called on the GUI thread once the archive (and post) succeeded.
+    job = getattr(self, 'archive_job', None)
+    if job is not None and job.isRunning():
+        self.show_error_message(f"Still creating {job.zip_path}; please wait until it completes.")
+        return
+
+    job = ArchiveJob(zip_name, root_dir, patterns, post=post, parent=self)
+
+    # progress, with a Cancel button, shown if the job takes more than a moment; the Studio stays usable meanwhile
+    dialog = QProgressDialog(f"Creating {zip_name} ...", "Cancel", 0, 100, self)
+    dialog.setWindowTitle("Export")
+    dialog.setWindowModality(Qt.NonModal)
+    dialog.setMinimumDuration(1000)
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+    dialog.setValue(0)
+    dialog.canceled.connect(job.cancel)
+
+    def done_cb(zip_path, error):
+        dialog.canceled.disconnect(job.cancel)
+        dialog.close()
+        dialog.deleteLater()
+        if error and job.cancelled.is_set():
+            print(f"output_archiver.py: {error}")   # the user canceled; files archived so far are kept for the next export
+        elif error:
+            self.show_error_message(error)
+        elif finished is not None:
+            finished(zip_name)
+
+    self.archive_job = job
+    self.archive_job.progress.connect(dialog.setValue)
+    self.archive_job.done.connect(done_cb)
+    self.archive_job.start()
@@ -0,0 +1,154 @@
+"""
+output_watcher.py - follow the output folder of a running simulation and report each fully written frame once.
+
+Rf. Credits.md
+"""
+
+import os
+import re
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+from loader_service import LoaderService
+from pyMCDS_timeseries import get_timeseries
+
+xml_name_re = re.compile(r'^output(\d{8})\.xml$')
+svg_name_re = re.compile(r'^snapshot(\d{8})\.svg$')
+
+
+def file_is_complete(fname, end_tag):
+    # PhysiCell writes a frame's .mat files before its .xml, so a closed .xml (or .svg) means the frame is complete.
+    try:
+        with open(fname, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 256))
+            return end_tag in f.read()
+    except OSError:
+        return False
+
+
+def add_frames(ts, names):
+    # runs on the loader thread: read the new frames into the population time series
+    added = []
+    for name in names:
+        try:
+            ts.add_frame(name)
+        except Exception as e:
+            print(f"output_watcher.py: add_frames(): unable to read {name} yet: {e}")
+            continue
+        added.append(name)
+    return names, added
+
+
+class OutputWatcher(QObject):
+    frames_added = pyqtSignal(list)     # outputNNNNNNNN.xml names of newly completed frames
+    snapshots_added = pyqtSignal(list)  # snapshotNNNNNNNN.svg names of newly completed snapshots
+
+    def __init__(self, output_dir, debounce_ms=500, poll_ms=2000, parent=None):
+        super().__init__(parent)
+        self.output_dir = os.path.abspath(output_dir)
+        self.xml_frames = []   # sorted frame numbers
+        self.svg_frames = []
+        self.known = set()     # file names already reported
+        self.pending = set()   # frame file names being read on the loader
+        self.ts = None
+        self.loader = LoaderService(num_workers=1, parent=self)   # one worker: frames are added in order
+        self.num_batches = 0
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed_cb)
+
+        # coalesce the burst of change events PhysiCell causes while writing one frame
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self.scan)
+
+        # fallback for (network) file systems that do not deliver change notifications
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_ms)
+        self.poll_timer.timeout.connect(self.scan)
+
+    def start(self):
+        self.xml_frames = []
+        self.svg_frames = []
+        self.known = set()
+        self.pending = set()
+        # the store is brought up to date (frames left from a previous run in this folder are dropped) on the
+        # loader, ahead of the first scan's frames; from then on the watcher keeps it current
+        self.ts = get_timeseries(self.output_dir, update=False)
+        self.ts.follow = True
+        self.loader.submit('update', self.ts.update)
+        if os.path.isdir(self.output_dir):
+            self.watcher.addPath(self.output_dir)
+        self.poll_timer.start()
+        self.scan()
+
+    def stop(self):
+        # pick up frames written just before the process ended
+        self.scan()
+        self.debounce_timer.stop()
+        self.poll_timer.stop()
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        if self.ts is not None:
+            self.ts.follow = False
+
+    def is_watching(self, output_dir):
+        return self.poll_timer.isActive() and (os.path.abspath(output_dir) == self.output_dir)
+
+    def directory_changed_cb(self, path):
+        self.debounce_timer.start()   # restarts if already pending
+
+    def scan(self):
+        new_xml = []
+        new_svg = []
+        try:
+            entries = os.scandir(self.output_dir)
+        except OSError:
+            return
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if name in self.known:
+                    continue
+                m = xml_name_re.match(name)
+                if m:
+                    if file_is_complete(entry.path, b'</MultiCellDS>'):
+                        new_xml.append((int(m.group(1)), name))
+                    continue
+                m = svg_name_re.match(name)
+                if m and file_is_complete(entry.path, b'</svg>'):
+                    new_svg.append((int(m.group(1)), name))
+
+        # only the new frames are parsed, on the loader, and reported once they are in the population time series
+        names = [name for frame, name in sorted(new_xml) if name not in self.pending]
+        if names and (self.ts is not None):
+            self.pending.update(names)
+            self.num_batches += 1   # a channel per batch, so no batch supersedes another
+            self.loader.submit(('frames', self.num_batches), add_frames, self.ts, names,
+                               on_done=self.frames_added_cb, on_error=lambda e, names=names: self.pending.difference_update(names))
+
+        for frame, name in sorted(new_svg):
+            self.known.add(name)
+            self.svg_frames.append(frame)
+
+        self.svg_frames.sort()
+        if new_svg:
+            self.snapshots_added.emit([name for frame, name in sorted(new_svg)])
+
+    def frames_added_cb(self, result):
+        names, added = result
+        self.pending.difference_update(names)   # frames that could not be read yet are retried by the next scan
+        for name in added:
+            self.known.add(name)
+            self.xml_frames.append(int(xml_name_re.match(name).group(1)))
+        self.xml_frames.sort()
+        if added:
+            self.frames_added.emit(added)
+
+    def last_xml_frame(self):
+        return self.xml_frames[-1] if self.xml_frames else None
+
+    def last_svg_frame(self):
+        return self.svg_frames[-1] if self.svg_frames else None
@@ -0,0 +1,87 @@
+"""
+positions_writer.py - write cell positions .csv files (x,y,z,type name) for initial conditions, shared by
+the ICs tab, the Bioinformatics Walkthrough and the Plot tab's cells .csv export.
+
+Rows are formatted a chunk at a time with one %-operation per chunk (the same text as f'{x},{y},{z},{name}'),
+on worker processes for multi-million cell files. A name ending in .gz is gzipped. An optional binary
+sidecar (<file>.npz) holds the same cells, so the Studio can re-import them without parsing text. The
+sidecar records the size and mtime (ns) of the file it was written with, and is only used while they match.
+
+Rf. Credits.md
+"""
+
+import gzip
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+header_v2 = 'x,y,z,type'
+chunk_rows = 100000
+parallel_rows = 1000000   # use worker processes from this many rows on (and more than one cpu)
+
+
+def sidecar_file(fname):
+    return fname + '.npz'
+
+
+def file_stat(fname):
+    # size and mtime (ns) of fname, stored in its sidecar
+    st = os.stat(fname)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def positions_from_dict(positions_d):
+    # {type name: (n,3) array} -> (xyz, type codes, type names), keeping the dict order
+    names = list(positions_d.keys())
+    arrays = [np.asarray(positions_d[name], dtype=float).reshape(-1, 3) for name in names]
+    xyz = np.concatenate(arrays) if arrays else np.empty((0, 3))
+    codes = np.repeat(np.arange(len(names)), [len(a) for a in arrays])
+    return xyz, codes, names
+
+
+def format_chunk(xyz, codes, names):
+    # the text of rows x,y,z,name (floats as repr, like an f-string)
+    templates = np.array(['%r,%r,%r,' + str(name).replace('%', '%%') + '\n' for name in names], dtype=object)
+    return ''.join(templates[codes]) % tuple(xyz.ravel().tolist())
+
+
+def write_positions(fname, xyz, codes, names, header=header_v2, mode='w', sidecar=False, num_workers=None):
+    # Write (or with mode='a', append) rows x,y,z,names[code]. The header line is only written by mode 'w'.
+    # sidecar=True also writes <fname>.npz (mode 'w' only, and it is removed by an append, which would make it stale).
+    xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+    codes = np.asarray(codes, dtype=np.int64)
+    chunks = [(xyz[i:i+chunk_rows], codes[i:i+chunk_rows]) for i in range(0, len(xyz), chunk_rows)]
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    opener = gzip.open if fname.endswith('.gz') else open
+
+    with opener(fname, mode + 't', newline='') as f:
+        if mode == 'w' and header:
+            f.write(header + '\n')
+        if len(xyz) >= parallel_rows and num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                for text in executor.map(format_chunk, [c[0] for c in chunks], [c[1] for c in chunks], [names]*len(chunks)):
+                    f.write(text)
+        else:
+            for chunk_xyz, chunk_codes in chunks:
+                f.write(format_chunk(chunk_xyz, chunk_codes, names))
+
+    if sidecar and mode == 'w':
+        with open(sidecar_file(fname), 'wb') as f:   # np.savez would add .npz to a name not ending in it
+            np.savez(f, xyz=xyz, codes=codes, names=np.array([str(name) for name in names]), stat=file_stat(fname))
+    elif os.path.isfile(sidecar_file(fname)):
+        os.remove(sidecar_file(fname))
+
+
+def read_sidecar(fname):
+    # (xyz, names per cell) from <fname>.npz if fname is unchanged since the sidecar was written, else None
+    side = sidecar_file(fname)
+    try:
+        with np.load(side) as data:
+            if not np.array_equal(data['stat'], file_stat(fname)):
+                return None
+            return data['xyz'], data['names'][data['codes']]
+    except (OSError, KeyError, ValueError):
+        return None
@@ -36,21 +36,543 @@ def graphfile_parser(s_pathfile):
     description:
         code parses PhysiCell's own graphs format and
         returns the content in a dictionary object.
+        the dictionary is a lazy graph_dict view of the
+        CSR arrays from graphfile_csr_parser.
     """
-    # processing
-    dei_graph = {}
-    f = open(s_pathfile)
-    for i, s_line in enumerate(f):
-        #print('processing line:', s_line.strip())
-        s_key, s_value = s_line.strip().split(':')
-        ei_value = set()
-        if len(s_value.strip()) :
-            ei_value = set([int(s_id) for s_id in s_value.split(',')])
-        dei_graph.update({int(s_key): ei_value})
-    f.close()
+    # output
+    return(graph_dict(*graphfile_csr_parser(s_pathfile)))
+
+
+def graphfile_csr_parser(s_pathfile):
+    """
+    input:
+        s_pathfile: string
+            path to and file name from graph.txt file.
+
+    output:
+        ai_id: numpy array of int32
+            cell ID of each graph file line (row).
+
+        ai_indptr: numpy array of int32
+            row offsets; the connected cell IDs of row r are
+            ai_indices[ai_indptr[r]:ai_indptr[r+1]].
+
+        ai_indices: numpy array of int32
+            connected cell IDs of all rows, one after the other.
+
+    description:
+        code parses PhysiCell's own graphs format into
+        compressed sparse row (CSR) arrays. the line structure is
+        found with numpy on the raw bytes, and all cell IDs are
+        converted in one np.fromstring call, so there is no python
+        object per line or per edge.
+    """
+    with open(s_pathfile, 'rb') as f:
+        by_text = f.read()
+    # the appended '#' is a non whitespace sentinel behind the last line
+    au_text = np.frombuffer(by_text + b'\n#', dtype=np.uint8).copy()
+
+    # line ends, skipping blank lines
+    ai_end = np.flatnonzero(au_text == ord('\n'))
+    ai_start = np.concatenate([[0], ai_end[:-1] + 1])
+    ai_solid = np.flatnonzero(au_text > ord(' '))
+    ab_line = ai_solid[np.searchsorted(ai_solid, ai_start)] < ai_end
+    ai_end = ai_end[ab_line]
+    ai_colon = np.flatnonzero(au_text == ord(':'))
+    if len(ai_colon) != len(ai_end):
+        raise ValueError(f'Error @ pyMCDS.graphfile_csr_parser : expected one "id: id,id,..." record per line in {s_pathfile}.')
+
+    # number of connected cells per line
+    ab_value = ai_solid[np.searchsorted(ai_solid, ai_colon + 1)] < ai_end
+    ai_comma = np.flatnonzero(au_text == ord(','))
+    ai_count = np.where(ab_value, np.searchsorted(ai_comma, ai_end) - np.searchsorted(ai_comma, ai_colon) + 1, 0)
+
+    # turn the whole file into one comma separated list: id,id,id,...,id,id,...
+    au_text[ai_colon[ab_value]] = ord(',')
+    au_text[ai_colon[~ab_value]] = ord(' ')
+    au_text[ai_end] = ord(',')
+    ai_token = np.zeros(0, dtype=np.int64)
+    if len(ai_end) > 0:
+        ai_token = np.fromstring(au_text[:ai_end[-1]].tobytes().decode('ascii'), dtype=np.int64, sep=',')
+    ai_row = np.concatenate([[0], np.cumsum(ai_count + 1)])
+    if len(ai_token) != ai_row[-1]:
+        raise ValueError(f'Error @ pyMCDS.graphfile_csr_parser : unable to read all cell IDs from {s_pathfile}.')
+
+    # split into line ids and connected ids
+    ab_id = np.zeros(len(ai_token), dtype=bool)
+    ab_id[ai_row[:-1]] = True
+    ai_id = ai_token[ab_id].astype(np.int32)
+    ai_indices = ai_token[~ab_id].astype(np.int32)
+    ai_indptr = np.concatenate([[0], np.cumsum(ai_count)]).astype(np.int32)
 
     # output
-    return(dei_graph)
+    return(ai_id, ai_indptr, ai_indices)
+
+
+def graph_edge_parser(ai_id, ai_indptr, ai_indices, undirected=True):
+    """
+    input:
+        ai_id, ai_indptr, ai_indices: numpy arrays of int32
+            graph in CSR format, as returned by graphfile_csr_parser.
+
+        undirected: boole; default True
+            if True, each connection is listed only once,
+            as (lower cell ID, higher cell ID) pair.
+
+    output:
+        aai_edge: 2D numpy array of int32
+            one (cell ID, connected cell ID) row per edge.
+            undirected edges are sorted.
+
+    description:
+        code turns a CSR graph into an edge list, e.g. for drawing
+        all edges with one matplotlib LineCollection.
+    """
+    ai_source = np.repeat(ai_id, np.diff(ai_indptr)).astype(np.int64)
+    ai_target = ai_indices.astype(np.int64)
+    if undirected:
+        ai_low = np.minimum(ai_source, ai_target)
+        ai_high = np.maximum(ai_source, ai_target)
+        # one int64 per pair, sorted, drop repeats
+        ai_pair = np.sort((ai_low << 32) | (ai_high & 0xffffffff))
+        ai_pair = ai_pair[np.concatenate([[True], ai_pair[1:] != ai_pair[:-1]])]
+        ai_source = ai_pair >> 32
+        ai_target = ai_pair & 0xffffffff
+    aai_edge = np.empty((len(ai_source), 2), dtype=np.int32)
+    aai_edge[:, 0] = ai_source
+    aai_edge[:, 1] = ai_target
+
+    # output
+    return(aai_edge)
+
+
+class graph_dict(dict):
+    """
+    input:
+        ai_id, ai_indptr, ai_indices: numpy arrays of int32
+            graph in CSR format, as returned by graphfile_csr_parser.
+
+    output:
+        graph: graph_dict class instance
+            dictionary of sets of integers, mapping each cell ID
+            to connected cell IDs, as stored at
+            mcds.data['discrete_cells']['graph'].
+
+    description:
+        graph_dict is a lazy dictionary view of a CSR graph.
+        a cell's set is only built when the cell is looked up,
+        all sets are only built when the whole dictionary is walked
+        or modified. the CSR arrays stay available at graph.csr.
+    """
+    def __init__(self, ai_id, ai_indptr, ai_indices):
+        super().__init__()
+        self.csr = (ai_id, ai_indptr, ai_indices)
+        self._b_complete = len(ai_id) == 0
+        self._ai_order = None
+
+    def _row(self, key):
+        # last line wins, as with dict.update
+        ai_id = self.csr[0]
+        if self._ai_order is None:
+            self._ai_order = np.argsort(ai_id, kind='stable')
+        try:
+            i_key = int(key)
+        except (TypeError, ValueError):
+            return None
+        i_pos = np.searchsorted(ai_id, i_key, side='right', sorter=self._ai_order) - 1
+        if (i_pos < 0) or (ai_id[self._ai_order[i_pos]] != i_key):
+            return None
+        return self._ai_order[i_pos]
+
+    def __missing__(self, key):
+        if self._b_complete:
+            raise KeyError(key)
+        i_row = self._row(key)
+        if i_row is None:
+            raise KeyError(key)
+        ai_id, ai_indptr, ai_indices = self.csr
+        ei_value = set(ai_indices[ai_indptr[i_row]:ai_indptr[i_row+1]].tolist())
+        dict.__setitem__(self, int(key), ei_value)
+        return ei_value
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        return (not self._b_complete) and (self._row(key) is not None)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def _materialize(self):
+        if not self._b_complete:
+            # file order, keeping the sets already handed out
+            ai_id, ai_indptr, ai_indices = self.csr
+            li_indices = ai_indices.tolist()
+            li_indptr = ai_indptr.tolist()
+            dei_graph = {}
+            for i_row, i_id in enumerate(ai_id.tolist()):
+                dei_graph[i_id] = set(li_indices[li_indptr[i_row]:li_indptr[i_row+1]])
+            for i_id in dict.keys(self):
+                dei_graph[i_id] = dict.__getitem__(self, i_id)
+            dict.clear(self)
+            dict.update(self, dei_graph)
+            self._b_complete = True
+        return self
+
+    # walking over, comparing, or modifying the graph materializes all sets
+    def __iter__(self): return dict.__iter__(self._materialize())
+    def __len__(self): return dict.__len__(self._materialize())
+    def __eq__(self, other): return dict.__eq__(self._materialize(), other)
+    def __ne__(self, other): return dict.__ne__(self._materialize(), other)
+    def __repr__(self): return dict.__repr__(self._materialize())
+    def keys(self): return dict.keys(self._materialize())
+    def values(self): return dict.values(self._materialize())
+    def items(self): return dict.items(self._materialize())
+    def copy(self): return dict(self.items())
+    def __setitem__(self, key, value): dict.__setitem__(self._materialize(), key, value)
+    def __delitem__(self, key): dict.__delitem__(self._materialize(), key)
+    def pop(self, *args): return dict.pop(self._materialize(), *args)
+    def popitem(self): return dict.popitem(self._materialize())
+    def setdefault(self, *args): return dict.setdefault(self._materialize(), *args)
+    def update(self, *args, **kwargs): dict.update(self._materialize(), *args, **kwargs)
+    def clear(self): dict.clear(self._materialize())
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()),))
+
+
+def voxel_ijk_parser(ar_mnp_coordinate, lar_mnp_axis):
+    """
+    input:
+        ar_mnp_coordinate: numpy array of floating point numbers
+            3 x n voxel center coordinates, as stored in the
+            first three rows of the initial_mesh mat file.
+
+        lar_mnp_axis: list of 3 numpy arrays of floating point numbers
+            sorted m-axis, n-axis, and p-axis mesh center coordinates.
+
+    output:
+        tai_ijk: tuple of 3 numpy arrays of integer numbers
+            i, j, and k voxel index for each mat file column.
+
+    description:
+        code maps each voxel center to its i, j, k voxel index
+        with one binary search per axis, instead of one linear
+        search per voxel and axis.
+    """
+    lai_ijk = []
+    for ar_coor, ar_axis in zip(ar_mnp_coordinate, lar_mnp_axis):
+        # tolerance as in the original per voxel np.where search
+        ai_index = np.searchsorted(ar_axis, ar_coor - 1e-10, side='left')
+        lai_ijk.append(np.clip(ai_index, 0, len(ar_axis) - 1))
+
+    # output
+    return(tuple(lai_ijk))
+
+
+def matfile_v4_parser(s_pathfile, s_variable, li_row):
+    """
+    input:
+        s_pathfile: string
+            path to and file name from a mat file.
+
+        s_variable: string
+            name of the matrix stored in the mat file.
+
+        li_row: list of integers
+            indices of the matrix rows to read.
+
+    output:
+        aar_row: 2D numpy array of floating point numbers or None
+            the requested rows, as a copy, or None if the file is not
+            a MAT level 4 file holding a full real little endian double matrix.
+
+    description:
+        PhysiCell writes its mat files in the MAT level 4 format:
+        a 20 byte header, the matrix name, and then the data column by column.
+        code memory maps the data block and copies only the requested rows,
+        the map is released before returning, so the file is not held open.
+    """
+    with open(s_pathfile, 'rb') as f:
+        ai_header = np.frombuffer(f.read(20), dtype='<i4')
+        if len(ai_header) < 5:
+            return None
+        i_mopt, i_row, i_col, i_imagf, i_namlen = [int(i) for i in ai_header]
+        if (i_mopt != 0) or (i_imagf != 0) or (i_namlen < 1) or (i_namlen > 64):
+            return None
+        s_name = f.read(i_namlen).rstrip(b'\x00').decode('ascii', errors='replace')
+    if s_name != s_variable:
+        return None
+    i_offset = 20 + i_namlen
+    if i_row * i_col == 0:
+        return np.zeros((len(li_row), i_col))
+
+    # one matrix column (all variables of one cell) is contiguous on disk
+    aar_data = np.memmap(s_pathfile, dtype='<f8', mode='r', offset=i_offset, shape=(i_col, i_row))
+    aar_row = np.array(aar_data[:, li_row].T)
+    del aar_data
+
+    # output
+    return(aar_row)
+
+
+def _read_only(o_value):
+    """
+    internal function that write protects numpy arrays,
+    also when they are stored in a list or tuple.
+    """
+    if isinstance(o_value, np.ndarray):
+        o_value.flags.writeable = False
+    elif isinstance(o_value, (list, tuple)):
+        for o_element in o_value:
+            _read_only(o_element)
+    return o_value
+
+
+class mesh_dict(dict):
+    """
+    input:
+        lar_coordinate: list of 3 numpy arrays of floating point numbers
+            x, y, and z mesh center coordinates, as listed in the xml file.
+
+        voxelpathfile: pathlib.Path; default None
+            initial_mesh mat file, for a mesh whose mnp_coordinate and
+            volumes are only read when first asked for.
+
+        xmlpathfile: string; default ''
+            xml file that references the mesh, for the error message.
+
+    output:
+        mesh: mesh_dict class instance
+            read only dictionary, as stored at mcds.data['mesh'].
+
+    description:
+        mesh_dict is the dictionary that holds the mesh data of one
+        output folder. it is shared by reference across all frames,
+        so it can not be modified. the mnp_grid meshgrids, the
+        voxel index map, and, with a voxelpathfile, the voxel
+        coordinates and volumes are only materialized when first asked for.
+    """
+    def __init__(self, lar_coordinate, *args, voxelpathfile=None, xmlpathfile='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lar_coordinate = lar_coordinate
+        self._voxelpathfile = voxelpathfile
+        self._xmlpathfile = xmlpathfile
+        self._tai_voxel_ijk = None
+
+    def _lazy_keys(self):
+        # the voxel data is only listed while its mat file can be read
+        ls_key = ['mnp_grid']
+        if (self._voxelpathfile is not None) and (dict.__contains__(self, 'volumes') or self._voxelpathfile.is_file()):
+            ls_key += ['mnp_coordinate', 'volumes']
+        return ls_key
+
+    def __missing__(self, key):
+        if (key != 'mnp_grid') and ((self._voxelpathfile is None) or (key not in ['mnp_coordinate', 'volumes'])):
+            raise KeyError(key)
+        if key == 'mnp_grid':
+            # reshape into a meshgrid
+            ar_x_coor, ar_y_coor, ar_z_coor = self._lar_coordinate
+            aar_grid = _read_only(np.array(np.meshgrid(ar_x_coor, ar_y_coor, ar_z_coor, indexing='xy')))
+            dict.__setitem__(self, key, aar_grid)
+            return aar_grid
+        # voxel data must be loaded from .mat file
+        ar_coordinate, ar_volume = voxelfile_parser(self._voxelpathfile, xmlpathfile=self._xmlpathfile)
+        dict.__setitem__(self, 'mnp_coordinate', ar_coordinate)
+        dict.__setitem__(self, 'volumes', ar_volume)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return (key in self._lazy_keys()) or super().__contains__(key)
+
+    def _materialize(self):
+        for key in self._lazy_keys():
+            self[key]
+        return self
+
+    # walking over the whole mesh materializes the grid
+    def __iter__(self): return dict.__iter__(self._materialize())
+    def __len__(self): return dict.__len__(self._materialize())
+    def keys(self): return dict.keys(self._materialize())
+    def values(self): return dict.values(self._materialize())
+    def items(self): return dict.items(self._materialize())
+    def get(self, key, default=None): return self[key] if key in self else default
+
+    def __reduce__(self):
+        return (mesh_dict, (self._lar_coordinate, dict(self.items())))
+
+    def _read_only_error(self, *args, **kwargs):
+        raise TypeError('Error @ pyMCDS.mesh_dict : the mesh is shared across frames and can not be modified.')
+
+    __setitem__ = _read_only_error
+    __delitem__ = _read_only_error
+    pop = _read_only_error
+    popitem = _read_only_error
+    clear = _read_only_error
+    update = _read_only_error
+    setdefault = _read_only_error
+
+    def grid_shape(self):
+        """
+        output:
+            ti_shape: tuple of 3 integers
+                shape of a mnp_grid meshgrid, without materializing it.
+        """
+        ar_x_coor, ar_y_coor, ar_z_coor = self._lar_coordinate
+        return (len(ar_y_coor), len(ar_x_coor), len(ar_z_coor))
+
+    def voxel_ijk(self):
+        """
+        output:
+            tai_ijk: tuple of 3 numpy arrays of integer numbers
+                i, j, and k voxel index for each mat file column.
+        """
+        if self._tai_voxel_ijk is None:
+            self._tai_voxel_ijk = _read_only(voxel_ijk_parser(
+                ar_mnp_coordinate = self['mnp_coordinate'],
+                lar_mnp_axis = self['mnp_axis'],
+            ))
+        return self._tai_voxel_ijk
+
+
+def voxelfile_parser(voxelpathfile, xmlpathfile='', verbose=False):
+    """
+    input:
+        voxelpathfile: pathlib.Path
+            path to and file name of the initial_mesh mat file.
+
+        xmlpathfile: string; default ''
+            xml file that references the mesh, for the error message.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        ar_coordinate: 2D numpy array of floating point numbers
+            read only x, y, and z voxel center coordinates.
+
+        ar_volume: numpy array of floating point numbers
+            read only voxel volumes.
+    """
+    try:
+        initial_mesh = io.loadmat(voxelpathfile)['mesh']
+        if verbose:
+            print(f'reading: {voxelpathfile}')
+    except:
+        raise FileNotFoundError(f'Error @ pyMCDS._read_xml : no such file or directory: {voxelpathfile}\nreferenced in: {xmlpathfile}.')
+
+    # center of voxel specified by first three rows [ x, y, z ]
+    # volume specified by fourth row
+    return _read_only(initial_mesh[:3, :]), _read_only(initial_mesh[3, :])
+
+
+# mesh registry, keyed by the resolved initial_mesh path file, holding (key, mesh) with the
+# size, modification time, and mesh coordinates as key. the mesh does not change during a run,
+# so all frames of an output folder share one mesh. a rerun replaces the folder's entry,
+# so the mesh of an older run is freed once no frame of it is left.
+do_mesh = {}
+
+def mesh_parser(voxelpathfile, ar_x_coor, ar_y_coor, ar_z_coor, ar_bboxcoor, xmlpathfile='', verbose=False, lazy=False):
+    """
+    input:
+        voxelpathfile: pathlib.Path
+            path to and file name of the initial_mesh mat file.
+
+        ar_x_coor, ar_y_coor, ar_z_coor: numpy arrays of floating point numbers
+            x, y, and z mesh center coordinates, as listed in the xml file.
+
+        ar_bboxcoor: numpy array of floating point numbers
+            mesh bounding box [xmin, ymin, zmin, xmax, ymax, zmax].
+
+        xmlpathfile: string; default ''
+            xml file that references the mesh, for the error message.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+        lazy: boole; default False
+            if True, the initial_mesh mat file is only read when
+            mnp_coordinate or volumes are first asked for,
+            and the mesh can be built without it.
+
+    output:
+        mesh: mesh_dict class instance
+            the read only mesh, shared with all other frames
+            that reference the same unchanged initial_mesh file.
+
+    description:
+        function returns the mesh from the registry, and only
+        builds it, and reads the initial_mesh mat file, if the
+        mesh was not seen before.
+    """
+    try:
+        o_stat = pathlib.Path(voxelpathfile).stat()
+        t_stat = (o_stat.st_size, o_stat.st_mtime_ns)
+    except FileNotFoundError:
+        if not lazy:
+            raise FileNotFoundError(f'Error @ pyMCDS._read_xml : no such file or directory: {voxelpathfile}\nreferenced in: {xmlpathfile}.')
+        t_stat = None
+    s_voxelpathfile = str(pathlib.Path(voxelpathfile).resolve())
+    t_key = (
+        t_stat,
+        ar_x_coor.tobytes(), ar_y_coor.tobytes(), ar_z_coor.tobytes(), ar_bboxcoor.tobytes(),
+    )
+    t_entry = do_mesh.get(s_voxelpathfile)
+    if (t_entry is not None) and (t_entry[0] == t_key):
+        return t_entry[1]
+
+    d_mesh = {}
+
+    # get mesh center axis
+    d_mesh['mnp_axis'] = [
+        np.unique(ar_x_coor),
+        np.unique(ar_y_coor),
+        np.unique(ar_z_coor),
+    ]
+
+    # get mesh center range
+    d_mesh['mnp_range'] = [
+       (d_mesh['mnp_axis'][0].min(), d_mesh['mnp_axis'][0].max()),
+       (d_mesh['mnp_axis'][1].min(), d_mesh['mnp_axis'][1].max()),
+       (d_mesh['mnp_axis'][2].min(), d_mesh['mnp_axis'][2].max()),
+    ]
+
+    # get voxel range
+    d_mesh['ijk_range'] = [
+        (0, len(d_mesh['mnp_axis'][0]) - 1),
+        (0, len(d_mesh['mnp_axis'][1]) - 1),
+        (0, len(d_mesh['mnp_axis'][2]) - 1),
+    ]
+
+    # get voxel axis
+    d_mesh['ijk_axis'] = [
+        np.array(range(d_mesh['ijk_range'][0][1] + 1)),
+        np.array(range(d_mesh['ijk_range'][1][1] + 1)),
+        np.array(range(d_mesh['ijk_range'][2][1] + 1)),
+    ]
+
+    # get mesh bounding box range [xmin, ymin, zmin, xmax, ymax, zmax]
+    d_mesh['xyz_range'] = [
+        (ar_bboxcoor[0], ar_bboxcoor[3]),
+        (ar_bboxcoor[1], ar_bboxcoor[4]),
+        (ar_bboxcoor[2], ar_bboxcoor[5]),
+    ]
+
+    # voxel data must be loaded from .mat file
+    if not lazy:
+        d_mesh['mnp_coordinate'], d_mesh['volumes'] = voxelfile_parser(voxelpathfile, xmlpathfile=xmlpathfile, verbose=verbose)
+
+    for o_value in d_mesh.values():
+        _read_only(o_value)
+    lar_coordinate = _read_only([ar_x_coor.copy(), ar_y_coor.copy(), ar_z_coor.copy()])
+    if lazy:
+        mesh = mesh_dict(lar_coordinate, d_mesh, voxelpathfile=pathlib.Path(voxelpathfile), xmlpathfile=xmlpathfile)
+    else:
+        mesh = mesh_dict(lar_coordinate, d_mesh)
+    do_mesh[s_voxelpathfile] = (t_key, mesh)
+
+    # output
+    return mesh
 
 
 # object classes
@@ -77,6 +599,12 @@ class pyMCDS:
         verbose: boole; default True
             setting verbose to False for less text output, while processing.
 
+        columns: list of strings; default None
+            cell variables to load. None loads all variables.
+            ID and position_x, _y, _z are always loaded.
+            with a few columns out of many custom variables, only those
+            rows are read from the cells mat file.
+
     output:
         mcds: pyMCDS class instance
             all fetched content is stored at mcds.data.
@@ -91,10 +619,11 @@ class pyMCDS:
         the same directory. data is loaded by reading the xml file
         for a particular time step and the therein referenced files.
     """
-    def __init__(self, xmlfile, output_path='.', microenv=True, graph=True, verbose=True):
+    def __init__(self, xmlfile, output_path='.', microenv=True, graph=True, verbose=True, columns=None):
         self.microenv = microenv
         self.graph = graph
         self.verbose = verbose
+        self.columns = columns
         self.data = self._read_xml(xmlfile, output_path)
 
 
@@ -894,6 +1423,44 @@ class pyMCDS:
         return self.data['discrete_cells']['graph']['neighbor_cells']
 
 
+    def get_attached_graph_edges(self, undirected=True):
+        """
+        input:
+            self: pyMCDS class instance.
+
+            undirected: boole; default True
+                if True, each attachment is listed only once.
+
+        output:
+            aai_edge: 2D numpy array of int32
+                one (cell ID, attached cell ID) row per edge.
+
+        description:
+            function returns the attached cell graph as edge list,
+            straight from its CSR arrays.
+        """
+        return graph_edge_parser(*self.data['discrete_cells']['graph']['attached_cells'].csr, undirected=undirected)
+
+
+    def get_neighbor_graph_edges(self, undirected=True):
+        """
+        input:
+            self: pyMCDS class instance.
+
+            undirected: boole; default True
+                if True, each neighbor pair is listed only once.
+
+        output:
+            aai_edge: 2D numpy array of int32
+                one (cell ID, neighbor cell ID) row per edge.
+
+        description:
+            function returns the cell neighbor graph as edge list,
+            straight from its CSR arrays.
+        """
+        return graph_edge_parser(*self.data['discrete_cells']['graph']['neighbor_cells'].csr, undirected=undirected)
+
+
     ## UNIT OVERVIEW RELATED FUNCTION ##
 
     def get_unit_df(self):
@@ -1027,7 +1594,6 @@ class pyMCDS:
         ### find the mesh node ###
         mesh_node = me_node.find('mesh')
         MCDS['metadata']['spatial_units'] = mesh_node.get('units')
-        MCDS['mesh'] = {}
 
         # while we're at it, find the mesh
         s_x_coor = mesh_node.find('x_coordinates').text
@@ -1042,64 +1608,23 @@ class pyMCDS:
         s_delim = mesh_node.find('z_coordinates').get('delimiter')
         ar_z_coor = np.array(s_z_coor.split(s_delim), dtype=np.float64)
 
-        # reshape into a meshgrid
-        MCDS['mesh']['mnp_grid'] = np.array(np.meshgrid(ar_x_coor, ar_y_coor, ar_z_coor, indexing='xy'))
-
-        # get mesh center axis
-        MCDS['mesh']['mnp_axis'] = [
-            np.unique(ar_x_coor),
-            np.unique(ar_y_coor),
-            np.unique(ar_z_coor),
-        ]
-
-        # get mesh center range
-        MCDS['mesh']['mnp_range'] = [
-           (MCDS['mesh']['mnp_axis'][0].min(), MCDS['mesh']['mnp_axis'][0].max()),
-           (MCDS['mesh']['mnp_axis'][1].min(), MCDS['mesh']['mnp_axis'][1].max()),
-           (MCDS['mesh']['mnp_axis'][2].min(), MCDS['mesh']['mnp_axis'][2].max()),
-        ]
-
-        # get voxel range
-        MCDS['mesh']['ijk_range'] = [
-            (0, len(MCDS['mesh']['mnp_axis'][0]) - 1),
-            (0, len(MCDS['mesh']['mnp_axis'][1]) - 1),
-            (0, len(MCDS['mesh']['mnp_axis'][2]) - 1),
-        ]
-
-        # get voxel axis
-        MCDS['mesh']['ijk_axis'] = [
-            np.array(range(MCDS['mesh']['ijk_range'][0][1] + 1)),
-            np.array(range(MCDS['mesh']['ijk_range'][1][1] + 1)),
-            np.array(range(MCDS['mesh']['ijk_range'][2][1] + 1)),
-        ]
-
         # get mesh bounding box range [xmin, ymin, zmin, xmax, ymax, zmax]
         bboxcoor_str = mesh_node.find('bounding_box').text
         delimiter = mesh_node.find('bounding_box').get('delimiter')
         ar_bboxcoor = np.array(bboxcoor_str.split(delimiter), dtype=np.float64)
 
-        MCDS['mesh']['xyz_range'] = [
-            (ar_bboxcoor[0], ar_bboxcoor[3]),
-            (ar_bboxcoor[1], ar_bboxcoor[4]),
-            (ar_bboxcoor[2], ar_bboxcoor[5]),
-        ]
-
-        # voxel data must be loaded from .mat file
+        # the read only mesh is shared by all frames of the output folder
         voxelfile = mesh_node.find('voxels').find('filename').text
         voxelpathfile = output_path / voxelfile
-        try:
-            initial_mesh = io.loadmat(voxelpathfile)['mesh']
-            if self.verbose:
-                print(f'reading: {voxelpathfile}')
-        except:
-            raise FileNotFoundError(f'Error @ pyMCDS._read_xml : no such file or directory: {voxelpathfile}\nreferenced in: {xmlpathfile}.')
-            sys.exit(1)
-
-
-        # center of voxel specified by first three rows [ x, y, z ]
-        # volume specified by fourth row
-        MCDS['mesh']['mnp_coordinate'] = initial_mesh[:3, :]
-        MCDS['mesh']['volumes'] = initial_mesh[3, :]
+        MCDS['mesh'] = mesh_parser(
+            voxelpathfile = voxelpathfile,
+            ar_x_coor = ar_x_coor,
+            ar_y_coor = ar_y_coor,
+            ar_z_coor = ar_z_coor,
+            ar_bboxcoor = ar_bboxcoor,
+            xmlpathfile = xmlpathfile,
+            verbose = self.verbose,
+        )
 
 
         ################################
@@ -1134,6 +1659,13 @@ class pyMCDS:
             var_children = variables_node.findall('variable')
             MCDS['continuum_variables'] = {}
 
+            # get voxel index map, computed once per mesh
+            ai_i, ai_j, ai_k = MCDS['mesh'].voxel_ijk()
+
+            # scatter all substrates into meshgrid shaped arrays in one step
+            aar_conc = np.zeros((len(var_children),) + MCDS['mesh'].grid_shape())
+            aar_conc[:, ai_j, ai_i, ai_k] = me_data[4:4+len(var_children), :]
+
             # substrate loop
             for i_s, chemspecies in enumerate(var_children):
                 # i don't like spaces in species names!
@@ -1145,9 +1677,6 @@ class pyMCDS:
                 if self.verbose:
                     print(f'parsing: {s_substrate} data')
 
-                # initialize meshgrid shaped array for concentration data
-                MCDS['continuum_variables'][s_substrate]['data'] = np.zeros(MCDS['mesh']['mnp_grid'][0].shape)
-
                 # travel down one level on tree
                 chemspecies = chemspecies.find('physical_parameter_set')
 
@@ -1162,18 +1691,7 @@ class pyMCDS:
                 MCDS['continuum_variables'][s_substrate]['decay_rate']['units']  = chemspecies.find('decay_rate').get('units')
 
                 # store data from microenvironment file as numpy array
-                # iterate over each voxel
-                # bue: i have a hunch this could be faster reimplemented.
-                for vox_idx in range(MCDS['mesh']['mnp_coordinate'].shape[1]):
-
-                    # find the voxel coordinate
-                    ar_center = MCDS['mesh']['mnp_coordinate'][:, vox_idx]
-                    i = np.where(np.abs(ar_center[0] - MCDS['mesh']['mnp_axis'][0]) < 1e-10)[0][0]
-                    j = np.where(np.abs(ar_center[1] - MCDS['mesh']['mnp_axis'][1]) < 1e-10)[0][0]
-                    k = np.where(np.abs(ar_center[2] - MCDS['mesh']['mnp_axis'][2]) < 1e-10)[0][0]
-
-                    # store value
-                    MCDS['continuum_variables'][s_substrate]['data'][j, i, k] = me_data[4+i_s, vox_idx]
+                MCDS['continuum_variables'][s_substrate]['data'] = aar_conc[i_s]
 
 
         ####################
@@ -1239,11 +1757,25 @@ class pyMCDS:
         # store unit
         MCDS['discrete_cells']['units'] = ds_unit
 
+        # select columns
+        li_row = list(range(len(data_labels)))
+        if not (self.columns is None):
+            es_column = set(self.columns).union({'ID', 'position_x', 'position_y', 'position_z'})
+            li_row = [i_row for i_row, s_label in enumerate(data_labels) if s_label in es_column]
+
         # load the file
         cellfile = cellchild_node.find('filename').text
         cellpathfile = output_path / cellfile
         try:
-            cell_data = io.loadmat(cellpathfile)['cells']
+            cell_data = None
+            li_data = li_row
+            if len(li_row) < len(data_labels):
+                # only the selected rows
+                cell_data = matfile_v4_parser(cellpathfile, 'cells', li_row)
+                li_data = range(len(li_row))
+            if cell_data is None:
+                cell_data = io.loadmat(cellpathfile)['cells']
+                li_data = li_row
             if self.verbose:
                 print(f'reading: {cellpathfile}')
         except:
@@ -1252,8 +1784,8 @@ class pyMCDS:
 
         # store data
         MCDS['discrete_cells']['data'] = {}
-        for col in range(len(data_labels)):
-            MCDS['discrete_cells']['data'][data_labels[col]] = cell_data[col, :]
+        for i_data, col in zip(li_data, li_row):
+            MCDS['discrete_cells']['data'][data_labels[col]] = cell_data[i_data, :]
 
 
         #####################
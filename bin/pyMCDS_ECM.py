@@ -15,6 +15,7 @@
 
 
 # load library
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 import pathlib
@@ -23,36 +24,66 @@ from scipy import io
 import scipy.io as sio
 import sys
 import xml.etree.ElementTree as ET
+# the mesh registry and the graph parser are shared with pyMCDS.py, so both loaders reuse one mesh per output folder
+from pyMCDS import graphfile_parser, mesh_parser, _read_only
 
 # functions
-def graphfile_parser(s_pathfile):
+# ECM mesh registry, keyed by the ECM voxel center coordinates, least recently used first.
+# the ECM mesh does not change during a run, so all frames of an output folder share one ECM mesh.
+# only the I_ECM_MESH_MAX most recently used ECM meshes are kept, so older runs are freed.
+I_ECM_MESH_MAX = 2
+do_ecm_mesh = OrderedDict()
+
+def ecm_mesh_parser(aar_center):
     """
     input:
-        s_pathfile: string
-            path to and file name from graph.txt file.
+        aar_center: 2D numpy array of floating point numbers
+            x, y, and z coordinates of the ECM voxel centers,
+            the first three rows of the ECM_Data matrix.
 
     output:
-        dei_graph: dictionary of sets of integers.
-            object maps each cell ID to connected cell IDs.
+        d_ecm_mesh: dictionary
+            read only x_coordinates_vec, y_coordinates_vec, z_coordinates_vec,
+            the x, y, and z meshgrids (indexing='xy'), and ai_flat,
+            the flat meshgrid index of each ECM voxel (mat file column).
 
     description:
-        code parses PhysiCell's own graphs format and
-        returns the content in a dictionary object.
+        function returns the ECM mesh from the registry, and
+        only builds it, and the center to [j, i, k] map, if the
+        ECM voxel centers were not seen before.
     """
-    # processing
-    dei_graph = {}
-    f = open(s_pathfile)
-    for i, s_line in enumerate(f):
-        #print('processing line:', s_line.strip())
-        s_key, s_value = s_line.strip().split(':')
-        ei_value = set()
-        if len(s_value.strip()) :
-            ei_value = set([int(s_id) for s_id in s_value.split(',')])
-        dei_graph.update({int(s_key): ei_value})
-    f.close()
+    t_key = (aar_center.shape, aar_center.tobytes())
+    try:
+        d_ecm_mesh = do_ecm_mesh[t_key]
+        do_ecm_mesh.move_to_end(t_key)
+        return d_ecm_mesh
+    except KeyError:
+        pass
+
+    # unique coordinates and, for each voxel, its index on each axis
+    ar_x_coor, ai_i = np.unique(aar_center[0,:], return_inverse=True)
+    ar_y_coor, ai_j = np.unique(aar_center[1,:], return_inverse=True)
+    ar_z_coor, ai_k = np.unique(aar_center[2,:], return_inverse=True)
+    xx, yy, zz = np.meshgrid(ar_x_coor, ar_y_coor, ar_z_coor)
+
+    # pyMCDS stores meshgrids as 'cartesian' (indexing='xy'), so the voxel lands at [j, i, k]
+    d_ecm_mesh = {
+        'x_coordinates_vec': ar_x_coor,
+        'y_coordinates_vec': ar_y_coor,
+        'z_coordinates_vec': ar_z_coor,
+        'x_coordinates_mesh': xx,
+        'y_coordinates_mesh': yy,
+        'z_coordinates_mesh': zz,
+        'ai_flat': np.ravel_multi_index((ai_j.ravel(), ai_i.ravel(), ai_k.ravel()), xx.shape),
+    }
+    for o_value in d_ecm_mesh.values():
+        _read_only(o_value)
+    do_ecm_mesh[t_key] = d_ecm_mesh
+    while len(do_ecm_mesh) > I_ECM_MESH_MAX:
+        do_ecm_mesh.popitem(last=False)
 
     # output
-    return(dei_graph)
+    return d_ecm_mesh
 
 
 # object classes
@@ -1036,7 +1067,6 @@ class pyMCDS:
         ### find the mesh node ###
         mesh_node = me_node.find('mesh')
         MCDS['metadata']['spatial_units'] = mesh_node.get('units')
-        MCDS['mesh'] = {}
 
         # while we're at it, find the mesh
         s_x_coor = mesh_node.find('x_coordinates').text
@@ -1051,64 +1081,23 @@ class pyMCDS:
         s_delim = mesh_node.find('z_coordinates').get('delimiter')
         ar_z_coor = np.array(s_z_coor.split(s_delim), dtype=np.float64)
 
-        # reshape into a meshgrid
-        MCDS['mesh']['mnp_grid'] = np.array(np.meshgrid(ar_x_coor, ar_y_coor, ar_z_coor, indexing='xy'))
-
-        # get mesh center axis
-        MCDS['mesh']['mnp_axis'] = [
-            np.unique(ar_x_coor),
-            np.unique(ar_y_coor),
-            np.unique(ar_z_coor),
-        ]
-
-        # get mesh center range
-        MCDS['mesh']['mnp_range'] = [
-           (MCDS['mesh']['mnp_axis'][0].min(), MCDS['mesh']['mnp_axis'][0].max()),
-           (MCDS['mesh']['mnp_axis'][1].min(), MCDS['mesh']['mnp_axis'][1].max()),
-           (MCDS['mesh']['mnp_axis'][2].min(), MCDS['mesh']['mnp_axis'][2].max()),
-        ]
-
-        # get voxel range
-        MCDS['mesh']['ijk_range'] = [
-            (0, len(MCDS['mesh']['mnp_axis'][0]) - 1),
-            (0, len(MCDS['mesh']['mnp_axis'][1]) - 1),
-            (0, len(MCDS['mesh']['mnp_axis'][2]) - 1),
-        ]
-
-        # get voxel axis
-        MCDS['mesh']['ijk_axis'] = [
-            np.array(range(MCDS['mesh']['ijk_range'][0][1] + 1)),
-            np.array(range(MCDS['mesh']['ijk_range'][1][1] + 1)),
-            np.array(range(MCDS['mesh']['ijk_range'][2][1] + 1)),
-        ]
-
         # get mesh bounding box range [xmin, ymin, zmin, xmax, ymax, zmax]
         bboxcoor_str = mesh_node.find('bounding_box').text
         delimiter = mesh_node.find('bounding_box').get('delimiter')
         ar_bboxcoor = np.array(bboxcoor_str.split(delimiter), dtype=np.float64)
 
-        MCDS['mesh']['xyz_range'] = [
-            (ar_bboxcoor[0], ar_bboxcoor[3]),
-            (ar_bboxcoor[1], ar_bboxcoor[4]),
-            (ar_bboxcoor[2], ar_bboxcoor[5]),
-        ]
-
-        # voxel data must be loaded from .mat file
+        # the read only mesh is shared by all frames of the output folder
         voxelfile = mesh_node.find('voxels').find('filename').text
         voxelpathfile = output_path / voxelfile
-        try:
-            initial_mesh = io.loadmat(voxelpathfile)['mesh']
-            if self.verbose:
-                print(f'reading: {voxelpathfile}')
-        except:
-            raise FileNotFoundError(f'Error @ pyMCDS._read_xml : no such file or directory: {voxelpathfile}\nreferenced in: {xmlpathfile}.')
-            sys.exit(1)
-
-
-        # center of voxel specified by first three rows [ x, y, z ]
-        # volume specified by fourth row
-        MCDS['mesh']['mnp_coordinate'] = initial_mesh[:3, :]
-        MCDS['mesh']['volumes'] = initial_mesh[3, :]
+        MCDS['mesh'] = mesh_parser(
+            voxelpathfile = voxelpathfile,
+            ar_x_coor = ar_x_coor,
+            ar_y_coor = ar_y_coor,
+            ar_z_coor = ar_z_coor,
+            ar_bboxcoor = ar_bboxcoor,
+            xmlpathfile = xmlpathfile,
+            verbose = self.verbose,
+        )
 
 
         ################################
@@ -1143,6 +1132,13 @@ class pyMCDS:
             var_children = variables_node.findall('variable')
             MCDS['continuum_variables'] = {}
 
+            # get voxel index map, computed once per mesh
+            ai_i, ai_j, ai_k = MCDS['mesh'].voxel_ijk()
+
+            # scatter all substrates into meshgrid shaped arrays in one step
+            aar_conc = np.zeros((len(var_children),) + MCDS['mesh'].grid_shape())
+            aar_conc[:, ai_j, ai_i, ai_k] = me_data[4:4+len(var_children), :]
+
             # substrate loop
             for i_s, chemspecies in enumerate(var_children):
                 # i don't like spaces in species names!
@@ -1154,9 +1150,6 @@ class pyMCDS:
                 if self.verbose:
                     print(f'parsing: {s_substrate} data')
 
-                # initialize meshgrid shaped array for concentration data
-                MCDS['continuum_variables'][s_substrate]['data'] = np.zeros(MCDS['mesh']['mnp_grid'][0].shape)
-
                 # travel down one level on tree
                 chemspecies = chemspecies.find('physical_parameter_set')
 
@@ -1171,18 +1164,7 @@ class pyMCDS:
                 MCDS['continuum_variables'][s_substrate]['decay_rate']['units']  = chemspecies.find('decay_rate').get('units')
 
                 # store data from microenvironment file as numpy array
-                # iterate over each voxel
-                # bue: i have a hunch this could be faster reimplemented.
-                for vox_idx in range(MCDS['mesh']['mnp_coordinate'].shape[1]):
-
-                    # find the voxel coordinate
-                    ar_center = MCDS['mesh']['mnp_coordinate'][:, vox_idx]
-                    i = np.where(np.abs(ar_center[0] - MCDS['mesh']['mnp_axis'][0]) < 1e-10)[0][0]
-                    j = np.where(np.abs(ar_center[1] - MCDS['mesh']['mnp_axis'][1]) < 1e-10)[0][0]
-                    k = np.where(np.abs(ar_center[2] - MCDS['mesh']['mnp_axis'][2]) < 1e-10)[0][0]
-
-                    # store value
-                    MCDS['continuum_variables'][s_substrate]['data'][j, i, k] = me_data[4+i_s, vox_idx]
+                MCDS['continuum_variables'][s_substrate]['data'] = aar_conc[i_s]
 
 
         ####################
@@ -1338,22 +1320,12 @@ class pyMCDS:
                 'ecm'/'mesh'/'x_coordinates', and 'y_coordinates', and 'z_coordinates'
         """
 
-        # Make mesh dict
+        # Make mesh dict. The unique coordinates and meshgrid arrays are built once per ECM mesh
+        # (see ecm_mesh_parser) and shared, read only, by all frames.
+        d_ecm_mesh = ecm_mesh_parser(ecm_arr[:3, :])
         self.data['ecm']['mesh'] = {}
-
-        # Generate and store unique coordinates from the ECM mesh coordinates
-        x_coords, y_coords, z_coords = np.unique(ecm_arr[0,:]), np.unique(ecm_arr[1,:]), np.unique(ecm_arr[2,:])#, np.unique(zz)
-
-        self.data['ecm']['mesh']['x_coordinates_vec'] = x_coords
-        self.data['ecm']['mesh']['y_coordinates_vec'] = y_coords
-        self.data['ecm']['mesh']['z_coordinates_vec'] = z_coords
-
-        # Generate and store coordinates as meshgrid arrays
-        xx, yy, zz = np.meshgrid(x_coords, y_coords, z_coords)
-
-        self.data['ecm']['mesh']['x_coordinates_mesh'] = xx
-        self.data['ecm']['mesh']['y_coordinates_mesh'] = yy
-        self.data['ecm']['mesh']['z_coordinates_mesh'] = zz
+        for key in ['x_coordinates_vec', 'y_coordinates_vec', 'z_coordinates_vec', 'x_coordinates_mesh', 'y_coordinates_mesh', 'z_coordinates_mesh']:
+            self.data['ecm']['mesh'][key] = d_ecm_mesh[key]
         
     def load_ECM_centers(self, ecm_arr):
         """
@@ -1445,38 +1417,17 @@ class pyMCDS:
             as 3 sets of scalar fields. All fields are loaded as mesh grids.
         """
 
-        # Set up storage
+        # Set up storage: one contiguous block for all fields, each field is a [ny, nx, nz] view into it
         self.data['ecm']['ECM_fields'] = {}
+        ls_field = list(self.data['ecm']['ECM_field_vectors'])
+        ai_flat = ecm_mesh_parser(self.data['ecm']['mesh']['centers'])['ai_flat']
+        ti_shape = self.data['ecm']['mesh']['x_coordinates_mesh'].shape
+        aar_field = np.zeros((len(ls_field),) + ti_shape)
 
-        # the first three fields are the x, y, and z coordinates respectively so they need jumped over
-        ecm_field_number = 3
-
-        # iterate over each data field
-        for field in self.data['ecm']['ECM_field_vectors']:
-
-            #Set up data structure
-            self.data['ecm']['ECM_fields'][field] = np.zeros(self.data['ecm']['mesh']['x_coordinates_mesh'].shape)
-
-            # iterate over each voxel
-            for vox_idx in range(self.data['ecm']['mesh']['centers'].shape[1]):
-
-                # find the center
-                center = self.data['ecm']['mesh']['centers'][:, vox_idx]
-
-                # use the center to find the cartesian indices of the voxel
-                i = np.where(np.abs(center[0] - self.data['ecm']['mesh']['x_coordinates_vec']) < 1e-10)[0][0]
-                j = np.where(np.abs(center[1] - self.data['ecm']['mesh']['y_coordinates_vec']) < 1e-10)[0][0]
-                k = np.where(np.abs(center[2] - self.data['ecm']['mesh']['z_coordinates_vec']) < 1e-10)[0][0]
-
-                # Use this to make a dictionary with the Cartesian indices as keys to a dictionary containing the values
-                # if you declare the field to be a dictionary. Otherwise, as written and declared as a np array, it gives one a meshgric
-                # Note that pyMCDS stores meshgrids as 'cartesian'(indexing='xy' in np.meshgrid) which means that we
-                # will have to use these indices as [j, i, k] on the actual meshgrid objects
-
-                self.data['ecm']['ECM_fields'][field][j, i, k] \
-                    = ecm_arr[ecm_field_number, vox_idx]
-
-            ecm_field_number = ecm_field_number + 1
+        # scatter all fields at once; the first three rows are the x, y, and z coordinates so they are jumped over
+        aar_field.reshape(len(ls_field), -1)[:, ai_flat] = ecm_arr[3:3+len(ls_field), :]
+        for i_field, field in enumerate(ls_field):
+            self.data['ecm']['ECM_fields'][field] = aar_field[i_field]
 
     def load_ecm(self, ecm_file, output_path='.'):
         """
@@ -1528,13 +1479,12 @@ class pyMCDS:
         """
         if z_slice is not None:
             # check to see that z_slice is a valid plane
-            zz = self.data['ecm']['mesh']['z_coordinates_mesh']
-            assert z_slice in zz, 'Specified z_slice {} not in z_coordinates'.format(z_slice)
+            z_coords = self.data['ecm']['mesh']['z_coordinates_vec']
+            k = np.flatnonzero(z_coords == z_slice)
+            assert len(k) > 0, 'Specified z_slice {} not in z_coordinates'.format(z_slice)
 
-            # do the processing if its ok
-            mask = zz == z_slice
-            full_field = self.data['ecm']['ECM_fields'][field_name]
-            field_arr = full_field[mask].reshape((zz.shape[0], zz.shape[1]))
+            # do the processing if its ok: only the plane, no mask over the whole field
+            field_arr = self.data['ecm']['ECM_fields'][field_name][:, :, k[0]]
         else:
             field_arr = self.data['ecm']['ECM_fields'][field_name]
 
@@ -0,0 +1,314 @@
+#########
+# title: pyMCDS_batch.py
+#
+# language: python3
+# license: BSD-3-Clause
+#
+# description:
+#     pyMCDS_batch.py reduces every time step of one or more PhysiCell
+#     model output folders to a few numbers per frame (cell counts by a
+#     discrete variable, per cell type means of continuous variables,
+#     substrate min/max/mean/total, and voxel histograms), fanning the
+#     frames out over a process pool, and writes the result as one tidy
+#     csv or parquet table.
+#     variable names are the pyMCDS cell_df column and substrate names,
+#     the same the Studio uses.
+#
+#     python pyMCDS_batch.py output -o summary.csv --count cell_type --mean total_volume --substrate oxygen --histogram oxygen:20
+#########
+
+
+# load library
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import glob
+import numpy as np
+import os
+import pandas as pd
+from pyMCDS import pyMCDS
+import re
+import sys
+
+# tidy table columns: one row per frame, variable, statistic and group.
+# group is the discrete value (count), the cell type (mean), or the bin index (histogram); -1 otherwise.
+LS_TABLE_COLUMN = ['folder', 'frame', 'time', 'variable', 'statistic', 'group', 'bin_lo', 'bin_hi', 'value']
+LS_SUBSTRATE_STATISTIC = ['min', 'max', 'mean', 'total']
+
+# functions
+def xmlfile_parser(output_path):
+    """
+    input:
+        output_path: string
+            relative or absolute path to a PhysiCell output folder.
+
+    output:
+        ls_xmlfile: list of strings
+            sorted outputNNNNNNNN.xml file names, without path.
+
+    description:
+        function lists the time step xml files of an output folder.
+    """
+    ls_xmlfile = [os.path.basename(s_pathfile) for s_pathfile in glob.glob(os.path.join(output_path, 'output*.xml'))]
+    return sorted(s_xmlfile for s_xmlfile in ls_xmlfile if re.match(r'^output\d{8}\.xml$', s_xmlfile))
+
+
+def histogram_spec_parser(s_spec):
+    """
+    input:
+        s_spec: string
+            substrate[:bins[:lo:hi]], e.g. oxygen, oxygen:20 or oxygen:20:0:38.
+
+    output:
+        t_spec: tuple
+            (substrate name, number of bins, lower edge or None, upper edge or None).
+
+    description:
+        function parses a --histogram command line argument.
+    """
+    ls_token = s_spec.split(':')
+    if len(ls_token) not in (1, 2, 4):
+        raise ValueError(f'histogram {s_spec} is not substrate[:bins[:lo:hi]]')
+    i_bin = int(ls_token[1]) if len(ls_token) > 1 else 10
+    if len(ls_token) == 4:
+        return (ls_token[0], i_bin, float(ls_token[2]), float(ls_token[3]))
+    return (ls_token[0], i_bin, None, None)
+
+
+def frame_reducer(output_path, xmlfile, ls_count=[], ls_mean=[], ls_substrate=[], lt_histogram=[], live=False):
+    """
+    input:
+        output_path: string
+            path to the PhysiCell output folder.
+
+        xmlfile: string
+            outputNNNNNNNN.xml file name, without path.
+
+        ls_count: list of strings; default []
+            discrete cell variables to count cells by.
+
+        ls_mean: list of strings; default []
+            continuous cell variables to average per cell type.
+
+        ls_substrate: list of strings; default []
+            substrates to compute min, max, mean and total for.
+
+        lt_histogram: list of tuples; default []
+            (substrate, bins, lo, hi) voxel histograms, with fixed edges.
+            voxels outside lo:hi are not counted; the last bin includes hi.
+
+        live: boolean; default False
+            only use cells with cycle_model < 100, like the Studio's
+            cell_type population plot.
+
+    output:
+        lt_row: list of tuples
+            rows of the tidy table, in LS_TABLE_COLUMN order.
+
+    description:
+        function loads a single time step, only with the cell variables
+        and the microenvironment the reductions need, and reduces it.
+        it runs in the worker processes of batch_reducer.
+    """
+    i_frame = int(re.search(r'(\d{8})', xmlfile).group(1))
+    b_microenv = len(ls_substrate) + len(lt_histogram) > 0
+    ls_column = sorted(set(['cell_type'] + ls_count + ls_mean + (['cycle_model'] if live else [])))
+    mcds = pyMCDS(xmlfile, output_path, microenv=b_microenv, graph=False, verbose=False, columns=ls_column)
+    r_time = mcds.get_time()
+    lt_row = []
+
+    def row(s_variable, s_statistic, i_group, r_value, r_lo=np.nan, r_hi=np.nan):
+        lt_row.append((output_path, i_frame, r_time, s_variable, s_statistic, int(i_group), r_lo, r_hi, float(r_value)))
+
+    # cell variables
+    if len(ls_count) + len(ls_mean) > 0:
+        d_cell = mcds.data['discrete_cells']['data']
+        ab_keep = np.ones(len(d_cell['cell_type']), dtype=bool)
+        if live:
+            ab_keep = d_cell['cycle_model'] < 100
+        ai_type = d_cell['cell_type'][ab_keep].astype(np.int64)
+
+        for s_variable in ls_count:
+            ai_value, ai_count = np.unique(d_cell[s_variable][ab_keep].astype(np.int64), return_counts=True)
+            for i_value, i_count in zip(ai_value, ai_count):
+                row(s_variable, 'count', i_value, i_count)
+
+        if len(ai_type) > 0:
+            ai_type_count = np.bincount(ai_type - ai_type.min())
+            for s_variable in ls_mean:
+                ar_sum = np.bincount(ai_type - ai_type.min(), weights=d_cell[s_variable][ab_keep])
+                for i_offset in np.flatnonzero(ai_type_count):
+                    row(s_variable, 'mean', ai_type.min() + i_offset, ar_sum[i_offset] / ai_type_count[i_offset])
+
+    # substrates
+    if b_microenv:
+        r_volume = mcds.get_voxel_volume()
+        for s_substrate in ls_substrate:
+            ar_conc = mcds.get_concentration(s_substrate)
+            for s_statistic, r_value in zip(LS_SUBSTRATE_STATISTIC, [ar_conc.min(), ar_conc.max(), ar_conc.mean(), ar_conc.sum() * r_volume]):
+                row(s_substrate, s_statistic, -1, r_value)
+
+        for s_substrate, i_bin, r_lo, r_hi in lt_histogram:
+            ar_conc = mcds.get_concentration(s_substrate).ravel()
+            ar_edge = np.linspace(r_lo, r_hi, i_bin + 1)
+            ai_count, _ = np.histogram(ar_conc, bins=ar_edge)
+            for i_index in range(i_bin):
+                row(s_substrate, 'histogram', i_index, ai_count[i_index], ar_edge[i_index], ar_edge[i_index + 1])
+
+    return lt_row
+
+
+def range_reducer(output_path, xmlfile, ls_substrate=[]):
+    """
+    input:
+        output_path: string
+            path to the PhysiCell output folder.
+
+        xmlfile: string
+            outputNNNNNNNN.xml file name, without path.
+
+        ls_substrate: list of strings; default []
+            substrates to find the concentration range for.
+
+    output:
+        lt_range: list of tuples
+            (min, max) concentration per substrate, in ls_substrate order.
+
+    description:
+        function loads a single time step, without cell variables,
+        for the default histogram edges of batch_reducer.
+        it runs in the worker processes of batch_reducer.
+    """
+    mcds = pyMCDS(xmlfile, output_path, microenv=True, graph=False, verbose=False, columns=['cell_type'])
+    lt_range = []
+    for s_substrate in ls_substrate:
+        ar_conc = mcds.get_concentration(s_substrate)
+        lt_range.append((float(ar_conc.min()), float(ar_conc.max())))
+    return lt_range
+
+
+def batch_reducer(ls_output_path, ls_count=[], ls_mean=[], ls_substrate=[], ls_histogram=[], live=False, workers=None, verbose=True):
+    """
+    input:
+        ls_output_path: list of strings
+            PhysiCell output folders.
+
+        ls_count, ls_mean, ls_substrate: list of strings; default []
+            reductions, see frame_reducer. ls_substrate ['all'] is
+            replaced by all substrates of the first frame.
+
+        ls_histogram: list of strings; default []
+            substrate[:bins[:lo:hi]] voxel histogram specifications.
+            without lo:hi, the edges span the concentrations
+            of all frames of all folders, found in a first pass,
+            so all frames and folders share the same bins.
+
+        live: boolean; default False
+            only use cells with cycle_model < 100.
+
+        workers: integer; default None
+            number of worker processes. None uses all cpus.
+
+        verbose: boolean; default True
+            print progress.
+
+    output:
+        df_table: pandas dataframe
+            tidy table with LS_TABLE_COLUMN columns,
+            sorted by folder, frame, variable, statistic and group.
+
+    description:
+        function fans all frames of all folders out over a process pool.
+        histograms without lo:hi take one more pass over all frames.
+    """
+    lt_task = [(s_path, s_xmlfile) for s_path in ls_output_path for s_xmlfile in xmlfile_parser(s_path)]
+    if len(lt_task) == 0:
+        return pd.DataFrame(columns=LS_TABLE_COLUMN)
+
+    # resolve substrate names once, from the first frame
+    if 'all' in ls_substrate:
+        s_path, s_xmlfile = lt_task[0]
+        mcds = pyMCDS(s_xmlfile, s_path, microenv=True, graph=False, verbose=False, columns=['cell_type'])
+        ls_substrate = [s for s in ls_substrate if s != 'all']
+        ls_substrate += [s for s in mcds.get_substrate_names() if s not in ls_substrate]
+
+    lt_histogram = [histogram_spec_parser(s_spec) for s_spec in ls_histogram]
+    ls_range = sorted(set(s_substrate for s_substrate, _, r_lo, _ in lt_histogram if r_lo is None))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    i_chunk = max(1, len(lt_task) // (4 * workers))
+    lt_row = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # default histogram edges: the concentration range over all frames
+        if len(ls_range) > 0:
+            if verbose:
+                print(f'histogram range pass over {len(lt_task)} frames')
+            reducer = functools.partial(range_reducer, ls_substrate=ls_range)
+            ar_range = np.array(list(executor.map(reducer, *zip(*lt_task), chunksize=i_chunk)))
+            for i, (s_substrate, i_bin, r_lo, r_hi) in enumerate(lt_histogram):
+                if r_lo is None:
+                    i_range = ls_range.index(s_substrate)
+                    r_lo = float(ar_range[:, i_range, 0].min())
+                    r_hi = float(ar_range[:, i_range, 1].max())
+                    if r_hi <= r_lo:
+                        r_hi = r_lo + 1.0
+                    lt_histogram[i] = (s_substrate, i_bin, r_lo, r_hi)
+
+        reducer = functools.partial(frame_reducer, ls_count=list(ls_count), ls_mean=list(ls_mean), ls_substrate=list(ls_substrate), lt_histogram=lt_histogram, live=live)
+        for i, lt_frame_row in enumerate(executor.map(reducer, *zip(*lt_task), chunksize=i_chunk)):
+            lt_row.extend(lt_frame_row)
+            if verbose:
+                print(f'\rframe {i + 1}/{len(lt_task)}', end='', flush=True)
+    if verbose:
+        print()
+
+    df_table = pd.DataFrame(lt_row, columns=LS_TABLE_COLUMN)
+    return df_table.sort_values(['folder', 'frame', 'variable', 'statistic', 'group'], kind='stable').reset_index(drop=True)
+
+
+def table_writer(df_table, s_pathfile):
+    """
+    input:
+        df_table: pandas dataframe
+            batch_reducer output.
+
+        s_pathfile: string
+            output file; .parquet is written as parquet
+            (needs pyarrow or fastparquet), anything else as csv.
+
+    description:
+        function writes the tidy table.
+    """
+    if s_pathfile.lower().endswith('.parquet'):
+        df_table.to_parquet(s_pathfile, index=False)
+    else:
+        df_table.to_csv(s_pathfile, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reduce every frame of PhysiCell output folders into one tidy csv or parquet table.')
+    parser.add_argument('output_path', nargs='+', help='PhysiCell output folder(s)')
+    parser.add_argument('-o', '--out', default='timeseries.csv', help='output table, .csv or .parquet (default timeseries.csv)')
+    parser.add_argument('--count', action='append', default=[], metavar='VARIABLE', help='count cells by a discrete cell variable, e.g. cell_type or current_phase')
+    parser.add_argument('--mean', action='append', default=[], metavar='VARIABLE', help='per cell type mean of a continuous cell variable, e.g. total_volume')
+    parser.add_argument('--substrate', action='append', default=[], metavar='NAME', help='substrate min/max/mean/total per frame; "all" for all substrates')
+    parser.add_argument('--histogram', action='append', default=[], metavar='NAME[:BINS[:LO:HI]]', help='voxel histogram of a substrate (default 10 bins over the range of all frames)')
+    parser.add_argument('--live', action='store_true', help='only cells with cycle_model < 100, as in the Studio population plot')
+    parser.add_argument('-n', '--workers', type=int, default=None, help='number of worker processes (default: all cpus)')
+    args = parser.parse_args()
+
+    if len(args.count) + len(args.mean) + len(args.substrate) + len(args.histogram) == 0:
+        parser.error('nothing to do; give at least one --count, --mean, --substrate or --histogram')
+
+    try:
+        df_table = batch_reducer(args.output_path, ls_count=args.count, ls_mean=args.mean, ls_substrate=args.substrate,
+                                 ls_histogram=args.histogram, live=args.live, workers=args.workers)
+        table_writer(df_table, args.out)
+    except (KeyError, ValueError, ImportError, OSError) as e:
+        print(f'pyMCDS_batch.py: Error: {e}')
+        sys.exit(1)
+    print(f'{len(df_table)} rows written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+#########
+# title: pyMCDS_cache.py
+#
+# language: python3
+# license: BSD-3-Clause
+#
+# description:
+#     pyMCDS_cache.py defines an opt-in cache layer around pyMCDS.
+#     the first load of a time step writes a binary sidecar into the
+#     .pymcds_cache sub folder of the output folder: plain .npy arrays
+#     for the cell and substrate data plus a json file for everything else.
+#     the mesh is not part of the sidecar, it comes from the mesh registry
+#     that pyMCDS shares across all frames of an output folder.
+#     later loads memory map the .npy files instead of parsing the xml
+#     and mat files again. a sidecar is only used as long as the size and
+#     modification time of its source files are unchanged.
+#
+#     run as script to pre-warm the cache of a whole output folder:
+#         python pyMCDS_cache.py <output_path> [-n <number of processes>]
+#########
+
+
+# load library
+import argparse
+import concurrent.futures
+import glob
+import json
+import numpy as np
+import os
+import pathlib
+from pyMCDS import pyMCDS, graphfile_parser, mesh_parser, xmlfile_to_xmlpathfile
+import sys
+import xml.etree.ElementTree as ET
+
+# sidecar sub folder name and layout version; bump the version when the layout changes.
+S_CACHE_DIR = '.pymcds_cache'
+I_CACHE_VERSION = 2
+
+# functions
+def source_pathfiles(xmlpathfile):
+    """
+    input:
+        xmlpathfile: pathlib.Path
+            path to and file name of a outputNNNNNNNN.xml file.
+
+    output:
+        d_pathfile: dictionary of strings
+            path to and file name of the xml file and of the mat and
+            graph files referenced therein.
+
+    description:
+        function reads the file names from the xml file.
+        only the few nodes needed are visited.
+    """
+    output_path = xmlpathfile.parent
+    root = ET.parse(xmlpathfile).getroot()
+    me_node = root.find('microenvironment').find('domain')
+    cell_node = root.find('cellular_information').find('cell_populations').find('cell_population').find('custom')
+    for child in cell_node.findall('simplified_data'):
+        if child.get('source') == 'PhysiCell':
+            cellchild_node = child
+            break
+    d_pathfile = {
+        'xml': str(xmlpathfile),
+        'mesh': str(output_path / me_node.find('mesh').find('voxels').find('filename').text),
+        'microenv': str(output_path / me_node.find('data').find('filename').text),
+        'cells': str(output_path / cellchild_node.find('filename').text),
+    }
+    for s_graph in ['neighbor_graph', 'attached_cells_graph']:
+        graph_node = cell_node.find(s_graph)
+        if not (graph_node is None):
+            d_pathfile[s_graph] = str(output_path / graph_node.find('filename').text)
+    return d_pathfile
+
+
+def file_key(s_pathfile):
+    """
+    input:
+        s_pathfile: string
+            path to and file name.
+
+    output:
+        l_key: list
+            size and modification time in nanoseconds,
+            or None if the file does not exist.
+    """
+    try:
+        o_stat = os.stat(s_pathfile)
+    except FileNotFoundError:
+        return None
+    return [o_stat.st_size, o_stat.st_mtime_ns]
+
+
+def sidecar_path(xmlpathfile):
+    """
+    input:
+        xmlpathfile: pathlib.Path
+            path to and file name of a outputNNNNNNNN.xml file.
+
+    output:
+        sidecar_path: pathlib.Path
+            folder holding the sidecar files for this time step.
+    """
+    return xmlpathfile.parent / S_CACHE_DIR / xmlpathfile.stem
+
+
+def _save_npy(path, s_name, ar_data):
+    """
+    internal function that writes one .npy file atomically,
+    so that readers never see a half written array.
+    """
+    s_tmp = str(path / f'{s_name}.{os.getpid()}.tmp')
+    with open(s_tmp, 'wb') as f:
+        np.save(f, np.ascontiguousarray(ar_data))
+    os.replace(s_tmp, path / f'{s_name}.npy')
+
+
+def write_sidecar(xmlpathfile, verbose=False):
+    """
+    input:
+        xmlpathfile: pathlib.Path
+            path to and file name of a outputNNNNNNNN.xml file.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        mcds: pyMCDS class instance
+            the freshly parsed time step, without graph data.
+
+        d_pathfile: dictionary of strings
+            path to and file name of the xml file and of the mat and
+            graph files referenced therein.
+
+    description:
+        function parses the time step with pyMCDS and writes its sidecar.
+        the json file, which holds the source file keys, is written last.
+        if the output folder is not writable, the sidecar is silently skipped.
+    """
+    # keys are taken before parsing, so a file changing meanwhile invalidates the sidecar.
+    d_pathfile = source_pathfiles(xmlpathfile)
+    d_key = {s_file: file_key(s_pathfile) for s_file, s_pathfile in d_pathfile.items()}
+    mcds = pyMCDS(xmlpathfile.name, xmlpathfile.parent, microenv=True, graph=False, verbose=verbose)
+
+    # cell data: one row per label, as in the cells mat file
+    ls_label = list(mcds.data['discrete_cells']['data'].keys())
+    if len(ls_label) > 0:
+        aar_cell = np.array([mcds.data['discrete_cells']['data'][s_label] for s_label in ls_label])
+    else:
+        aar_cell = np.zeros((0, 0))
+
+    # substrate data: one meshgrid shaped array per substrate
+    ls_substrate = mcds.get_substrate_names()
+    aar_conc = np.array([mcds.data['continuum_variables'][s_substrate]['data'] for s_substrate in ls_substrate])
+    d_substrate = {}
+    for s_substrate in ls_substrate:
+        d_substrate[s_substrate] = {s_key: o_value for s_key, o_value in mcds.data['continuum_variables'][s_substrate].items() if s_key != 'data'}
+
+    d_meta = {
+        'version': I_CACHE_VERSION,
+        'key': d_key,
+        'pathfile': {s_file: os.path.basename(s_pathfile) for s_file, s_pathfile in d_pathfile.items()},
+        'metadata': mcds.data['metadata'],
+        'mesh_coordinate': [ar_coor.tolist() for ar_coor in mcds.data['mesh']._lar_coordinate],
+        'bounding_box': [float(r_min) for r_min, r_max in mcds.data['mesh']['xyz_range']] + [float(r_max) for r_min, r_max in mcds.data['mesh']['xyz_range']],
+        'substrate': d_substrate,
+        'label': ls_label,
+        'units': mcds.data['discrete_cells']['units'],
+    }
+
+    try:
+        path = sidecar_path(xmlpathfile)
+        path.mkdir(parents=True, exist_ok=True)
+        _save_npy(path, 'cells', aar_cell)
+        _save_npy(path, 'conc', aar_conc)
+        s_tmp = str(path / f'meta.{os.getpid()}.tmp')
+        with open(s_tmp, 'w') as f:
+            json.dump(d_meta, f)
+        os.replace(s_tmp, path / 'meta.json')
+    except OSError as e:
+        if verbose:
+            print(f'Warning @ pyMCDS_cache.write_sidecar : unable to write sidecar for {xmlpathfile}: {e}')
+
+    # output
+    return mcds, d_pathfile
+
+
+def graph_parser(xmlpathfile, d_pathfile, verbose=False):
+    """
+    input:
+        xmlpathfile: pathlib.Path
+            path to and file name of a outputNNNNNNNN.xml file.
+
+        d_pathfile: dictionary of strings
+            file names, as returned by source_pathfiles or stored in
+            the sidecar json file.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        d_graph: dictionary of graph_dict
+            the neighbor and attached cell graph, keyed as in
+            mcds.data['discrete_cells']['graph'].
+
+    description:
+        function reads the graph files of a time step.
+        a graph that the xml file does not reference is left out.
+    """
+    output_path = xmlpathfile.parent
+    d_graph = {}
+    for s_graph, s_key in [('neighbor_graph', 'neighbor_cells'), ('attached_cells_graph', 'attached_cells')]:
+        s_file = d_pathfile.get(s_graph)
+        if s_file is None:
+            continue
+        cellpathfile = output_path / os.path.basename(s_file)
+        try:
+            dei_graph = graphfile_parser(s_pathfile=cellpathfile)
+            if verbose:
+                print(f'reading: {cellpathfile}')
+        except:
+            raise FileNotFoundError(f'Error @ pyMCDS_cache.graph_parser : no such file or directory: {cellpathfile}\nreferenced in: {xmlpathfile}.')
+        d_graph[s_key] = dei_graph
+    return d_graph
+
+
+def read_sidecar(xmlpathfile, microenv=True, graph=True, verbose=False):
+    """
+    input:
+        xmlpathfile: pathlib.Path
+            path to and file name of a outputNNNNNNNN.xml file.
+
+        microenv: boole; default True
+            should the microenvironment be extracted?
+
+        graph: boole; default True
+            should the graphs be extracted?
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        MCDS: dictionary of dictionaries or None
+            the data structure pyMCDS stores at mcds.data,
+            or None if there is no up to date sidecar.
+
+    description:
+        function rebuilds the pyMCDS data structure from the sidecar.
+        the cell and substrate arrays are read only memory maps.
+        graph data is not part of the sidecar and is read from the
+        graph files, if requested.
+    """
+    path = sidecar_path(xmlpathfile)
+    try:
+        with open(path / 'meta.json') as f:
+            d_meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if d_meta.get('version') != I_CACHE_VERSION:
+        return None
+    output_path = xmlpathfile.parent
+    for s_file, l_key in d_meta['key'].items():
+        if file_key(str(output_path / d_meta['pathfile'][s_file])) != l_key:
+            return None
+
+    try:
+        aar_cell = np.load(path / 'cells.npy', mmap_mode='r')
+        if microenv:
+            aar_conc = np.load(path / 'conc.npy', mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if verbose:
+        print(f'reading: {path}')
+
+    MCDS = {}
+    MCDS['metadata'] = d_meta['metadata']
+
+    # mesh
+    ar_x_coor, ar_y_coor, ar_z_coor = [np.array(lr_coor, dtype=np.float64) for lr_coor in d_meta['mesh_coordinate']]
+    MCDS['mesh'] = mesh_parser(
+        voxelpathfile = output_path / d_meta['pathfile']['mesh'],
+        ar_x_coor = ar_x_coor,
+        ar_y_coor = ar_y_coor,
+        ar_z_coor = ar_z_coor,
+        ar_bboxcoor = np.array(d_meta['bounding_box'], dtype=np.float64),
+        xmlpathfile = xmlpathfile,
+        verbose = verbose,
+    )
+
+    # microenvironment
+    if microenv:
+        MCDS['continuum_variables'] = {}
+        for i_s, (s_substrate, d_substrate) in enumerate(d_meta['substrate'].items()):
+            MCDS['continuum_variables'][s_substrate] = dict(d_substrate)
+            MCDS['continuum_variables'][s_substrate]['data'] = aar_conc[i_s]
+
+    # cells
+    MCDS['discrete_cells'] = {}
+    MCDS['discrete_cells']['units'] = d_meta['units']
+    MCDS['discrete_cells']['data'] = {}
+    for i_label, s_label in enumerate(d_meta['label']):
+        MCDS['discrete_cells']['data'][s_label] = aar_cell[i_label, :]
+
+    # graph
+    if graph:
+        MCDS['discrete_cells']['graph'] = graph_parser(xmlpathfile, d_meta['pathfile'], verbose=verbose)
+
+    # output
+    return MCDS
+
+
+def prewarm_frame(s_xmlpathfile):
+    """
+    input:
+        s_xmlpathfile: string
+            path to and file name of a outputNNNNNNNN.xml file.
+
+    output:
+        b_written: boolean
+            True if the sidecar had to be (re)written.
+
+    description:
+        function brings the sidecar of one time step up to date.
+        it runs in a worker process of prewarm().
+    """
+    xmlpathfile = pathlib.Path(s_xmlpathfile)
+    if read_sidecar(xmlpathfile, microenv=False, graph=False) is not None:
+        return False
+    write_sidecar(xmlpathfile)
+    return True
+
+
+def prewarm(output_path, i_worker=None, verbose=True):
+    """
+    input:
+        output_path: string
+            relative or absolute path to the directory where
+            the PhysiCell output files are stored.
+
+        i_worker: integer; default None
+            number of worker processes. None uses os.cpu_count().
+
+        verbose: boole; default True
+            setting verbose to False for less text output, while processing.
+
+    output:
+        i_written: integer
+            number of sidecars which were (re)written.
+
+    description:
+        function writes the sidecar of each time step in the output
+        folder that has none or an outdated one, using a process pool.
+    """
+    ls_xmlpathfile = sorted(glob.glob(os.path.join(output_path, 'output*.xml')))
+    i_written = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=i_worker) as executor:
+        for s_xmlpathfile, o_future in [(s_xmlpathfile, executor.submit(prewarm_frame, s_xmlpathfile)) for s_xmlpathfile in ls_xmlpathfile]:
+            try:
+                b_written = o_future.result()
+            except Exception as e:
+                print(f'Warning @ pyMCDS_cache.prewarm : skipping {s_xmlpathfile}: {e}')
+                continue
+            i_written += int(b_written)
+            if verbose and b_written:
+                print(f'cached: {s_xmlpathfile}')
+    if verbose:
+        print(f'{i_written} of {len(ls_xmlpathfile)} time steps (re)cached in {os.path.join(output_path, S_CACHE_DIR)}')
+    return i_written
+
+
+# object classes
+class pyMCDS_cache(pyMCDS):
+    """
+    input:
+        xmlfile: string
+            name of the xml file with or without path.
+            in the with path case, output_path has to be set to the default!
+
+        output_path: string; default '.'
+            relative or absolute path to the directory where
+            the PhysiCell output files are stored.
+
+        microenv: booler; default True
+            should the microenvironment be extracted?
+
+        graph: boole; default True
+            should the graphs be extracted?
+
+        verbose: boole; default True
+            setting verbose to False for less text output, while processing.
+
+    output:
+        mcds: pyMCDS_cache class instance
+            all fetched content is stored at mcds.data.
+
+    description:
+        pyMCDS_cache.__init__ generates a pyMCDS class instance,
+        loaded from the sidecar if it is up to date, else parsed
+        from the output files and then written to the sidecar.
+        the cell and substrate arrays of a sidecar load are read only.
+    """
+    def __init__(self, xmlfile, output_path='.', microenv=True, graph=True, verbose=True):
+        self.microenv = microenv
+        self.graph = graph
+        self.verbose = verbose
+        self.columns = None
+        xmlpathfile, _ = xmlfile_to_xmlpathfile(xmlfile, output_path)
+        xmlpathfile = pathlib.Path(xmlpathfile)
+        MCDS = read_sidecar(xmlpathfile, microenv=microenv, graph=graph, verbose=verbose)
+        if MCDS is None:
+            # cache miss: build the result from the data just parsed for the sidecar
+            mcds, d_pathfile = write_sidecar(xmlpathfile, verbose=verbose)
+            MCDS = mcds.data
+            if not microenv:
+                MCDS.pop('continuum_variables', None)
+            if graph:
+                MCDS['discrete_cells']['graph'] = graph_parser(xmlpathfile, d_pathfile, verbose=verbose)
+        self.data = MCDS
+
+
+# run as script
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pre-warm the pyMCDS sidecar cache of a PhysiCell output folder.')
+    parser.add_argument('output_path', type=str, help='PhysiCell output folder')
+    parser.add_argument('-n', '--workers', type=int, default=None, help='number of worker processes (default: number of cpus)')
+    args = parser.parse_args()
+    if not os.path.isdir(args.output_path):
+        print(f'Error @ pyMCDS_cache : no such directory: {args.output_path}')
+        sys.exit(1)
+    prewarm(args.output_path, i_worker=args.workers)
@@ -5,6 +5,7 @@ import scipy.io as sio
 import sys
 import warnings
 from pathlib import Path
+from pyMCDS import mesh_parser
 
 class pyMCDS_cells:
     """
@@ -54,18 +55,13 @@ class pyMCDS_cells:
             Contains arrays of voxel center coordinates as meshgrid with shape 
             [nx_voxel, ny_voxel, nz_voxel] or [nx_voxel, ny_voxel] if flat=True.
         """
+        # the meshgrid is materialized once per output folder, rf. pyMCDS.mesh_dict
+        xx, yy, zz = self.data['mesh']['mnp_grid']
         if flat == True:
-            xx = self.data['mesh']['x_coordinates'][:, :, 0]
-            yy = self.data['mesh']['y_coordinates'][:, :, 0]
-
-            return [xx, yy]
+            return [xx[:, :, 0], yy[:, :, 0]]
 
         # if we dont want a plane just return appropriate values
         else:
-            xx = self.data['mesh']['x_coordinates']
-            yy = self.data['mesh']['y_coordinates']
-            zz = self.data['mesh']['z_coordinates']
-
             return [xx, yy, zz]
 
     def get_2D_mesh(self):
@@ -79,17 +75,14 @@ class pyMCDS_cells:
             Contains arrays of voxel center coordinates in x and y dimensions 
             as meshgrid with shape [nx_voxel, ny_voxel]
         """
-        xx = self.data['mesh']['x_coordinates'][:, :, 0]
-        yy = self.data['mesh']['y_coordinates'][:, :, 0]
-
-        return [xx, yy]
+        return self.get_mesh(flat=True)
 
     def get_linear_voxels(self):
         """
         Helper function to quickly grab voxel centers array stored linearly as
         opposed to meshgrid-style.
         """
-        return self.data['mesh']['voxels']['centers']
+        return self.data['mesh']['mnp_coordinate']
 
     def get_mesh_spacing(self):
         """
@@ -209,7 +202,7 @@ class pyMCDS_cells:
         """
         if z_slice is not None:
             # check to see that z_slice is a valid plane
-            zz = self.data['mesh']['z_coordinates']
+            zz = self.data['mesh']['mnp_grid'][2]
             assert z_slice in zz, 'Specified z_slice {} not in z_coordinates'.format(z_slice)
 
             # do the processing if its ok
@@ -342,6 +335,16 @@ class pyMCDS_cells:
         MCDS['metadata']['current_runtime'] = float(time_node.text)
         MCDS['metadata']['runtime_units'] = time_node.get('units')
 
+        # the mesh is not parsed per frame, but taken from the registry shared with pyMCDS
+        mesh_node = root.find('microenvironment').find('domain').find('mesh')
+        MCDS['metadata']['spatial_units'] = mesh_node.get('units')
+        lar_coor = []
+        for s_node in ['x_coordinates', 'y_coordinates', 'z_coordinates', 'bounding_box']:
+            coord_node = mesh_node.find(s_node)
+            lar_coor.append(np.array(coord_node.text.split(coord_node.get('delimiter')), dtype=np.float64))
+        # the voxel coordinates and volumes are only read from the initial_mesh mat file if get_linear_voxels asks for them
+        MCDS['mesh'] = mesh_parser(output_path / mesh_node.find('voxels').find('filename').text, *lar_coor, xmlpathfile=xml_file, lazy=True)
+
         # # find the microenvironment node
         # me_node = root.find('microenvironment')
         # me_node = me_node.find('domain')
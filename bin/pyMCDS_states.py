@@ -0,0 +1,546 @@
+#########
+# title: pyMCDS_states.py
+#
+# language: python3
+# license: BSD-3-Clause
+#
+# description:
+#     pyMCDS_states.py defines an object class, able to load and access
+#     within python the PhysiBoSS boolean network state of each cell, for
+#     all time steps of a PhysiCell model output folder. each state file is
+#     read only once, and re-read only when its files change on disk.
+#     state strings are interned into integer codes, shared by all frames.
+#########
+
+
+# load library
+import glob
+import numpy as np
+import os
+import pandas as pd
+import pathlib
+import threading
+import re
+from pyMCDS import pyMCDS
+import xml.etree.ElementTree as ET
+
+# separator between the active nodes of a state string
+S_NODE_SEP = ' -- '
+
+# one state index per output folder, shared by all callers.
+do_stateindex = {}
+
+# errors from reading a partially written frame, e.g. of a running simulation.
+# pandas EmptyDataError and ParserError are ValueErrors, listed for clarity.
+T_PARTIAL_ERROR = (FileNotFoundError, ET.ParseError, pd.errors.EmptyDataError, pd.errors.ParserError, ValueError)
+
+# functions
+def get_stateindex(output_path, i_frame=None, verbose=False):
+    """
+    input:
+        output_path: string
+            relative or absolute path to the directory where
+            the PhysiCell output files are stored.
+
+        i_frame: integer; default None
+            if not None, only this frame is brought up to date,
+            without scanning the whole output folder.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        si: pyMCDS_states class instance
+            the state index for this output folder,
+            brought up to date with the files on disk.
+
+    description:
+        function returns the persistent PhysiBoSS state index for an
+        output folder. the index is generated on the first call,
+        later calls only load frames that are new or have changed.
+    """
+    s_path = str(pathlib.Path(output_path).resolve())
+    try:
+        si = do_stateindex[s_path]
+    except KeyError:
+        si = pyMCDS_states(s_path, verbose=verbose)
+        do_stateindex[s_path] = si
+    if i_frame is None:
+        si.update()
+    else:
+        try:
+            si.add_frame(i_frame)
+        except T_PARTIAL_ERROR as e:
+            # retry on next call; a stored older version of the frame is kept.
+            print(f'Warning @ pyMCDS_states.get_stateindex : skipping frame {i_frame}: {e}')
+    return si
+
+
+def statefile_pathfile(output_path, i_frame):
+    """
+    input:
+        output_path: string
+            path to the PhysiCell output folder.
+
+        i_frame: integer
+            frame number.
+
+    output:
+        s_pathfile: string or None
+            path to and file name of the frame's state csv file,
+            outputNNNNNNNN_boolean_intracellular.csv or the older
+            states_NNNNNNNN.csv, or None if neither exists.
+    """
+    for s_file in ['output%08d_boolean_intracellular.csv' % i_frame, 'states_%08d.csv' % i_frame]:
+        s_pathfile = os.path.join(output_path, s_file)
+        if os.path.isfile(s_pathfile):
+            return s_pathfile
+    return None
+
+
+def statefile_parser(s_pathfile):
+    """
+    input:
+        s_pathfile: string
+            path to and file name of a state csv file.
+
+    output:
+        ai_id: numpy array of integer numbers
+            cell ID of each row.
+
+        as_state: numpy array of objects
+            state string of each row.
+
+    description:
+        function reads the ID and state column of a state csv file
+        with one vectorized pandas read. the ID header line is dropped.
+        an empty file, one that is still being written, raises EmptyDataError.
+    """
+    if os.path.getsize(s_pathfile) == 0:
+        raise pd.errors.EmptyDataError(f'{s_pathfile} is empty.')
+    df_state = pd.read_csv(
+        s_pathfile, header=None, names=['ID', 'state'], usecols=[0, 1],
+        dtype=str, keep_default_na=False,
+    )
+    df_state = df_state.loc[df_state['ID'] != 'ID', :]
+    ai_id = df_state['ID'].values.astype(np.int64)
+    as_state = df_state['state'].values
+    return ai_id, as_state
+
+
+def frame_key(xmlpathfile, statepathfile):
+    """
+    input:
+        xmlpathfile: string
+            path to and file name of a outputNNNNNNNN.xml file.
+
+        statepathfile: string
+            path to and file name of the frame's state csv file.
+
+    output:
+        t_key: tuple
+            size and modification time of the xml, cells mat, and state file.
+
+    description:
+        function returns the key used to decide if a frame has to be re-read.
+    """
+    l_key = []
+    for s_pathfile in [xmlpathfile, xmlpathfile.replace('.xml', '_cells.mat'), statepathfile]:
+        try:
+            o_stat = os.stat(s_pathfile)
+            l_key.extend([o_stat.st_size, o_stat.st_mtime_ns])
+        except FileNotFoundError:
+            l_key.extend([None, None])
+    return tuple(l_key)
+
+
+def frame_parser(output_path, i_frame, statepathfile, t_key, verbose=False):
+    """
+    input:
+        output_path: string
+            path to the PhysiCell output folder.
+
+        i_frame: integer
+            frame number.
+
+        statepathfile: string
+            path to and file name of the frame's state csv file.
+
+        t_key: tuple
+            frame_key of the frame, taken before the files are read.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        d_frame: dictionary
+            frame record with the key, the simulation time, the cell ID
+            and cell_type of each state row, and the state of each row
+            as index (ai_local) into the frame's unique state strings.
+
+    description:
+        function reads a single frame. it touches no index, so it can
+        run without holding the index's lock; the state strings are
+        interned when the record is stored.
+    """
+    # cell_type by cell ID; for duplicated IDs the first instance is used
+    mcds = pyMCDS('output%08d.xml' % i_frame, output_path, microenv=False, graph=False, verbose=verbose, columns=['cell_type'])
+    ai_cell_id = mcds.data['discrete_cells']['data']['ID'].astype(np.int64)
+    ai_cell_type = mcds.data['discrete_cells']['data']['cell_type'].astype(np.int32)
+    ai_cell_id, ai_first = np.unique(ai_cell_id, return_index=True)
+    ai_cell_type = ai_cell_type[ai_first]
+
+    # state strings to frame local codes
+    ai_id, as_state = statefile_parser(statepathfile)
+    ai_local, as_unique = pd.factorize(as_state)
+
+    # join state rows to cell_type by ID; -1 for IDs without a cell
+    ai_type = np.full(len(ai_id), -1, dtype=np.int32)
+    if len(ai_cell_id) > 0:
+        ai_pos = np.minimum(np.searchsorted(ai_cell_id, ai_id), len(ai_cell_id) - 1)
+        ab_found = ai_cell_id[ai_pos] == ai_id
+        ai_type[ab_found] = ai_cell_type[ai_pos[ab_found]]
+
+    return {
+        'key': t_key,
+        'time': mcds.get_time(),
+        'id': ai_id,
+        'local': ai_local,
+        'unique': as_unique,
+        'cell_type': ai_type,
+    }
+
+
+# object classes
+class pyMCDS_states:
+    """
+    input:
+        output_path: string
+            relative or absolute path to the directory where
+            the PhysiCell output files are stored.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        si: pyMCDS_states class instance
+            frame records are stored at si.dd_frame,
+            the state string table at si.ls_state.
+
+    description:
+        pyMCDS_states.__init__ generates an empty state index.
+        update() loads each frame's state csv file once, interns the
+        state strings into integer codes, and joins each state row with
+        the cell_type of the cell with that ID.
+        state counts for all frames are then computed with one
+        np.bincount call, and kept until the stored frames change.
+    """
+    def __init__(self, output_path, verbose=False):
+        self.output_path = str(output_path)
+        self.verbose = verbose
+        self.dd_frame = {}
+        self.ls_state = []
+        self.d_state_code = {}
+        self.d_count = {}
+        self.d_node = {}
+        # the loader thread and the GUI thread both use the index; frames are read
+        # without the lock, which is only held to check and swap the records.
+        self.lock = threading.RLock()
+
+
+    ## LOAD DATA ##
+
+    def update(self):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+        output:
+            li_loaded: list of integers
+                frame numbers of the frames which were (re)loaded.
+
+        description:
+            function globs the output folder, loads frames which are new
+            or whose xml, cells mat, or state file changed, and forgets
+            frames whose files are gone.
+        """
+        ls_xmlpathfile = glob.glob(os.path.join(self.output_path, 'output*.xml'))
+        ei_frame = set()
+        dd_new = {}
+        for s_xmlpathfile in ls_xmlpathfile:
+            o_match = re.search(r'output(\d{8})\.xml$', s_xmlpathfile)
+            if o_match is None:
+                continue
+            i_frame = int(o_match.group(1))
+            ei_frame.add(i_frame)
+            s_statepathfile = statefile_pathfile(self.output_path, i_frame)
+            if s_statepathfile is None:
+                continue
+            t_key = frame_key(s_xmlpathfile, s_statepathfile)
+            if self.is_current(i_frame, t_key):
+                continue
+            try:
+                dd_new[i_frame] = frame_parser(self.output_path, i_frame, s_statepathfile, t_key, verbose=self.verbose)
+            except T_PARTIAL_ERROR as e:
+                # partially written frame, e.g. from a running simulation; retry on next update.
+                print(f'Warning @ pyMCDS_states.update : skipping frame {i_frame}: {e}')
+
+        with self.lock:
+            # drop deleted frames, and frames whose state file is gone; a frame added since the glob is kept
+            for i_frame in list(self.dd_frame.keys()):
+                b_xml = (i_frame in ei_frame) or os.path.isfile(os.path.join(self.output_path, 'output%08d.xml' % i_frame))
+                if (not b_xml) or (statefile_pathfile(self.output_path, i_frame) is None):
+                    del self.dd_frame[i_frame]
+                    self.d_count = {}
+            for i_frame, d_frame in dd_new.items():
+                self.store(i_frame, d_frame)
+
+        return sorted(dd_new.keys())
+
+
+    def add_frame(self, i_frame):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            i_frame: integer
+                frame number.
+
+        output:
+            b_loaded: boolean
+                True if the frame was (re)loaded, False if the stored
+                record was still up to date or the frame has no state file.
+
+        description:
+            function loads a single frame into the index,
+            unless the frame is already stored and unchanged on disk.
+        """
+        s_xmlpathfile = os.path.join(self.output_path, 'output%08d.xml' % i_frame)
+        s_statepathfile = statefile_pathfile(self.output_path, i_frame)
+        if s_statepathfile is None:
+            with self.lock:
+                if self.dd_frame.pop(i_frame, None) is not None:
+                    self.d_count = {}
+            return False
+        t_key = frame_key(s_xmlpathfile, s_statepathfile)
+        if self.is_current(i_frame, t_key):
+            return False
+        d_frame = frame_parser(self.output_path, i_frame, s_statepathfile, t_key, verbose=self.verbose)
+        with self.lock:
+            self.store(i_frame, d_frame)
+        return True
+
+
+    def is_current(self, i_frame, t_key):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            i_frame: integer
+                frame number.
+
+            t_key: tuple
+                frame_key of the frame's files on disk.
+
+        output:
+            b_current: boolean
+                True if the frame is stored with this key.
+        """
+        with self.lock:
+            d_frame = self.dd_frame.get(i_frame)
+            return (d_frame is not None) and (d_frame['key'] == t_key)
+
+
+    def store(self, i_frame, d_frame):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            i_frame: integer
+                frame number.
+
+            d_frame: dictionary
+                frame record from frame_parser.
+
+        description:
+            function interns the frame's state strings and stores the
+            record, with the state of each row as shared integer code.
+        """
+        with self.lock:
+            ai_map = np.array([self.intern(s_state) for s_state in d_frame['unique']], dtype=np.int32)
+            self.dd_frame[i_frame] = {
+                'key': d_frame['key'],
+                'time': d_frame['time'],
+                'id': d_frame['id'],
+                'state': ai_map[d_frame['local']],
+                'cell_type': d_frame['cell_type'],
+            }
+            self.d_count = {}
+
+
+    def intern(self, s_state):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            s_state: string
+                state string, active nodes separated by ' -- '.
+
+        output:
+            i_code: integer
+                code of this state string, shared by all frames.
+        """
+        with self.lock:
+            try:
+                return self.d_state_code[s_state]
+            except KeyError:
+                i_code = len(self.ls_state)
+                self.d_state_code[s_state] = i_code
+                self.ls_state.append(s_state)
+                return i_code
+
+
+    ## ACCESS DATA ##
+
+    def get_frames(self):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+        output:
+            li_frame: list of integers
+                sorted frame numbers of all stored frames.
+        """
+        with self.lock:
+            return sorted(self.dd_frame.keys())
+
+
+    def get_times(self):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+        output:
+            ar_time: numpy array of floating point numbers
+                simulation time of each stored frame.
+        """
+        with self.lock:
+            return np.array([self.dd_frame[i_frame]['time'] for i_frame in self.get_frames()])
+
+
+    def get_counts(self, i_cell_type):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            i_cell_type: integer
+                cell type ID whose cells are counted.
+
+        output:
+            aai_count: 2D numpy array of integer numbers
+                number of cells per frame (rows) and state (columns).
+
+            ls_state: list of strings
+                state string of each column; only states
+                seen in this cell type are listed.
+
+        description:
+            function counts the cells of one cell type in each state in
+            every stored frame with a single np.bincount pass.
+            the result is kept until the stored frames change.
+        """
+        with self.lock:
+            try:
+                return self.d_count[i_cell_type]
+            except KeyError:
+                pass
+
+            li_frame = self.get_frames()
+            i_frame = len(li_frame)
+            i_state = len(self.ls_state)
+            ai_size = [len(self.dd_frame[i]['state']) for i in li_frame]
+            ai_frame = np.repeat(np.arange(i_frame), ai_size)
+            ai_state = np.concatenate([self.dd_frame[i]['state'] for i in li_frame] + [np.zeros(0, dtype=np.int32)])
+            ai_type = np.concatenate([self.dd_frame[i]['cell_type'] for i in li_frame] + [np.zeros(0, dtype=np.int32)])
+
+            # count all frames and states at once
+            ab_keep = ai_type == i_cell_type
+            ai_count = np.bincount(ai_frame[ab_keep] * i_state + ai_state[ab_keep], minlength=i_frame * i_state)
+            aai_count = ai_count.reshape(i_frame, i_state)
+
+            # keep only the states of this cell type
+            ai_column = np.flatnonzero(aai_count.sum(axis=0) > 0)
+            t_count = (aai_count[:, ai_column], [self.ls_state[i] for i in ai_column])
+            self.d_count[i_cell_type] = t_count
+
+            # output
+            return t_count
+
+
+    def get_node_active(self, s_node):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            s_node: string
+                boolean network node name.
+
+        output:
+            ab_active: numpy array of booleans
+                for each state code, True if the node is active in that state.
+        """
+        with self.lock:
+            ab_active = self.d_node.get(s_node)
+            if (ab_active is None) or (len(ab_active) != len(self.ls_state)):
+                ab_active = np.array([s_node in s_state.split(S_NODE_SEP) for s_state in self.ls_state], dtype=bool)
+                self.d_node[s_node] = ab_active
+            return ab_active
+
+
+    def get_frame_scalar(self, i_frame, ai_cell_id, i_cell_type, s_node):
+        """
+        input:
+            self: pyMCDS_states class instance.
+
+            i_frame: integer
+                frame number.
+
+            ai_cell_id: numpy array of integer numbers
+                cell IDs, in the order in which the cells are plotted.
+
+            i_cell_type: integer
+                cell type ID whose node state is shown.
+
+            s_node: string
+                boolean network node name.
+
+        output:
+            ai_scalar: numpy array of integer numbers
+                for each cell, 2 if the node is active, 0 if inactive,
+                and 9 for cells of other cell types or without state.
+
+        description:
+            function returns the per cell values used to color
+            the cells by the state of one node, for one frame.
+        """
+        with self.lock:
+            ai_cell_id = np.asarray(ai_cell_id, dtype=np.int64)
+            ai_scalar = np.full(len(ai_cell_id), 9, dtype=np.int32)
+            d_frame = self.dd_frame.get(i_frame)
+            if (d_frame is None) or (len(d_frame['id']) == 0) or (len(ai_cell_id) == 0):
+                return ai_scalar
+
+            # for each cell its row in the state file; the last row of a duplicated ID wins
+            ai_order = np.argsort(d_frame['id'], kind='stable')
+            ai_id_sorted = d_frame['id'][ai_order]
+            ai_pos = np.searchsorted(ai_id_sorted, ai_cell_id, side='right') - 1
+            ab_found = (ai_pos >= 0) & (ai_id_sorted[np.maximum(ai_pos, 0)] == ai_cell_id)
+            ai_row = ai_order[np.maximum(ai_pos, 0)]
+
+            ab_type = ab_found & (d_frame['cell_type'][ai_row] == i_cell_type)
+            ab_active = self.get_node_active(s_node)[d_frame['state'][ai_row]]
+            ai_scalar[ab_type & ~ab_active] = 0
+            ai_scalar[ab_type & ab_active] = 2
+
+            # output
+            return ai_scalar
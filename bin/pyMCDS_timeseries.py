@@ -0,0 +1,383 @@
+#########
+# title: pyMCDS_timeseries.py
+#
+# language: python3
+# license: BSD-3-Clause
+#
+# description:
+#     pyMCDS_timeseries.py defines an object class, able to load and access
+#     within python the discrete cell variables of all time steps from a
+#     PhysiCell model output folder. each frame is read only once, and
+#     re-read only when its files change on disk.
+#########
+
+
+# load library
+import glob
+import numpy as np
+import os
+import pathlib
+import threading
+from pyMCDS import pyMCDS
+import xml.etree.ElementTree as ET
+
+# discrete cell variables kept per frame
+LS_DISCRETE_COLUMN = [
+    'cell_type',
+    'cycle_model',
+    'current_phase',
+    'is_motile',
+    'current_death_model',
+    'dead',
+    'number_of_nuclei',
+]
+
+# one time series store per output folder, shared by all callers.
+do_timeseries = {}
+
+# functions
+def get_timeseries(output_path, update=True, verbose=False):
+    """
+    input:
+        output_path: string
+            relative or absolute path to the directory where
+            the PhysiCell output files are stored.
+
+        update: boole; default True
+            setting update to False returns the store as it is,
+            without scanning the output folder.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        ts: pyMCDS_timeseries class instance
+            the time series store for this output folder,
+            brought up to date with the files on disk.
+
+    description:
+        function returns the persistent time series store for an
+        output folder. the store is generated on the first call,
+        later calls only load frames that are new or have changed.
+        while the folder is followed (ts.follow is True), the follower
+        adds new frames itself and no folder scan is done here.
+    """
+    s_path = str(pathlib.Path(output_path).resolve())
+    try:
+        ts = do_timeseries[s_path]
+    except KeyError:
+        ts = pyMCDS_timeseries(s_path, verbose=verbose)
+        do_timeseries[s_path] = ts
+    if update and not ts.follow:
+        ts.update()
+    return ts
+
+
+def frame_key(xmlpathfile):
+    """
+    input:
+        xmlpathfile: string
+            path to and file name of a outputNNNNNNNN.xml file.
+
+    output:
+        t_key: tuple
+            size and modification time of the xml file and its cells mat file.
+
+    description:
+        function returns the key used to decide if a frame has to be re-read.
+    """
+    s_cellpathfile = xmlpathfile.replace('.xml', '_cells.mat')
+    l_key = []
+    for s_pathfile in [xmlpathfile, s_cellpathfile]:
+        try:
+            o_stat = os.stat(s_pathfile)
+            l_key.extend([o_stat.st_size, o_stat.st_mtime_ns])
+        except FileNotFoundError:
+            l_key.extend([None, None])
+    return tuple(l_key)
+
+
+def frame_parser(output_path, xmlfile, t_key, ls_column, verbose=False):
+    """
+    input:
+        output_path: string
+            path to the PhysiCell output folder.
+
+        xmlfile: string
+            name of the xml file, without path.
+
+        t_key: tuple
+            frame_key of the frame, taken before the files are read.
+
+        ls_column: list of strings
+            discrete cell variables to keep.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        d_frame: dictionary
+            frame record with the key, the simulation time, and the
+            discrete cell variables as integer arrays.
+
+    description:
+        function reads a single frame. it touches no store,
+        so it can run without holding the store's lock.
+    """
+    mcds = pyMCDS(xmlfile, output_path, microenv=False, graph=False, verbose=verbose, columns=ls_column)
+    d_data = {}
+    for s_column in ls_column:
+        try:
+            d_data[s_column] = mcds.data['discrete_cells']['data'][s_column].astype(np.int32)
+        except KeyError:
+            pass
+    return {
+        'key': t_key,
+        'time': mcds.get_time(),
+        'data': d_data,
+    }
+
+
+# object classes
+class pyMCDS_timeseries:
+    """
+    input:
+        output_path: string
+            relative or absolute path to the directory where
+            the PhysiCell output files are stored.
+
+        ls_column: list of strings; default LS_DISCRETE_COLUMN
+            discrete cell variables to keep for each frame.
+
+        verbose: boole; default False
+            setting verbose to True for more text output, while processing.
+
+    output:
+        ts: pyMCDS_timeseries class instance
+            frame records are stored at ts.dd_frame.
+
+    description:
+        pyMCDS_timeseries.__init__ generates an empty time series store.
+        update() loads each output*.xml frame once and keeps only the
+        discrete cell variables as compact integer arrays.
+        counts for all frames are then computed with one np.bincount call.
+    """
+    def __init__(self, output_path, ls_column=LS_DISCRETE_COLUMN, verbose=False):
+        self.output_path = str(output_path)
+        self.ls_column = list(ls_column)
+        self.verbose = verbose
+        self.dd_frame = {}
+        self.d_concat = {}
+        self.follow = False
+        # the loader thread and the GUI thread both use the store; frames are read
+        # without the lock, which is only held to check and swap the records.
+        self.lock = threading.RLock()
+
+
+    ## LOAD DATA ##
+
+    def update(self):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+        output:
+            ls_loaded: list of strings
+                xml file names of the frames which were (re)loaded.
+
+        description:
+            function globs the output folder, loads frames which are new
+            or whose xml or cells mat file changed, and forgets frames
+            whose files are gone.
+        """
+        ls_xmlpathfile = glob.glob(os.path.join(self.output_path, 'output*.xml'))
+        es_xmlfile = set()
+        dd_new = {}
+        for s_xmlpathfile in ls_xmlpathfile:
+            s_xmlfile = os.path.basename(s_xmlpathfile)
+            es_xmlfile.add(s_xmlfile)
+            t_key = frame_key(s_xmlpathfile)
+            if self.is_current(s_xmlfile, t_key):
+                continue
+            try:
+                dd_new[s_xmlfile] = frame_parser(self.output_path, s_xmlfile, t_key, self.ls_column, verbose=self.verbose)
+            except (FileNotFoundError, ET.ParseError) as e:
+                # partially written frame, e.g. from a running simulation; retry on next update.
+                print(f'Warning @ pyMCDS_timeseries.update : skipping {s_xmlfile}: {e}')
+
+        with self.lock:
+            # drop deleted frames; a frame added since the glob is kept
+            for s_xmlfile in set(self.dd_frame.keys()).difference(es_xmlfile):
+                if not os.path.isfile(os.path.join(self.output_path, s_xmlfile)):
+                    del self.dd_frame[s_xmlfile]
+                    self.d_concat = {}
+            if len(dd_new) > 0:
+                self.dd_frame.update(dd_new)
+                self.d_concat = {}
+
+        return sorted(dd_new.keys())
+
+
+    def add_frame(self, xmlfile):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+            xmlfile: string
+                name of the xml file, without path.
+
+        output:
+            b_loaded: boolean
+                True if the frame was (re)loaded, False if the cached
+                record was still up to date.
+
+        description:
+            function loads a single frame into the store,
+            unless the frame is already stored and unchanged on disk.
+        """
+        t_key = frame_key(os.path.join(self.output_path, xmlfile))
+        if self.is_current(xmlfile, t_key):
+            return False
+        d_frame = frame_parser(self.output_path, xmlfile, t_key, self.ls_column, verbose=self.verbose)
+        with self.lock:
+            self.dd_frame[xmlfile] = d_frame
+            self.d_concat = {}
+        return True
+
+
+    def is_current(self, xmlfile, t_key):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+            xmlfile: string
+                name of the xml file, without path.
+
+            t_key: tuple
+                frame_key of the frame's files on disk.
+
+        output:
+            b_current: boolean
+                True if the frame is stored with this key.
+        """
+        with self.lock:
+            d_frame = self.dd_frame.get(xmlfile)
+            return (d_frame is not None) and (d_frame['key'] == t_key)
+
+
+    ## ACCESS DATA ##
+
+    def get_xmlfiles(self):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+        output:
+            ls_xmlfile: list of strings
+                sorted xml file names of all stored frames.
+        """
+        with self.lock:
+            return sorted(self.dd_frame.keys())
+
+
+    def get_times(self):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+        output:
+            ar_time: numpy array of floating point numbers
+                simulation time of each stored frame.
+        """
+        with self.lock:
+            return np.array([self.dd_frame[s_xmlfile]['time'] for s_xmlfile in self.get_xmlfiles()])
+
+
+    def has_variable(self, s_variable):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+            s_variable: string
+                discrete cell variable name.
+
+        output:
+            b_has: boolean
+                True if all stored frames hold this variable.
+        """
+        with self.lock:
+            if len(self.dd_frame) == 0:
+                return False
+            return all(s_variable in d_frame['data'] for d_frame in self.dd_frame.values())
+
+
+    def _get_concat(self, s_variable):
+        """
+        internal function that returns the variable of all frames as
+        one array, cached until the stored frames change.
+        """
+        with self.lock:
+            try:
+                ai_value = self.d_concat[s_variable]
+            except KeyError:
+                ls_xmlfile = self.get_xmlfiles()
+                ai_value = np.concatenate([self.dd_frame[s_xmlfile]['data'][s_variable] for s_xmlfile in ls_xmlfile] + [np.zeros(0, dtype=np.int32)])
+                self.d_concat[s_variable] = ai_value
+            return ai_value
+
+
+    def get_counts(self, s_variable, li_value, celltype_filter=None, r_cycle_model_max=None):
+        """
+        input:
+            self: pyMCDS_timeseries class instance.
+
+            s_variable: string
+                discrete cell variable name.
+
+            li_value: list of integers
+                variable values to count.
+
+            celltype_filter: list of integers; default None
+                if not empty, only cells of these cell types are counted.
+
+            r_cycle_model_max: floating point number; default None
+                if not None, only cells with a cycle_model value below
+                this threshold are counted.
+
+        output:
+            aai_count: 2D numpy array of integer numbers
+                number of cells per frame (rows) and value (columns).
+
+        description:
+            function counts the cells for each requested value in
+            every stored frame with a single np.bincount pass.
+        """
+        with self.lock:
+            ls_xmlfile = self.get_xmlfiles()
+            i_frame = len(ls_xmlfile)
+            ai_value_out = np.array(li_value, dtype=np.int64)
+            if (i_frame == 0) or (len(ai_value_out) == 0):
+                return np.zeros((i_frame, len(ai_value_out)), dtype=np.int64)
+
+            # frame index for each cell
+            ai_size = [len(self.dd_frame[s_xmlfile]['data'][s_variable]) for s_xmlfile in ls_xmlfile]
+            ai_frame = np.repeat(np.arange(i_frame), ai_size)
+            ai_value = self._get_concat(s_variable).astype(np.int64)
+
+            # filter cells
+            ab_keep = np.ones(ai_value.shape, dtype=bool)
+            if celltype_filter:
+                ab_keep &= np.isin(self._get_concat('cell_type'), celltype_filter)
+            if not (r_cycle_model_max is None):
+                ab_keep &= self._get_concat('cycle_model') < r_cycle_model_max
+            ai_frame = ai_frame[ab_keep]
+            ai_value = ai_value[ab_keep]
+
+            # count all frames and values at once
+            i_min = min(ai_value.min(initial=0), ai_value_out.min())
+            i_bin = max(ai_value.max(initial=0), ai_value_out.max()) - i_min + 1
+            ai_count = np.bincount(ai_frame * i_bin + (ai_value - i_min), minlength=i_frame * i_bin)
+            aai_count = ai_count.reshape(i_frame, i_bin)
+
+            # output
+            return aai_count[:, ai_value_out - i_min]
@@ -21,6 +21,7 @@ from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QProcess
 from cell_def_tab import CellDefException
 from studio_classes import StudioTab
+from output_watcher import OutputWatcher
 
 class QHLine(QFrame):
     def __init__(self):
@@ -66,6 +67,7 @@ class RunModel(StudioTab):
         self.scroll = QScrollArea()
 
         self.p = None
+        self.output_watcher = None   # follows the output folder while a simulation runs
         # self.xmin = 0.0
         # self.xmax = 1.0
         # self.ymin = 0.0
@@ -252,6 +254,9 @@ class RunModel(StudioTab):
                 self.p.stateChanged.connect(self.handle_state)
                 self.p.finished.connect(self.process_finished)  # Clean up once complete.
                 # self.p.start("mymodel", ['biobots.xml'])
+                # follow new frames in the output folder (relative to the cwd the exec runs from)
+                self.start_output_watcher(self.output_dir)
+
                 exec_str = self.exec_name.text()
                 xml_str = self.config_xml_name.text()
                 print("\n--- run_tab:  xml_str before run is ",xml_str)
@@ -299,6 +304,7 @@ class RunModel(StudioTab):
                 self.p.kill()   # I *think* this worked better for Windows (but still worked for other OSes, on the desktop)
             # self.run_button.setEnabled(True)
             self.enable_run(True)
+            self.stop_output_watcher()
 
     def handle_stderr(self):
         data = self.p.readAllStandardError()
@@ -335,6 +341,7 @@ class RunModel(StudioTab):
     def process_finished(self):
         self.message("Process finished.")
         self.enable_run(True)
+        self.stop_output_watcher()
         # print("-- process finished.")
         self.xml_creator.vis_tab.first_plot_cb("foo")
         if self.xml_creator.nanohub_flag:
@@ -342,6 +349,17 @@ class RunModel(StudioTab):
         self.p = None
         self.run_button.setEnabled(True)
         
+    def start_output_watcher(self, output_dir):
+        self.stop_output_watcher()
+        self.output_watcher = OutputWatcher(output_dir, parent=self)
+        if self.vis_tab:
+            self.output_watcher.frames_added.connect(self.xml_creator.vis_tab.live_frames_cb)
+        self.output_watcher.start()
+
+    def stop_output_watcher(self):
+        if self.output_watcher:
+            self.output_watcher.stop()
+
     def show_error_message(self, message):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Critical)
@@ -21,10 +21,10 @@ import platform
 import sys
 import time
 import argparse
+import importlib.util
 import logging
 import traceback
 import shutil # for possible copy of file
-import zipfile
 import glob
 from pathlib import Path
 import xml.etree.ElementTree as ET  # https://docs.python.org/2/library/xml.etree.elementtree.html
@@ -38,20 +38,30 @@ from PyQt5.QtCore import Qt, QLocale
 from PyQt5.QtWidgets import QStyleFactory
 
 from pretty_print_xml import pretty_print
-from config_tab import Config
-from cell_def_tab import CellDef, CellDefException
-from microenv_tab import SubstrateDef 
-from user_params_tab import UserParams 
+from lazy_tab import LazyTab, startup_profile
+# The editing tabs are built at startup (loading a model fills them); the Plot tab (and the ICs' BIWT) are lazy, i.e., LazyTab.
+with startup_profile.timed('config_tab', 'import'):
+    from config_tab import Config
+with startup_profile.timed('cell_def_tab', 'import'):
+    from cell_def_tab import CellDef, CellDefException
+with startup_profile.timed('microenv_tab', 'import'):
+    from microenv_tab import SubstrateDef 
+with startup_profile.timed('user_params_tab', 'import'):
+    from user_params_tab import UserParams 
 try:
-    from rules_tab import Rules
+    with startup_profile.timed('rules_tab', 'import'):
+        from rules_tab import Rules
 except:
     pass
-from ics_tab import ICs
+with startup_profile.timed('ics_tab', 'import'):
+    from ics_tab import ICs
 from populate_tree_cell_defs import populate_tree_cell_defs
-from run_tab import RunModel 
+with startup_profile.timed('run_tab', 'import'):
+    from run_tab import RunModel 
 from settings import StudioSettings
 # from legend_tab import Legend 
 
+from output_archiver import start_archive_job
 from galaxy_functions import save_project_galaxy, load_project_galaxy_history, \
     get_galaxy_history, download_config_galaxy, download_zipped_csv_galaxy, download_all_zipped_galaxy
 try:
@@ -60,16 +70,16 @@ except:
     print("----- Note: cannot import from galaxy_ie_helpers ")
     pass
 
+# simulariumio is only used by the Plot tab (vis_base); just check that it's there
 try:
-    from simulariumio import UnitData, MetaData, DisplayData, DISPLAY_TYPE, ModelMetaData
-    from simulariumio.physicell import PhysicellConverter, PhysicellData
-    simularium_installed = True
+    simularium_installed = importlib.util.find_spec('simulariumio') is not None
 except:
     simularium_installed = False
 
 PHYSIBOSS_MODELS_IMPORTED = False
 try:
-    import physiboss_models
+    with startup_profile.timed('physiboss_models', 'import'):
+        import physiboss_models
 except ImportError:
     print("----- Warning: physiboss_models not imported.")
     print("      You can try to run 'pip install -r requirements.txt'")
@@ -100,19 +110,17 @@ class PhysiCellXMLCreator(QWidget):
         super(PhysiCellXMLCreator, self).__init__(parent)
         QLocale.setDefault(QLocale(QLocale.English, QLocale.UnitedStates))
         if model3D_flag:
-            try:
-                import vtk
-            except:
+            if importlib.util.find_spec('vtk') is None:   # vtk itself is imported with the Plot tab
                 print("\nError: Unable to `import vtk` for 3D visualization. \nYou can try to do `pip install vtk` from the command line and then and re-run the Studio, or run the Studio without the 3D visualization argument and settle for 2D vis.\n")
                 sys.exit(-1)
-            from vis3D_tab import Vis 
+            self.vis_module_name = 'vis3D_tab'
 
             # if tensor3D_flag:
             #     try:
             #         if tensor3D_flag:
             #     except:
         else:
-            from vis_tab import Vis 
+            self.vis_module_name = 'vis_tab'
 
         self.studio_flag = studio_flag 
         # self.view_shading = None
@@ -214,7 +222,8 @@ class PhysiCellXMLCreator(QWidget):
         self.num_models = 0
         self.model = {}  # key: name, value:[read-only, tree]
 
-        self.config_tab = Config(self)
+        with startup_profile.timed('config_tab', 'construct'):
+            self.config_tab = Config(self)
         self.config_tab_index = 0
         self.config_tab.xml_root = self.xml_root
         self.config_tab.fill_gui()
@@ -229,7 +238,8 @@ class PhysiCellXMLCreator(QWidget):
             self.config_tab.folder.setText('.')
             self.config_tab.csv_folder.setEnabled(False)
 
-        self.microenv_tab = SubstrateDef(self.config_tab)
+        with startup_profile.timed('microenv_tab', 'construct'):
+            self.microenv_tab = SubstrateDef(self.config_tab)
         self.microenv_tab_index = 1
         self.microenv_tab.xml_root = self.xml_root
         substrate_name = self.microenv_tab.first_substrate_name()
@@ -237,7 +247,8 @@ class PhysiCellXMLCreator(QWidget):
         self.microenv_tab.populate_tree()  # rwh: both fill_gui and populate_tree??
 
 
-        self.celldef_tab = CellDef(self)
+        with startup_profile.timed('cell_def_tab', 'construct'):
+            self.celldef_tab = CellDef(self)
         self.celldef_tab.xml_root = self.xml_root
         if is_movable_flag:
             self.celldef_tab.is_movable_w.setEnabled(True)
@@ -249,7 +260,8 @@ class PhysiCellXMLCreator(QWidget):
         self.celldef_tab.fill_substrates_comboboxes() # do before populate? Yes, assuming we check for cell_def != None
 
         # Beware: this may set the substrate chosen for Motility/[Advanced]Chemotaxis
-        populate_tree_cell_defs(self.celldef_tab, self.skip_validate_flag)
+        with startup_profile.timed('cell_def_tab', 'construct'):
+            populate_tree_cell_defs(self.celldef_tab, self.skip_validate_flag)
         # self.celldef_tab.customdata.param_d = self.celldef_tab.param_d
 
 
@@ -258,7 +270,8 @@ class PhysiCellXMLCreator(QWidget):
 
         self.microenv_tab.celldef_tab = self.celldef_tab
 
-        self.user_params_tab = UserParams(self)
+        with startup_profile.timed('user_params_tab', 'construct'):
+            self.user_params_tab = UserParams(self)
         self.user_params_tab.xml_root = self.xml_root
         self.user_params_tab.fill_gui()
 
@@ -282,7 +295,8 @@ class PhysiCellXMLCreator(QWidget):
 
         if self.rules_flag:
             # self.rules_tab = Rules(self.nanohub_flag, self.microenv_tab, self.celldef_tab)
-            self.rules_tab = Rules(self)
+            with startup_profile.timed('rules_tab', 'construct'):
+                self.rules_tab = Rules(self)
             # self.rules_tab.fill_gui()
             self.tabWidget.addTab(self.rules_tab,"Rules")
             self.rules_tab.xml_root = self.xml_root
@@ -297,7 +311,8 @@ class PhysiCellXMLCreator(QWidget):
 
         if self.studio_flag:
             logging.debug(f'studio.py: creating ICs, Run, and Plot tabs')
-            self.ics_tab = ICs(self)
+            with startup_profile.timed('ics_tab', 'construct'):
+                self.ics_tab = ICs(self)
             self.config_tab.ics_tab = self.ics_tab
             self.microenv_tab.ics_tab = self.ics_tab
             self.ics_tab.fill_celltype_combobox()
@@ -322,7 +337,8 @@ class PhysiCellXMLCreator(QWidget):
             # self.rules_tab.fill_gui()
             self.tabWidget.addTab(self.ics_tab,"ICs")
 
-            self.run_tab = RunModel(self)
+            with startup_profile.timed('run_tab', 'construct'):
+                self.run_tab = RunModel(self)
 
             self.homedir = os.getcwd()
             # print("studio.py: self.homedir = ",self.homedir)
@@ -351,32 +367,14 @@ class PhysiCellXMLCreator(QWidget):
 
             self.tabWidget.addTab(self.run_tab,"Run")
 
-            # config_tab needed for 3D domain boundary outline
-            self.vis_tab = Vis(self.studio_flag, self.rules_flag, self.nanohub_flag, self.config_tab, self.microenv_tab, self.celldef_tab, self.user_params_tab, self.rules_tab, self.ics_tab, self.run_tab, self.model3D_flag, self.tensor_flag, self.ecm_flag, self.galaxy_flag)
-            self.vis_tab.output_folder.setText(self.config_tab.folder.text())
-            self.vis_tab.update_output_dir(self.config_tab.folder.text())
-            self.config_tab.vis_tab = self.vis_tab
-            if self.nanohub_flag:  # rwh - test if works on nanoHUB
-                # self.vis_tab.output_folder.setText('tmpdir')
-                self.vis_tab.output_folder.setText('.')
-                # self.vis_tab.output_folder.setEnabled(False)
-                self.vis_tab.output_folder_button.setEnabled(False)
-
-            self.vis_tab.config_tab = self.config_tab
-            self.run_tab.vis_tab = self.vis_tab
-            self.tabWidget.addTab(self.vis_tab,"Plot")
+            # the Plot tab (and matplotlib or VTK) is imported and built when first shown, or first used (self.vis_tab)
+            self.plot_tab = LazyTab(self.tabWidget, "Plot", self.vis_module_name, self.build_vis_tab)
+            self.run_tab.vis_tab = self.plot_tab   # replaced by the Plot tab when built
+            self.tabWidget.addTab(self.plot_tab,"Plot")
             self.enablePlotTab(False)
             self.enablePlotTab(True)
 
-            self.studio_settings = StudioSettings(self, self.fix_min_size, self.vis_tab)  # pass in dict eventually
-
-            self.run_tab.vis_tab = self.vis_tab
-            logging.debug(f'studio.py: calling vis_tab.substrates_cbox_changed_cb(2)')
-            self.vis_tab.fill_substrates_combobox(self.celldef_tab.substrate_list)
-            self.vis_tab.init_plot_range(self.config_tab)
-
-            self.vis_tab.update_output_dir(self.config_tab.folder.text())
-            self.vis_tab.reset_model()
+            self.studio_settings = None   # created on first use (Settings menu)
 
 
         vlayout.addWidget(self.tabWidget)
@@ -391,6 +389,33 @@ class PhysiCellXMLCreator(QWidget):
             self.tabWidget.setCurrentIndex(self.config_tab_index)  # Config (default)
 
 
+    @property
+    def vis_tab(self):
+        return self.plot_tab.widget()
+
+    def build_vis_tab(self, vis_module):
+        # config_tab needed for 3D domain boundary outline
+        vis_tab = vis_module.Vis(self.studio_flag, self.rules_flag, self.nanohub_flag, self.config_tab, self.microenv_tab, self.celldef_tab, self.user_params_tab, self.rules_tab, self.ics_tab, self.run_tab, self.model3D_flag, self.tensor_flag, self.ecm_flag, self.galaxy_flag)
+        vis_tab.output_folder.setText(self.config_tab.folder.text())
+        vis_tab.update_output_dir(self.config_tab.folder.text())
+        self.config_tab.vis_tab = vis_tab
+        if self.nanohub_flag:  # rwh - test if works on nanoHUB
+            # vis_tab.output_folder.setText('tmpdir')
+            vis_tab.output_folder.setText('.')
+            # vis_tab.output_folder.setEnabled(False)
+            vis_tab.output_folder_button.setEnabled(False)
+
+        vis_tab.config_tab = self.config_tab
+        self.run_tab.vis_tab = vis_tab
+
+        logging.debug(f'studio.py: calling vis_tab.substrates_cbox_changed_cb(2)')
+        vis_tab.fill_substrates_combobox(self.celldef_tab.substrate_list)
+        vis_tab.init_plot_range(self.config_tab)
+
+        vis_tab.update_output_dir(self.config_tab.folder.text())
+        vis_tab.reset_model()
+        return vis_tab
+
     def tab_change_cb(self,index: int):
         if index == self.microenv_tab_index: # microenv_tab
             self.microenv_tab.update_3D()
@@ -446,6 +471,8 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
         returnValue = msgBox.exec()
 
     def settings_studio_cb(self):
+        if self.studio_settings is None:
+            self.studio_settings = StudioSettings(self, self.fix_min_size, self.vis_tab)  # pass in dict eventually
         self.studio_settings.hide()
         self.studio_settings.show()
 
@@ -680,10 +707,10 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
         # self.xml_root = self.tree.getroot()
         self.reset_xml_root()
         self.setWindowTitle(self.title_prefix + self.config_file)
-        if self.model3D_flag:
-            self.vis_tab.reset_domain_box()
-
-        self.update_vis_tab()
+        if self.studio_flag and self.plot_tab.built:
+            if self.model3D_flag:
+                self.vis_tab.reset_domain_box()
+            self.update_vis_tab()
         self.update_ICs_tab()
 
 
@@ -711,7 +738,8 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
                 self.run_tab.config_xml_name.setText(self.current_xml_file)
 
             self.show_sample_model()
-            self.vis_tab.update_output_dir(self.config_tab.folder.text())
+            if self.studio_flag and self.plot_tab.built:
+                self.vis_tab.update_output_dir(self.config_tab.folder.text())
             # self.reset_xml_root()   #rwh - done in show_sample_model
 
         else:
@@ -1092,10 +1120,11 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
         # print("-------- load_model(): name=",name)
         if self.studio_flag:
             self.run_tab.cancel_model_cb()  # if a sim is already running, cancel it
-            self.vis_tab.physiboss_vis_checkbox = None    # default: assume a non-boolean intracellular model
-            self.vis_tab.physiboss_vis_flag = False
-            if self.vis_tab.physiboss_vis_checkbox:
-                self.vis_tab.physiboss_vis_checkbox.setChecked(False)
+            if self.plot_tab.built:
+                self.vis_tab.physiboss_vis_checkbox = None    # default: assume a non-boolean intracellular model
+                self.vis_tab.physiboss_vis_flag = False
+                if self.vis_tab.physiboss_vis_checkbox:
+                    self.vis_tab.physiboss_vis_checkbox.setChecked(False)
         # print("-------- load_model(): #2")
 
         try:
@@ -1137,8 +1166,7 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
         if returnValue == QMessageBox.Cancel:
             return
 
-        self.vis_tab.convert_to_simularium(self.current_xml_file)
-        print("---- Simularium file created.")
+        self.vis_tab.convert_to_simularium(self.current_xml_file)   # finishes in the background
         return
 
     #-------  Leave these for nanoHUB ---------------
@@ -1362,74 +1390,41 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
 
     def download_output_cb(self):
         if self.nanohub_flag:
-            try:
-                if self.p is None:  # No process running.
-                    self.p = QProcess()
-                    self.p.readyReadStandardOutput.connect(self.handle_stdout)
-                    self.p.readyReadStandardError.connect(self.handle_stderr)
-                    self.p.stateChanged.connect(self.handle_state)
-                    self.p.finished.connect(self.process_finished)  # Clean up once complete.
-
-                    # file_str = os.path.join(self.output_dir, '*.svg')
-                    file_str = "*"  # cwd is tmpdir
-                    print('-------- download_output_cb): zip up all ',file_str)
-                    with zipfile.ZipFile('pcstudio_output.zip', 'w') as myzip:
-                        for f in glob.glob(file_str):
-                            myzip.write(f, os.path.basename(f))   # 2nd arg avoids full filename 
-                    self.p.start("exportfile pcstudio_output.zip")
-                else:
-                    # self.debug_tab.add_msg(" download_svg_cb():  self.p is NOT None; just return!")
-                    print(" download_output_cb():  self.p is NOT None; just return!")
-            except:
-                self.message("Unable to download pcstudio_output.zip")
-                print("Unable to download pcstudio_output.zip")
-                self.p = None
+            if self.p is not None:
+                print(" download_output_cb():  self.p is NOT None; just return!")
+                return
+            file_str = "*"  # cwd is tmpdir
+            print('-------- download_output_cb): zip up all ',file_str)
+            # zip in a worker thread (only adding what is new since the last download), then exportfile it
+            start_archive_job(self, 'pcstudio_output.zip', [file_str], finished=self.exportfile)
         return
 
 
     def download_csv_cb(self):
         if self.nanohub_flag:
-            # self.debug_tab.add_msg("download_csv_cb() ------------")
-            # self.debug_tab.add_msg("        home_dir= "+self.home_dir)
-
-            try:
-                if self.p is None:  # No process running.
-                    logging.debug(f'download_csv_cb(): before QProcess()')
-                    self.p = QProcess()
-                    logging.debug(f'download_csv_cb(): after QProcess()')
-                    self.p.readyReadStandardOutput.connect(self.handle_stdout)
-                    self.p.readyReadStandardError.connect(self.handle_stderr)
-                    self.p.stateChanged.connect(self.handle_state)
-                    self.p.finished.connect(self.process_finished)  # Clean up once complete.
+            if self.p is not None:
+                logging.debug(f'download_csv_cb(): failed; self.p is not None')
+                return
+            files_str = '*.csv'
+            logging.debug(f'download_csv_b(): files_str={files_str}')
+            start_archive_job(self, 'csv.zip', [files_str], finished=self.exportfile)
 
-                    logging.debug(f'download_csv_cb(): before files_str()')
-                    files_str = os.path.join('.','*.csv')
-                    logging.debug(f'download_csv_b(): files_str={files_str}')
-                    # files_l = glob.glob(files_str)
-                    # logging.debug(f'download_csv_b(): files_l={files_l}')
-                    # self.debug_tab.add_msg("   files_l="+files_l)
-                    # self.debug_tab.add_msg("   next, zip all .csv")
-                    with zipfile.ZipFile('csv.zip', 'w') as myzip:
-                        for f in glob.glob(files_str):
-                        # for f in files_l:
-                            base_fname = os.path.basename(f)
-                            logging.debug(f'download_csv_cb(): f={f}')
-                            logging.debug(f'download_csv_cb(): base_fname={base_fname}')
-                            # self.debug_tab.add_msg("   base_fname="+base_fname)
-                            # myzip.write(f, os.path.basename(f))   # 2nd arg avoids full filename 
-                            myzip.write(f, base_fname)   # 2nd arg avoids full filename 
-                            # myzip.write(base_fname)   # 2nd arg avoids full filename 
-                    self.p.start("exportfile csv.zip")
-                    # self.debug_tab.add_msg("   lastly, os.system(exportfile csv.zip)")
-                    # os.system("exportfile csv.zip")
-                else:
-                    logging.debug(f'download_csv_cb(): failed; self.p is not None')
-                    pass
-            except:
-                # self.debug_tab.add_msg("   Error: exception occurred")
-                # print("   download_csv_cb(): Error: exception occurred")
-                logging.debug(f'download_csv_cb(): failed try: Unable to exportfile csv.zip')
-                self.p = None
+    def exportfile(self, fname):
+        try:
+            if self.p is None:  # No process running.
+                self.p = QProcess()
+                self.p.readyReadStandardOutput.connect(self.handle_stdout)
+                self.p.readyReadStandardError.connect(self.handle_stderr)
+                self.p.stateChanged.connect(self.handle_state)
+                self.p.finished.connect(self.process_finished)  # Clean up once complete.
+
+                self.p.start("exportfile " + fname)
+            else:
+                print(f" exportfile({fname}):  self.p is NOT None; just return!")
+        except:
+            self.message(f"Unable to download {fname}")
+            print(f"Unable to download {fname}")
+            self.p = None
 
 
 #------------------------------------------------------------
@@ -1461,6 +1456,7 @@ def main():
         parser.add_argument("-c ", "--config", type=str, help="config file (.xml)")
         parser.add_argument("-e ", "--exec", type=str, help="executable model")
         parser.add_argument("--bioinf_import","--biwt", dest="biwt_flag", help="display bioinformatics walkthrough tab on ICs tab", action="store_true")
+        parser.add_argument("--profile-startup", dest="profile_startup", help="report import and construction time per module at startup", action="store_true")
 
         if platform.system() == "Windows":
             exec_file = 'project.exe'
@@ -1525,6 +1521,8 @@ def main():
                 sys.exit()
         if args.biwt_flag:
             biwt_flag = True
+        if args.profile_startup:
+            startup_profile.enabled = True
     except:
         # print("Error parsing command line args.")
         sys.exit(-1)
@@ -1608,6 +1606,7 @@ def main():
     # ex.repaint()  # Config (default)
 
     ex.show()
+    startup_profile.report()   # if --profile-startup; lazy tabs report when first built
 
     # -- Insanity. Just trying to refresh the initial Config tab so the checkboxes will render properly :/
     # ex.config_tab.update()  # attempt to refresh, to show checkboxes!
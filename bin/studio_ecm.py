@@ -28,7 +28,7 @@ import numpy as np
 from PyQt5 import QtCore, QtGui
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import QPalette, QColor, QIcon, QFont
-from PyQt5.QtCore import Qt, QLocale
+from PyQt5.QtCore import Qt, QLocale, QProcess
 from PyQt5.QtWidgets import QStyleFactory
 
 from pretty_print_xml import pretty_print
@@ -43,6 +43,7 @@ except:
 from ics_tab import ICs
 from populate_tree_cell_defs import populate_tree_cell_defs
 from run_tab import RunModel 
+from output_archiver import start_archive_job
 # from legend_tab import Legend 
 
 try:
@@ -1207,60 +1208,41 @@ PhysiCell Studio is provided "AS IS" without warranty of any kind. &nbsp; In no
 
     def download_svg_cb(self):
         if self.nanohub_flag:
-            try:
-                if self.p is None:  # No process running.
-                    self.p = QProcess()
-                    self.p.readyReadStandardOutput.connect(self.handle_stdout)
-                    self.p.readyReadStandardError.connect(self.handle_stderr)
-                    self.p.stateChanged.connect(self.handle_state)
-                    self.p.finished.connect(self.process_finished)  # Clean up once complete.
-
-                    # file_str = os.path.join(self.output_dir, '*.svg')
-                    file_str = "*.svg"
-                    print('-------- download_svg_cb(): zip up all ',file_str)
-                    with zipfile.ZipFile('svg.zip', 'w') as myzip:
-                        for f in glob.glob(file_str):
-                            myzip.write(f, os.path.basename(f))   # 2nd arg avoids full filename 
-                    self.p.start("exportfile svg.zip")
-                else:
-                    # self.debug_tab.add_msg(" download_svg_cb():  self.p is NOT None; just return!")
-                    print(" download_svg_cb():  self.p is NOT None; just return!")
-            except:
-                self.message("Unable to download svg.zip")
-                print("Unable to download svg.zip")
-                self.p = None
+            if self.p is not None:
+                print(" download_svg_cb():  self.p is NOT None; just return!")
+                return
+            file_str = "*.svg"
+            print('-------- download_svg_cb(): zip up all ',file_str)
+            # zip in a worker thread (only adding what is new since the last download), then exportfile it
+            start_archive_job(self, 'svg.zip', [file_str], finished=self.exportfile)
         return
 
     def download_full_cb(self):
         if self.nanohub_flag:
-            try:
-                if self.p is None:  # No process running.
-                    self.p = QProcess()
-                    self.p.readyReadStandardOutput.connect(self.handle_stdout)
-                    self.p.readyReadStandardError.connect(self.handle_stderr)
-                    self.p.stateChanged.connect(self.handle_state)
-                    self.p.finished.connect(self.process_finished)  # Clean up once complete.
-
-                    # file_xml = os.path.join(self.output_dir, '*.xml')
-                    # file_mat = os.path.join(self.output_dir, '*.mat')
-                    file_xml = '*.xml'
-                    file_mat = '*.mat'
-                    print('-------- download_full_cb(): zip up all .xml and .mat')
-                    with zipfile.ZipFile('mcds.zip', 'w') as myzip:
-                        for f in glob.glob(file_xml):
-                            myzip.write(f, os.path.basename(f)) # 2nd arg avoids full filename path in the archive
-                        for f in glob.glob(file_mat):
-                            myzip.write(f, os.path.basename(f))
-                    self.p.start("exportfile mcds.zip")
-                else:
-                    # self.debug_tab.add_msg(" download_full_cb():  self.p is NOT None; just return!")
-                    print(" download_full_cb():  self.p is NOT None; just return!")
-            except:
-                self.message("Unable to download mcds.zip")
-                print("Unable to download mcds.zip")
-                self.p = None
+            if self.p is not None:
+                print(" download_full_cb():  self.p is NOT None; just return!")
+                return
+            print('-------- download_full_cb(): zip up all .xml and .mat')
+            start_archive_job(self, 'mcds.zip', ['*.xml', '*.mat'], finished=self.exportfile)
         return
 
+    def exportfile(self, fname):
+        try:
+            if self.p is None:  # No process running.
+                self.p = QProcess()
+                self.p.readyReadStandardOutput.connect(self.handle_stdout)
+                self.p.readyReadStandardError.connect(self.handle_stderr)
+                self.p.stateChanged.connect(self.handle_state)
+                self.p.finished.connect(self.process_finished)  # Clean up once complete.
+
+                self.p.start("exportfile " + fname)
+            else:
+                print(f" exportfile({fname}):  self.p is NOT None; just return!")
+        except:
+            self.message(f"Unable to download {fname}")
+            print(f"Unable to download {fname}")
+            self.p = None
+
     def biorobots_nanohub_cb(self):
         print("\n\n\n================ copy/load sample ======================================")
         os.chdir(self.homedir)
@@ -25,6 +25,7 @@ import inspect
 from vis_base import VisBase
 
 from vtk import *
+from vtk.util import numpy_support
 from vtk.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
 from PyQt5 import QtCore, QtGui
@@ -177,20 +178,16 @@ class Vis(VisBase, QWidget):
         #-------------
         self.points = vtkPoints()
 
-        if not self.tensor_flag:
-            self.radii = vtkFloatArray()
-            self.radii.SetName("radius")
-        else:
+        if self.tensor_flag:
             self.tensors = vtkFloatArray()
             self.tensors.SetNumberOfComponents(9)
-            # self.tensors.SetNumberOfTuples(2)
             # tensors.InsertTuple9(0,  1,0,0,  0,1,0,  0,0,1)
             # tensors.InsertTuple9(1,  1,0,0,  0,2,0,  0,0,3)
 
-
-        # define the colors for the spheres
-        self.tags = vtkFloatArray()
-        self.tags.SetName("tag")
+        # numpy arrays backing the VTK cell arrays (zero-copy), refilled each frame in plot_cells3D
+        self.cells_xyz = None
+        self.cells_data_np = None
+        self.cells_tensors_np = None
 
         self.cell_data = vtkFloatArray()
         if not self.tensor_flag:
@@ -262,6 +259,7 @@ class Vis(VisBase, QWidget):
 
         #-----------  Now setup for the substrate ----------------
         self.substrate_data = vtkStructuredPoints()
+        self.substrate_voxels_np = None   # numpy array backing the substrate (VTK cell) scalars, zero-copy
         self.field_index = 0 
 
         self.substrate_mapper = vtkDataSetMapper()
@@ -1069,7 +1067,14 @@ class Vis(VisBase, QWidget):
         print('self.output_dir = ',self.output_dir)
         # xml_file = Path(self.output_dir, "initial.xml")
         # xml_files = glob.glob('tmpdir/output*.xml')
-        xml_files = glob.glob(self.output_dir+'/output*.xml')  # cross-platform OK?
+        # while a simulation runs, the Run tab's output watcher already knows the last complete frame
+        output_watcher = getattr(self.run_tab, 'output_watcher', None)
+        if output_watcher and output_watcher.is_watching(self.output_dir):
+            if output_watcher.last_xml_frame() is None:
+                return
+            xml_files = ["output%08d.xml" % output_watcher.last_xml_frame()]
+        else:
+            xml_files = glob.glob(self.output_dir+'/output*.xml')  # cross-platform OK?
         # print('xml_files = ',xml_files)
         # xml_files = Path(self.output_dir, "initial.xml")
         if len(xml_files) == 0:
@@ -1602,35 +1607,10 @@ class Vis(VisBase, QWidget):
                 self.cells_mapper.SetLookupTable(self.lut_cells)
 
             #------------
-            # colors = vtkNamedColors()
-
-            # update VTK pipeline
-            self.points.Reset()
-            # self.cellID.Reset()
-            if not self.tensor_flag:
-                self.radii.Reset()
-            else:
-                self.tensors.Reset()
-
-            self.cell_data.Reset()
-            self.tags.Reset()
-            # self.colors.Reset()
-            # self.cellVolume.Reset()
-            # points.InsertNextPoint(0, 0, 0)
-            # points.InsertNextPoint(1, 1, 1)
-            # points.InsertNextPoint(2, 2, 2)
-
-            self.cell_data.SetNumberOfTuples(ncells)
-
-            self.cell_scalar_min = 1.e9
-            self.cell_scalar_max = -self.cell_scalar_min
-
+            # update VTK pipeline: hand the numpy arrays to VTK without copying them.
+            # The arrays are kept on self since VTK only references their memory.
             try:
-                xval = mcds.data['discrete_cells']['data']['position_x']
-                yval = mcds.data['discrete_cells']['data']['position_y']
-                zval = mcds.data['discrete_cells']['data']['position_z']
                 total_vol = mcds.data['discrete_cells']['data']['total_volume']
-                # cid = mcds.data['discrete_cells']['data']['ID']
             except:
                 print("vis3D_tab: Error: trying to access position_x,_y,_z, or total_volume vectors.")
                 msgBox = QMessageBox()
@@ -1640,51 +1620,24 @@ class Vis(VisBase, QWidget):
                 msgBox.exec()
                 sys.exit(1)
 
+            self.cells_xyz = np.ascontiguousarray(xyz, dtype=np.float32)
+            self.points.SetData(numpy_support.numpy_to_vtk(self.cells_xyz, deep=False))
+
+            sval = np.asarray(cell_scalar_val, dtype=np.float32)
+            self.cell_scalar_min = sval.min()
+            self.cell_scalar_max = sval.max()
+
             if not self.tensor_flag:   # typical spheres
-                # self.points.SetNumberOfTuples(ncells)   # faster?
-                for idx in range(ncells):
-                    # x= mcds.data['discrete_cells']['data']['position_x'][idx]
-                    # y= mcds.data['discrete_cells']['data']['position_y'][idx]
-                    # z= mcds.data['discrete_cells']['data']['position_z'][idx]
-                    x = xval[idx]
-                    y = yval[idx]
-                    z = zval[idx]
-                    # id = mcds.data['discrete_cells']['data']['cell_type'][idx]
-                    # id_type = mcds.data['discrete_cells']['data']['cell_type'][idx]
-                    self.points.InsertNextPoint(x, y, z)
-                    # self.points.InsertPoint(idx, x, y, z)  # faster?
-                    # total_volume = mcds.data['discrete_cells']['data']['total_volume'][idx]
-                    total_volume = total_vol[idx]
-
-                    rval = (total_volume * 0.2387) ** 0.333333
-                    # print(idx,") total_volume= ", total_volume, ", rval=",rval )
-                    # self.cellID.InsertNextValue(id)
-                    self.radii.InsertNextValue(rval)   # probably faster ways to do this; alloc/fill full array 
-                    # self.tags.InsertNextValue(float(idx)/ncells)   # multicolored; jet/heatmap across all cells
-
-                    # self.tags.InsertNextValue(1.0 - cell_type[idx])   # hacky 2-colors based on colormap
-                    # print("idx, cell_type[idx]= ",idx,cell_type[idx])
-                    # self.tags.InsertNextValue(cell_type[idx])
-                    sval = cell_scalar_val[idx]
-                    if sval < self.cell_scalar_min:
-                        self.cell_scalar_min = sval
-                    if sval > self.cell_scalar_max:
-                        self.cell_scalar_max = sval
-                    # self.tags.InsertNextValue(cell_scalar_val[idx])  # analogous to "plot_cell_scalar" in 2D plotting
-                    self.tags.InsertNextValue(sval)  # analogous to "plot_cell_scalar" in 2D plotting
-
-                self.cell_data.CopyComponent(0, self.radii, 0)
-                self.cell_data.CopyComponent(1, self.tags, 0)
-                # self.ugrid.SetPoints(self.points)
-                # self.ugrid.GetPointData().AddArray(self.cell_data)
-                # self.ugrid.GetPointData().SetActiveScalars("cell_data")
+                self.cells_data_np = np.empty((ncells, 2), dtype=np.float32)   # (radius, tag)
+                self.cells_data_np[:, 0] = (total_vol * 0.2387) ** 0.333333
+                self.cells_data_np[:, 1] = sval   # analogous to "plot_cell_scalar" in 2D plotting
 
             else:   # ellipsoids  ----------------------------------------
-                self.tensors.SetNumberOfTuples(ncells)
                 try:
-                    axis_a = mcds.get_cell_df()['axis_a']  # these are req'd in <custom_data>
-                    axis_b = mcds.get_cell_df()['axis_b']
-                    axis_c = mcds.get_cell_df()['axis_c']
+                    df_cells = mcds.get_cell_df()
+                    axis_a = df_cells['axis_a'].to_numpy()  # these are req'd in <custom_data>
+                    axis_b = df_cells['axis_b'].to_numpy()
+                    axis_c = df_cells['axis_c'].to_numpy()
                 except:
                     print("vis3D_tab: Error: trying to access axis_a,axis_b,axis_c custom data vars.")
                     msgBox = QMessageBox()
@@ -1694,33 +1647,22 @@ class Vis(VisBase, QWidget):
                     msgBox.exec()
                     sys.exit(1)
 
-                for idx in range(ncells):
-                    x = xval[idx]
-                    y = yval[idx]
-                    z = zval[idx]
-                    # x= mcds.data['discrete_cells']['data']['position_x'][idx]
-                    # y= mcds.data['discrete_cells']['data']['position_y'][idx]
-                    # z= mcds.data['discrete_cells']['data']['position_z'][idx]
-                    # id_type = mcds.data['discrete_cells']['data']['cell_type'][idx]
-                    # cell_id = mcds.data['discrete_cells']['data']['ID'][idx]
-                    # self.points.InsertNextPoint(x, y, z)
-                    self.points.InsertNextPoint(xval[idx], yval[idx], zval[idx])
-
-                    total_volume = mcds.data['discrete_cells']['data']['total_volume'][idx]
-                    rval = (total_volume * 0.2387) ** 0.333333
-
-                    # self.tensors.InsertTuple9(idx,  axis_a[idx]*rval,0,0,  0,axis_b[idx]*rval,0,  0,0,axis_c[idx]*rval) 
-                    self.tensors.InsertTuple9(idx,  axis_a[idx],0,0,  0,axis_b[idx],0,  0,0,axis_c[idx]) 
-                    # print(f"cell_id={cell_id}, cell_type={id_type}, volume={total_volume}, rval={rval},axis_a={axis_a[idx]},axis_b={axis_b[idx]},axis_c={axis_c[idx]}")
-
-                    sval = cell_scalar_val[idx]
-                    if sval < self.cell_scalar_min:
-                        self.cell_scalar_min = sval
-                    if sval > self.cell_scalar_max:
-                        self.cell_scalar_max = sval
-                    self.tags.InsertNextValue(cell_scalar_val[idx])  # analogous to "plot_cell_scalar" in 2D plotting
-
-                self.cell_data.CopyComponent(0, self.tags, 0)
+                # diagonal tensor per cell: the columns are taken to be the major/minor axes
+                self.cells_tensors_np = np.zeros((ncells, 9), dtype=np.float32)
+                self.cells_tensors_np[:, 0] = axis_a
+                self.cells_tensors_np[:, 4] = axis_b
+                self.cells_tensors_np[:, 8] = axis_c
+                self.tensors = numpy_support.numpy_to_vtk(self.cells_tensors_np, deep=False)
+                self.ugrid.GetPointData().SetTensors(self.tensors)
+
+                self.cells_data_np = sval.reshape(ncells, 1)   # (tag)
+
+            self.cell_data = numpy_support.numpy_to_vtk(self.cells_data_np, deep=False)
+            self.cell_data.SetName("cell_data")
+            self.ugrid.GetPointData().AddArray(self.cell_data)   # replaces the previous frame's array
+            self.ugrid.GetPointData().SetActiveScalars("cell_data")
+            self.points.Modified()
+            self.ugrid.Modified()
 
             random.seed(42)
 
@@ -1827,9 +1769,6 @@ class Vis(VisBase, QWidget):
             # self.points.Reset()
             # self.cellID.Reset()
 
-            # self.substrate_voxel_scalars.Reset()  # rwh: OMG, why didn't this work? Optimize.
-            self.substrate_voxel_scalars = vtkFloatArray()
-
             # self.cell_data.Reset()
             # self.tags.Reset()
 
@@ -1881,32 +1820,13 @@ class Vis(VisBase, QWidget):
 
             self.substrate_data.SetOrigin( x0, y0, z0 )  # lower-left-front point of domain bounding box
             self.substrate_data.SetSpacing( x_voxel_size, y_voxel_size, z_voxel_size )
-            vmin = 1.e30
-            vmax = -vmin
-            # for z in range( 0, nz+1 ) :  # if point data, not cell data
-            kount = 0
-
-            # optimize?
-            for z in range( 0, nz ) :   # NOTE: using cell data, not point data
-                for y in range( 0, ny ) :
-                    for x in range( 0, nx ) :
-                        # val = x+y+z + frame    # dummy test
-                        # val = sub_concentration[x,y,z] + np.random.uniform()*10
-                        # val = sub_concentration[x,y,z] + x
-
-                        # val = sub_concentration[x,y,z]
-                        val = sub_concentration[y,x,z]   # yes, it's confusingly swapped :/
-                        # print(kount,x,y,z,val)
-                        # if z==1:
-                            # val = 0.0
-                        # if z==0:
-                        #     val = 1.0
-                        if val > vmax:
-                            vmax = val
-                        if val < vmin:
-                            vmin = val
-                        self.substrate_voxel_scalars.InsertNextValue( val )
-                        kount += 1
+            # NOTE: using cell data, not point data. VTK wants x varying fastest, then y, then z;
+            # sub_concentration is indexed [y,x,z] (yes, it's confusingly swapped :/), so one transposed copy
+            # into (z,y,x) order that VTK then uses in place.
+            self.substrate_voxels_np = np.ascontiguousarray(sub_concentration.transpose(2,0,1), dtype=np.float32).ravel()
+            self.substrate_voxel_scalars = numpy_support.numpy_to_vtk(self.substrate_voxels_np, deep=False)
+            vmin = float(sub_concentration.min())
+            vmax = float(sub_concentration.max())
             # # self.substrate_data.GetPointData().SetScalars( self.substrate_voxel_scalars )
             # vmin = 10.
             if self.fix_cmap_flag:
@@ -20,7 +20,7 @@ from pathlib import Path
 # import matplotlib.colors as mplc
 from matplotlib.colors import BoundaryNorm, rgb2hex
 from matplotlib.ticker import MaxNLocator
-from matplotlib.collections import LineCollection
+from matplotlib.collections import LineCollection, EllipseCollection
 from matplotlib.patches import Circle, Ellipse, Rectangle
 from matplotlib.collections import PatchCollection
 from mpl_toolkits.axes_grid1.axes_divider import make_axes_locatable
@@ -70,6 +70,10 @@ from populate_tree_cell_defs import populate_tree_cell_defs
 
 from studio_classes import QCheckBox_custom, QRadioButton_custom
 from pyMCDS import xmlfile_to_xmlpathfile
+from pyMCDS_timeseries import get_timeseries
+from pyMCDS_states import get_stateindex
+from movie_render import default_spec, output_frames, render_movie
+from loader_service import LoaderService
 
 #---------------------------
 class ExtendedComboBox(QComboBox):
@@ -304,6 +308,32 @@ class QHLine(QFrame):
         # self.setFrameShadow(QFrame.Plain)
         # self.setStyleSheet("border:1px solid black")
 
+#---------------------------------------------------------------
+# Run on the loader thread (loader_service.py), so they must not touch any Qt widget or plot state.
+
+def load_cell_counts(output_dir, discrete_scalar, count_scalar, count_vals, celltype_filter, cycle_model_max):
+    # frames are read once per output folder and re-read only when changed on disk
+    ts = get_timeseries(output_dir)
+    num_xml = len(ts.get_xmlfiles())
+    if (num_xml == 0) or not ts.has_variable(discrete_scalar):
+        return num_xml, None, None
+    counts = ts.get_counts(count_scalar, count_vals, celltype_filter=celltype_filter, r_cycle_model_max=cycle_model_max)
+    return num_xml, ts.get_times(), counts
+
+
+def load_physiboss_state_counts(output_dir, id_cellline):
+    # each state file is read once and kept (as integer state codes) in the folder's state index
+    state_index = get_stateindex(output_dir)
+    if len(state_index.get_frames()) == 0:
+        return None, None, None
+    pop_data, states = state_index.get_counts(id_cellline)
+    return state_index.get_times(), pop_data, states
+
+
+def save_simularium(simularium_model_data, model_name):
+    PhysicellConverter(simularium_model_data).save(model_name)
+    return model_name
+
 #---------------------------------------------------------------
 class VisBase():
 
@@ -324,6 +354,9 @@ class VisBase():
         self.rules_tab = rules_tab
         self.ics_tab = ics_tab
 
+        # parses output files off the GUI thread and hands the results back to it
+        self.loader = LoaderService()
+
         self.frame_ind = 0
         self.save_frame_filetype = '.png'
         self.save_frame= False
@@ -491,6 +524,9 @@ class VisBase():
         self.cells_edge_checked_flag = True
 
         self.graph_display_type = 'NONE'
+        self.graph_color_by_type = False
+
+        self.lod_min_cells = 50000   # above this, sub-pixel cells are drawn as a raster (see circles())
 
         self.contour_mesh = True
         self.contour_lines = False
@@ -1283,16 +1319,35 @@ class VisBase():
 
     def cell_counts_cb(self):
         # print("---- cell_counts_cb(): --> window for 2D population plots")
+        self.plot_cell_counts(self.discrete_scalar)
+
+    def plot_cell_counts(self, discrete_scalar, new_window=True):
         # self.analysis_data_wait.value = 'compute n of N ...'
 
         if not self.get_cell_types_from_legend():
             if not self.get_cell_types_from_config():
                 return
 
-        xml_pattern = self.output_dir + "/" + "output*.xml"
-        xml_files = glob.glob(xml_pattern)
-        # print(xml_files)
-        num_xml = len(xml_files)
+        if discrete_scalar == 'cell_type':
+            # live cells per type
+            count_scalar = 'cell_type'
+            count_vals = list(range(len(self.celltype_name)))
+            cycle_model_max = 100.
+        else:
+            # TODO: fix this hackiness. Do we want to avoid counting dead cells??
+            if discrete_scalar == 'current_death_model': # Hack: because current_death_model is not working in PhysiCell, using cycle_model instead  
+                count_scalar = 'cycle_model'
+            else:
+                count_scalar = discrete_scalar
+            count_vals = list(self.discrete_scalar_vals.get(discrete_scalar, []))
+            cycle_model_max = 999.
+
+        # reading all the frames can take a while on a large output folder, so it is done on the loader thread
+        celltype_filter = list(self.celltype_filter) if self.celltype_filter else None
+        self.loader.submit('cell_counts ' + discrete_scalar, load_cell_counts, self.output_dir, discrete_scalar, count_scalar, count_vals, celltype_filter, cycle_model_max,
+                           on_done=lambda result: self.draw_cell_counts(discrete_scalar, new_window, *result))
+
+    def draw_cell_counts(self, discrete_scalar, new_window, num_xml, tval, counts):
         if num_xml == 0:
             print("last_plot_cb(): WARNING: no output*.xml files present")
             msgBox = QMessageBox()
@@ -1302,30 +1357,20 @@ class VisBase():
             msgBox.exec()
             return
 
-        xml_files.sort()
-        # print("sorted: ",xml_files)
-
-        mcds = []
-        for fname in xml_files:
-            basename = os.path.basename(fname)
-            # print("basename= ",basename)
-            # mcds = pyMCDS(basename, self.output_dir, microenv=False, graph=False, verbose=False)
-            mcds.append(pyMCDS(basename, self.output_dir, microenv=False, graph=False, verbose=False))
-
-        if self.discrete_scalar not in mcds[0].data['discrete_cells']['data'].keys():
-            print(f"\ncell_counts_cb(): {self.discrete_scalar} is not saved in the output. See the Full list above. Exiting.")
+        if counts is None:
+            print(f"\ncell_counts_cb(): {discrete_scalar} is not saved in the output. See the Full list above. Exiting.")
             return
 
-        tval = np.linspace(0, mcds[-1].get_time(), len(xml_files))
         # print("  max tval=",tval)
 
         # self.yval4 = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['cell_type'] == 4) & (mcds[idx].data['discrete_cells']['cycle_model'] < 100.) == True)) for idx in range(ds_count)] )
 
         #--------
-        if self.discrete_scalar == 'cell_type':   # number not known until run time
-            # if not self.population_plot[self.discrete_scalar]:
-            self.population_plot[self.discrete_scalar] = PopulationPlotWindow() # don't test if already exists!
-            self.population_plot[self.discrete_scalar].ax0.cla()
+        if discrete_scalar == 'cell_type':   # number not known until run time
+            # if not self.population_plot[discrete_scalar]:
+            if new_window or (self.population_plot[discrete_scalar] is None):
+                self.population_plot[discrete_scalar] = PopulationPlotWindow() # don't test if already exists!
+            self.population_plot[discrete_scalar].ax0.cla()
 
             # ctype_plot = []
             lw = 2
@@ -1350,26 +1395,23 @@ class VisBase():
                     # print("--- rgb after split=",rgb)
                     ctcolor = [float(rgb[0])/255., float(rgb[1])/255., float(rgb[2])/255.]
                     # print("--- converted rgb=",ctcolor)
-                if self.celltype_filter:
-                    yval = np.array( [(np.count_nonzero((np.isin(mcds[idx].data['discrete_cells']['data']['cell_type'], self.celltype_filter)) & (mcds[idx].data['discrete_cells']['data']['cell_type'] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 100.) == True)) for idx in range(len(mcds))] )
-                else:
-                    yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data']['cell_type'] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 100.) == True)) for idx in range(len(mcds))] )
+                yval = counts[:,itype]
                 # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data']['cell_type'] == itype) == True)) for idx in range(len(mcds))] )
                 # print("  yval=",yval)
                 if yval.sum() > 0: # only plot if there are cells of this type
-                    self.population_plot[self.discrete_scalar].ax0.plot(tval, yval, label=ctname, linewidth=lw, color=ctcolor)
+                    self.population_plot[discrete_scalar].ax0.plot(tval, yval, label=ctname, linewidth=lw, color=ctcolor)
 
 
-            self.population_plot[self.discrete_scalar].ax0.set_xlabel('time (mins)')
-            self.population_plot[self.discrete_scalar].ax0.set_ylabel('# of cells')
-            self.population_plot[self.discrete_scalar].ax0.set_title("cell_type", fontsize=10)
-            self.population_plot[self.discrete_scalar].ax0.legend(loc='center left', prop={'size': 8})
-            self.population_plot[self.discrete_scalar].canvas.update()
-            self.population_plot[self.discrete_scalar].canvas.draw()
-            self.population_plot[self.discrete_scalar].show()
+            self.population_plot[discrete_scalar].ax0.set_xlabel('time (mins)')
+            self.population_plot[discrete_scalar].ax0.set_ylabel('# of cells')
+            self.population_plot[discrete_scalar].ax0.set_title("cell_type", fontsize=10)
+            self.population_plot[discrete_scalar].ax0.legend(loc='center left', prop={'size': 8})
+            self.population_plot[discrete_scalar].canvas.update()
+            self.population_plot[discrete_scalar].canvas.draw()
+            self.population_plot[discrete_scalar].show()
 
         #--------
-        elif self.discrete_scalar == '"number_of_nuclei"':   # is it used yet?
+        elif discrete_scalar == '"number_of_nuclei"':   # is it used yet?
             pass
         #--------
         else:  # number is fixed for these (cycle_model, current_phase, is_motile, current_death_model, dead)
@@ -1377,65 +1419,64 @@ class VisBase():
             # [‘cell_type’, ‘cycle_model’, ‘current_phase’,‘is_motile’,‘current_death_model’,‘dead’,‘number_of_nuclei’,‘polarity’]
             # self.discrete_scalar_len = {"cell_type":0, "cycle_model":6, "current_phase":4, "is_motile":2,"current_death_model":2, "dead":2, "number_of_nuclei":0 }
 
-            self.population_plot[self.discrete_scalar] = PopulationPlotWindow()
-            self.population_plot[self.discrete_scalar].ax0.cla()
+            if new_window or (self.population_plot[discrete_scalar] is None):
+                self.population_plot[discrete_scalar] = PopulationPlotWindow()
+            self.population_plot[discrete_scalar].ax0.cla()
 
-            # print("---- generate plot for ",self.discrete_scalar)
+            # print("---- generate plot for ",discrete_scalar)
             # ctype_plot = []
             lw = 2
             # for itype, ctname in enumerate(self.celltypes_list):
             # print("  self.celltype_name=",self.celltype_name)
-            # for itype in range(self.discrete_scalar_len[self.discrete_scalar]):
-            for itype in self.discrete_scalar_vals[self.discrete_scalar]:
+            # counts: cells per value for all frames (cell type filter applied in load_cell_counts)
+            # for itype in range(self.discrete_scalar_len[discrete_scalar]):
+            for ival, itype in enumerate(self.discrete_scalar_vals[discrete_scalar]):
                 # print("  cell_counts_cb(): itype= ",itype)
                 ctcolor = 'C' + str(itype)   # use random colors from matplotlib
                 # print("  ctcolor=",ctcolor)
                 # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data']['cell_type'] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 100.) == True)) for idx in range(len(mcds))] )
 
-                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][self.discrete_scalar] == itype) ) for idx in range(len(mcds))) ] )
-
-                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][self.discrete_scalar] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 100.) == True)) for idx in range(len(mcds))] )
-                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][self.discrete_scalar] == itype) ) for idx in range(len(mcds)))] )
-                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][self.discrete_scalar] == itype) & True) for idx in range(len(mcds)))] )
-
-                # TODO: fix this hackiness. Do we want to avoid counting dead cells??
-                if self.discrete_scalar == 'current_death_model': # Hack: because current_death_model is not working in PhysiCell, using cycle_model instead  
-                    if self.celltype_filter: # Cell type filter applied here
-                        yval = np.array( [(np.count_nonzero((np.isin(mcds[idx].data['discrete_cells']['data']['cell_type'], self.celltype_filter)) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 999.) == True)) for idx in range(len(mcds))] )
-                    else:
-                        yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data']['cycle_model'] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 999.) == True)) for idx in range(len(mcds))] )
-                else:
-                    if self.celltype_filter: # Cell type filter applied here
-                        yval = np.array( [(np.count_nonzero((np.isin(mcds[idx].data['discrete_cells']['data']['cell_type'], self.celltype_filter)) & (mcds[idx].data['discrete_cells']['data'][self.discrete_scalar] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 999.) == True)) for idx in range(len(mcds))] )
-                    else:
-                        yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][self.discrete_scalar] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 999.) == True)) for idx in range(len(mcds))] )
+                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][discrete_scalar] == itype) ) for idx in range(len(mcds))) ] )
+
+                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][discrete_scalar] == itype) & (mcds[idx].data['discrete_cells']['data']['cycle_model'] < 100.) == True)) for idx in range(len(mcds))] )
+                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][discrete_scalar] == itype) ) for idx in range(len(mcds)))] )
+                # yval = np.array( [(np.count_nonzero((mcds[idx].data['discrete_cells']['data'][discrete_scalar] == itype) & True) for idx in range(len(mcds)))] )
+
+                yval = counts[:,ival]
                 # print("  yval=",yval)
 
-                # if (self.discrete_scalar == 'cycle_model'): mylabel = 
+                # if (discrete_scalar == 'cycle_model'): mylabel = 
                 # else:
-                # Check if exist any cells in the entire simulation with self.discrete_scalar occuring
+                # Check if exist any cells in the entire simulation with discrete_scalar occuring
                 mylabel = str(itype)
                 bool_list = ['is_motile', 'dead']
-                if( yval.sum() > 0 or self.discrete_scalar in bool_list): # only plot if there are cells with this scalar or boolean
-                    if (self.discrete_scalar == 'cycle_model' or self.discrete_scalar == 'current_death_model'): mylabel = self.cycle_models[itype]
-                    elif (self.discrete_scalar == 'current_phase'): mylabel = self.cycle_phases[itype]
-                    elif (self.discrete_scalar in bool_list ): mylabel = str(bool(itype))
+                if( yval.sum() > 0 or discrete_scalar in bool_list): # only plot if there are cells with this scalar or boolean
+                    if (discrete_scalar == 'cycle_model' or discrete_scalar == 'current_death_model'): mylabel = self.cycle_models[itype]
+                    elif (discrete_scalar == 'current_phase'): mylabel = self.cycle_phases[itype]
+                    elif (discrete_scalar in bool_list ): mylabel = str(bool(itype))
                     # Plot only if there are cells with this scalar
-                    self.population_plot[self.discrete_scalar].ax0.plot(tval, yval, label=mylabel, linewidth=lw, color=ctcolor)
-                # self.population_plot[self.discrete_scalar].ax0.plot(tval, yval, linewidth=lw, color=ctcolor)
-                # print(self.discrete_scalar, itype, mylabel, yval.sum() )
+                    self.population_plot[discrete_scalar].ax0.plot(tval, yval, label=mylabel, linewidth=lw, color=ctcolor)
+                # self.population_plot[discrete_scalar].ax0.plot(tval, yval, linewidth=lw, color=ctcolor)
+                # print(discrete_scalar, itype, mylabel, yval.sum() )
 
             
-            self.population_plot[self.discrete_scalar].ax0.set_xlabel('time (mins)')
-            self.population_plot[self.discrete_scalar].ax0.set_ylabel('# of cells')
+            self.population_plot[discrete_scalar].ax0.set_xlabel('time (mins)')
+            self.population_plot[discrete_scalar].ax0.set_ylabel('# of cells')
             if self.celltype_filter:
-                self.population_plot[self.discrete_scalar].ax0.set_title(self.discrete_scalar + " (filtered by cell type)", fontsize=10)
+                self.population_plot[discrete_scalar].ax0.set_title(discrete_scalar + " (filtered by cell type)", fontsize=10)
             else:
-                self.population_plot[self.discrete_scalar].ax0.set_title(self.discrete_scalar, fontsize=10)
-            self.population_plot[self.discrete_scalar].ax0.legend(loc='center left', prop={'size': 8})
-            self.population_plot[self.discrete_scalar].canvas.update()
-            self.population_plot[self.discrete_scalar].canvas.draw()
-            self.population_plot[self.discrete_scalar].show()
+                self.population_plot[discrete_scalar].ax0.set_title(discrete_scalar, fontsize=10)
+            self.population_plot[discrete_scalar].ax0.legend(loc='center left', prop={'size': 8})
+            self.population_plot[discrete_scalar].canvas.update()
+            self.population_plot[discrete_scalar].canvas.draw()
+            self.population_plot[discrete_scalar].show()
+
+    def live_frames_cb(self, xml_files):
+        # called by the Run tab's output watcher with each batch of newly written frames;
+        # the time series store already holds them, so redraw open population plots in place.
+        for discrete_scalar, plot_w in self.population_plot.items():
+            if (plot_w is not None) and plot_w.isVisible():
+                self.plot_cell_counts(discrete_scalar, new_window=False)
 
     # ------ overridden for 3D (vis3D_tab.py)
     def build_physiboss_info(self):
@@ -1630,65 +1671,22 @@ class VisBase():
             msgBox.exec()
             return
 
-        xml_files.sort()
-
         cell_def_name = list(self.physiboss_node_dict.keys())[self.physiboss_selected_cell_line]
-        all_states = set()
-        states_pops = []
-        mcds = []
-        for i_frame, fname in enumerate(xml_files):
-            basename = os.path.basename(fname)
-            t_mcds = pyMCDS(basename, self.output_dir, microenv=False, graph=False, verbose=False)
-            mcds.append(t_mcds)
-
-            try:
-                cell_types = t_mcds.get_cell_df()["cell_type"]
-            except:
-                print("vis_tab.py: physiboss_state_counts_cb(): error performing mcds.get_cell_df()['cell_type']")
-                return
+        id_cellline = list(self.celldef_tab.param_d.keys()).index(cell_def_name)
+
+        self.loader.submit('physiboss_state_counts', load_physiboss_state_counts, self.output_dir, id_cellline,
+                           on_done=lambda result: self.draw_physiboss_state_counts(cell_def_name, *result))
+
+    def draw_physiboss_state_counts(self, cell_def_name, tval, pop_data, states):
+        if tval is None:
+            print("vis_base.py: physiboss_state_counts_cb(): error no PhysiBoSS state files found in ",self.output_dir)
+            return
 
-            physiboss_state_file = os.path.join(self.output_dir, "output%08d_boolean_intracellular.csv" % i_frame)
-        
-            if not Path(physiboss_state_file).is_file():
-                
-                physiboss_state_file = os.path.join(self.output_dir, "states_%08d.csv" % i_frame)
-                
-                if not Path(physiboss_state_file).is_file():
-                    print("vis_tab.py: plot_cell_physiboss(): error file not found ",physiboss_state_file)
-                    return
-        
-            name_cellline = list(self.physiboss_node_dict.keys())[self.physiboss_selected_cell_line]
-            id_cellline = list(self.celldef_tab.param_d.keys()).index(name_cellline)
-    
-            states_pop = {}
-            with open(physiboss_state_file, newline='') as csvfile:
-                states_reader = csv.reader(csvfile, delimiter=',')
-                for row in states_reader:
-                    if row[0] != 'ID':
-                        ID = int(row[0])
-                        if cell_types[ID] == id_cellline:
-                            if row[1] in states_pop.keys():
-                                states_pop[row[1]] += 1
-                            else:
-                                states_pop[row[1]] = 1
-
-            states_pops.append(states_pop)
-            all_states = all_states.union(set(states_pop.keys()))
-
-        pop_data = np.zeros((len(xml_files), len(all_states)))
-        states_index = {state:i for i, state in enumerate(all_states)}
-        for i_frame, fname in enumerate(xml_files):
-            for state, pop in states_pops[i_frame].items():
-                pop_data[i_frame, states_index[state]] = pop
-
-
-
-        tval = np.linspace(0, mcds[-1].get_time(), len(xml_files))
         if not self.physiboss_population_plot:
             self.physiboss_population_plot = PhysiBoSSStatesPopulationPlotWindow()
 
         self.physiboss_population_plot.ax0.cla()
-        self.physiboss_population_plot.ax0.plot(tval, pop_data, label=[label if len(label) < 100 else label[0:100] + "..." for label in states_index.keys()])
+        self.physiboss_population_plot.ax0.plot(tval, pop_data, label=[label if len(label) < 100 else label[0:100] + "..." for label in states])
 
 
         self.physiboss_population_plot.ax0.set_xlabel('time (mins)')
@@ -2318,24 +2316,34 @@ class VisBase():
 
         # stop the insanity (dir structure on nanoHUB vs. local)
         # xml_pattern = "output*.xml"
-        xml_pattern = self.output_dir + "/" + "output*.xml"
-        xml_files = glob.glob(xml_pattern)
-        num_xml = len(xml_files)
-        if num_xml == 0:
-            print("last_plot_cb(): WARNING: no output*.xml files present")
-            last_xml = None
-            # return
+        # while a simulation runs, the Run tab's output watcher already knows the last complete frames
+        output_watcher = getattr(self.run_tab, 'output_watcher', None)
+        if output_watcher and output_watcher.is_watching(self.output_dir):
+            last_xml = output_watcher.last_xml_frame()
+            last_svg = output_watcher.last_svg_frame()
+            xml_files = []
+            svg_files = [] if last_svg is None else ["snapshot%08d.svg" % last_svg]
         else:
-            xml_files.sort()
-            # print('last_plot_cb():xml_files (after sort)= ',xml_files)
-            last_xml = int(xml_files[-1][-12:-4])
+            output_watcher = None
+            xml_pattern = self.output_dir + "/" + "output*.xml"
+            xml_files = glob.glob(xml_pattern)
+            num_xml = len(xml_files)
+            if num_xml == 0:
+                print("last_plot_cb(): WARNING: no output*.xml files present")
+                last_xml = None
+                # return
+            else:
+                xml_files.sort()
+                # print('last_plot_cb():xml_files (after sort)= ',xml_files)
+                last_xml = int(xml_files[-1][-12:-4])
 
         # svg_pattern = "snapshot*.svg"
 
         if self.cells_svg_rb.isChecked():
-            svg_pattern = self.output_dir + "/" + "snapshot*.svg"
-            svg_files = glob.glob(svg_pattern)   # problematic with celltypes3 due to snapshot_standard*.svg and snapshot<8digits>.svg
-            svg_files.sort()
+            if not output_watcher:
+                svg_pattern = self.output_dir + "/" + "snapshot*.svg"
+                svg_files = glob.glob(svg_pattern)   # problematic with celltypes3 due to snapshot_standard*.svg and snapshot<8digits>.svg
+                svg_files.sort()
             # print('last_plot_cb(): svg_files (after sort)= ',svg_files)
             num_xml = len(xml_files)
             # print('svg_files = ',svg_files)
@@ -2404,6 +2412,8 @@ class VisBase():
 
     # used by animate
     def play_plot_cb(self):
+        if self.loader.is_busy('frame'):
+            return   # still loading the previous frame; do not play past it
         for idx in range(1):
             self.current_svg_frame += 1
             self.current_frame = self.current_svg_frame
@@ -2972,6 +2982,10 @@ class VisBase():
 
         Make a scatter plot of circles. 
         Similar to plt.scatter, but the size of circles are in data scale.
+        The circles are one EllipseCollection (no per-circle patch objects). With more than
+        self.lod_min_cells circles that are smaller than a pixel at the current plot range,
+        a raster of the (mean) cell color per pixel is drawn instead; zooming in redraws
+        the frame and brings the circles back once they are a pixel wide.
         Parameters
         ----------
         x, y : scalar or array_like, shape (n, )
@@ -2995,7 +3009,7 @@ class VisBase():
             norm, cmap, transform, etc.
         Returns
         -------
-        paths : `~matplotlib.collections.PathCollection`
+        paths : `~matplotlib.collections.EllipseCollection`, or `~matplotlib.image.AxesImage` for a raster
         Examples
         --------
         a = np.arange(11)
@@ -3022,37 +3036,87 @@ class VisBase():
         # You can set `facecolor` with an array for each patch,
         # while you can only set `facecolors` with a value for all.
 
-        zipped = np.broadcast(x, y, s)
-        patches = [Circle((x_, y_), s_)
-                for x_, y_, s_ in zipped]
-        collection = PatchCollection(patches, **kwargs)
+        x, y, s = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(s, dtype=float))
+        x, y, s = x.ravel(), y.ravel(), s.ravel()
+        if c is not None:
+            c = np.broadcast_to(np.asarray(c), x.shape).ravel()
+
+        if len(x) >= self.lod_min_cells:
+            pixel = self.data_units_per_pixel()
+            if pixel is not None and np.median(s) * 2 < pixel[0]:
+                return self.circles_raster(x, y, c, vmin, vmax, pixel, **kwargs)
+            if pixel is not None:
+                # zoomed in: only the circles that reach into the plot range (the color range still spans all cells)
+                xmin, xmax, ymin, ymax = pixel[1]
+                keep = (x + s >= xmin) & (x - s <= xmax) & (y + s >= ymin) & (y - s <= ymax)
+                if c is not None and len(c) > 0 and c.dtype.kind in 'biuf':
+                    vmin = c.min() if vmin is None else vmin
+                    vmax = c.max() if vmax is None else vmax
+                    c = c[keep]
+                for key in ('color', 'facecolor', 'edgecolor'):
+                    if key in kwargs and np.ndim(kwargs[key]) == 2 and len(kwargs[key]) == len(x):
+                        kwargs[key] = np.asarray(kwargs[key])[keep]
+                x, y, s = x[keep], y[keep], s[keep]
+
+        collection = EllipseCollection(2*s, 2*s, np.zeros(len(s)), units='xy',
+                                       offsets=np.column_stack([x, y]), offset_transform=self.ax0.transData, **kwargs)
         if c is not None:
-            # print("--- circles(): type(c)=",type(c))
-            c = c.values
-            # print("--- circles() (2): type(c)=",type(c))
-
-            # print("--- circles(): c=",c)
-            c = np.broadcast_to(c, zipped.shape).ravel()
             collection.set_array(c)
-            # print("--- circles(): vmin,vmax=",vmin,vmax)
             collection.set_clim(vmin, vmax)
 
-        # ax = plt.gca()
-        # ax.add_collection(collection)
-        # ax.autoscale_view()
         self.ax0.add_collection(collection)
         self.ax0.autoscale_view()
         plt.draw_if_interactive()
-        # if c is not None:
-        #     try:
-        #         print("------ circles(): doing plt.sci(collection), type(collection)=",type(collection))
-        #         plt.sci(collection)
-        #         # self.ax0.sci(collection)
-        #         # self.ax0.sci(collection)
-        #     except:
-        #         print("--- ERROR in circles() doing plt.sci(collection)")
         return collection
 
+    def data_units_per_pixel(self):
+        # (data units per pixel, plot range) of the cell plot, or None before the range is known
+        if self.plot_xmin is None:
+            return None
+        xmin, xmax, ymin, ymax = float(self.plot_xmin), float(self.plot_xmax), float(self.plot_ymin), float(self.plot_ymax)
+        bbox = self.ax0.get_window_extent()
+        if bbox.width < 1 or bbox.height < 1 or xmax <= xmin or ymax <= ymin:
+            return None
+        upp = max((xmax - xmin) / bbox.width, (ymax - ymin) / bbox.height)   # with an equal aspect, the coarser axis wins
+        return (upp, (xmin, xmax, ymin, ymax))
+
+    def circles_raster(self, x, y, c, vmin, vmax, pixel, **kwargs):
+        # aggregate sub-pixel circles into one image over the plot range: the mean scalar per pixel
+        # (colormapped, so a colorbar still works), or else the mean cell color per pixel
+        upp, (xmin, xmax, ymin, ymax) = pixel
+        nx = max(1, min(2048, int(np.ceil((xmax - xmin) / upp))))
+        ny = max(1, min(2048, int(np.ceil((ymax - ymin) / upp))))
+        ix = np.floor((x - xmin) * (nx / (xmax - xmin))).astype(np.int64)
+        iy = np.floor((y - ymin) * (ny / (ymax - ymin))).astype(np.int64)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        pix = iy[inside] * nx + ix[inside]
+        count = np.bincount(pix, minlength=nx*ny)
+        occupied = count > 0
+        extent = (xmin, xmax, ymin, ymax)
+
+        if c is not None:
+            mean = np.bincount(pix, weights=np.asarray(c, dtype=float)[inside], minlength=nx*ny)
+            mean[occupied] /= count[occupied]
+            zvals = np.ma.masked_array(mean, mask=~occupied).reshape(ny, nx)
+            image = self.ax0.imshow(zvals, origin='lower', extent=extent, aspect='auto', interpolation='nearest',
+                                    cmap=kwargs.get('cmap'), vmin=vmin, vmax=vmax, alpha=kwargs.get('alpha'))
+        else:
+            # filled cells use their face color, transparent ones (drawn as edges only) their edge color
+            colors = kwargs.get('facecolor', kwargs.get('color', 'b'))
+            rgba = matplotlib.colors.to_rgba_array(colors)
+            if rgba.shape[0] == 1 and rgba[0, 3] == 0 and 'edgecolor' in kwargs:
+                rgba = matplotlib.colors.to_rgba_array(kwargs['edgecolor'])
+            rgba = np.broadcast_to(rgba, (len(x), 4))[inside]
+            raster = np.zeros((nx*ny, 4))
+            for k in range(4):
+                raster[:, k] = np.bincount(pix, weights=rgba[:, k], minlength=nx*ny)
+            raster[occupied] /= count[occupied, None]
+            if kwargs.get('alpha') is not None:
+                raster[:, 3] *= kwargs['alpha']
+            image = self.ax0.imshow(raster.reshape(ny, nx, 4), origin='lower', extent=extent, aspect='auto', interpolation='nearest')
+
+        plt.draw_if_interactive()
+        return image
 
     #  for Simularium, among other reasons later
     def get_simularium_info(self):
@@ -3273,11 +3337,23 @@ class VisBase():
         # model_name = os.path.basename(self.current_xml_file)
         model_name = os.path.basename(xml_file)
         model_name = model_name[:-4]   # strip off .xml suffix
-        PhysicellConverter(simularium_model_data).save(model_name)
-        print(f"--> {model_name}.simularium")
+        # the converter reads every frame, so it runs on the loader thread
+        self.loader.submit('simularium', save_simularium, simularium_model_data, model_name,
+                           on_done=self.simularium_saved_cb, on_error=self.simularium_error_cb)
 
+    def simularium_saved_cb(self, model_name):
+        print(f"--> {model_name}.simularium")
+        print("---- Simularium file created.")
         print("Load this model at: https://simularium.allencell.org/viewer")
 
+    def simularium_error_cb(self, e):
+        print("vis_base.py: convert_to_simularium(): error: ",e)
+        msgBox = QMessageBox()
+        msgBox.setIcon(QMessageBox.Information)
+        msgBox.setText(f"Error creating the Simularium file: {e}")
+        msgBox.setStandardButtons(QMessageBox.Ok)
+        msgBox.exec()
+
     def make_movie_cb(self):
         # Check if ffmpeg is installed
         if not shutil.which("ffmpeg"):
@@ -3288,50 +3364,32 @@ class VisBase():
             msgBox.exec()
             return
         print("Creating movie...")
-        fig, ax = plt.subplots()
-        ax.axis('off')  # Turn off the axis
-        fig.subplots_adjust(left=0, right=1, top=1, bottom=0)  # Remove borders
-        ims = []
-        original_frame = self.current_svg_frame  # Save the original frame number
-
-        # Determine the total number of frames
-        svg_pattern = self.output_dir + "/" + "snapshot*.svg"
-        svg_files = glob.glob(svg_pattern)
-        svg_files.sort()
-        max_frame = len(svg_files) - 1
-
-        # Simulate play button click
-        self.animating_flag = True
-        self.play_button.setText("Pause")
-        self.timer.start(1)
-
-        self.cancel_movie = False  # Add a flag to cancel the movie creation
 
-        for frame in range(max_frame):
-            if self.animating_flag is False:  self.cancel_movie = True # Check if the pause button was pressed
-            if self.cancel_movie:  # Check if the cancel button was pressed
-                print("Movie creation canceled.")
-                break
-            self.current_svg_frame = frame
-            self.update_plots()
-            self.canvas.draw_idle()  # Force a redraw of the canvas
-            self.canvas.flush_events()  # Ensure the canvas is updated
-            im = ax.imshow(self.canvas.buffer_rgba(), animated=True)
-            ims.append([im])
+        # Get the movie name from the movie_name_edit field and ensure it has .mp4 extension
+        movie_name = self.movie_name_edit.text()
+        if not movie_name.endswith(".mp4"):
+            movie_name += ".mp4"
 
-        # Stop the animation
-        self.animating_flag = False
-        self.play_button.setText("Play")
-        self.timer.stop()
+        # Render headless (Agg, one figure per worker process) and stream the frames into ffmpeg,
+        # rather than replaying the Play loop and keeping every frame's image in memory.
+        self.cancel_movie = False  # Add a flag to cancel the movie creation
+        def movie_progress(num_done, num_frames):
+            QApplication.processEvents()   # keep the Cancel button responsive
+            return not self.cancel_movie
 
-        if not self.cancel_movie:  # Only save the movie if it was not canceled
-            # Get the movie name from the movie_name_edit field and ensure it has .mp4 extension
-            movie_name = self.movie_name_edit.text()
-            if not movie_name.endswith(".mp4"):
-                movie_name += ".mp4"
+        try:
+            ok = render_movie(self.movie_spec(), movie_name, progress=movie_progress)
+        except Exception as e:
+            print("vis_base.py: make_movie_cb(): error creating movie: ",e)
+            msgBox = QMessageBox()
+            msgBox.setText(f"Error creating movie: {e}")
+            msgBox.setStandardButtons(QMessageBox.Ok)
+            msgBox.exec()
+            return
 
-            ani = animation.ArtistAnimation(fig, ims, interval=100, blit=True)
-            ani.save(movie_name, writer="ffmpeg", dpi=200)
+        if self.cancel_movie:
+            print("Movie creation canceled.")
+        elif ok:  # Only report the movie if it was not canceled
             print(f"Movie saved as {movie_name}")
             # Show a message box with the movie name
             msgBox = QMessageBox()
@@ -3339,8 +3397,62 @@ class VisBase():
             msgBox.setText(f"Movie saved as <b>{movie_name}</b>")
             msgBox.setStandardButtons(QMessageBox.Ok)
             msgBox.exec()
+        else:
+            print("vis_base.py: make_movie_cb(): ffmpeg failed to write ",movie_name)
+
+    def movie_spec(self):
+        # what the 2D Plot tab currently shows, as plain data for the movie_render.py workers
+        spec = default_spec(self.output_dir)
+        spec['xlim'] = (self.plot_xmin, self.plot_xmax)
+        spec['ylim'] = (self.plot_ymin, self.plot_ymax)
+        spec['domain_min'] = (self.xmin, self.ymin)
+        spec['aspect_equal'] = self.view_aspect_square
+        spec['bgcolor'] = self.bgcolor
+        spec['title_fontsize'] = self.title_fontsize
 
-        self.current_svg_frame = original_frame  # Restore the original frame number
+        if not self.cells_checked_flag:
+            spec['cells'] = None
+        elif self.plot_cells_svg:
+            spec['cells'] = 'svg'
+        else:
+            # the .mat column name, not the combobox's human readable label
+            spec['cells'] = self.cell_scalar_human2mcds_dict.get(self.cell_scalar_combobox.currentText(), self.cell_scalar_combobox.currentText())
+            spec['cell_cmap'] = self.cell_scalar_cbar_combobox.currentText()
+            if self.fix_cells_cmap_flag:
+                spec['cell_vmin'] = self.cells_cmin_value
+                spec['cell_vmax'] = self.cells_cmax_value
+            if spec['cells'] in self.discrete_cell_scalars:
+                # the possible values, as plot_cell_scalar() colors them, so colors don't shift from frame to frame
+                spec['cell_discrete'] = True
+                if spec['cells'] == "current_phase":
+                    spec['cell_discrete_values'] = sorted(self.cycle_phases.keys())
+                elif spec['cells'] == "cell_type":
+                    self.get_cell_types_from_config()
+                    spec['cell_discrete_values'] = list(range(len(self.celltype_name)))
+                elif spec['cells'] == "cycle_model":
+                    spec['cell_discrete_values'] = sorted(self.cycle_models.keys())
+                elif spec['cells'] in ["current_death_model", "is_motile", "dead"]:
+                    spec['cell_discrete_values'] = [0,1]
+        if self.celltype_filter:
+            spec['celltype_filter'] = list(self.celltype_filter)
+            spec['celltype_filter_names'] = [self.cell_dict[str(k)] for k in self.celltype_filter]
+        spec['cell_fill'] = self.cell_fill
+        spec['cell_edge'] = self.cell_edge
+        spec['cell_line_width'] = getattr(self, 'cell_line_width', 0.5)
+        spec['show_nucleus'] = self.show_nucleus
+
+        if self.substrates_checked_flag:
+            spec['substrate_index'] = self.field_index
+            spec['numx'] = self.numx
+            spec['numy'] = self.numy
+            spec['substrate_cmap'] = self.substrates_cbar_combobox.currentText()
+            spec['shading'] = self.shading_choice
+            if self.fix_cmap_flag:
+                spec['substrate_vmin'] = self.cmin_value
+                spec['substrate_vmax'] = self.cmax_value
+
+        spec['frames'] = output_frames(self.output_dir, svg=(spec['cells'] == 'svg'))
+        return spec
 
     def cancel_movie_cb(self):
         self.cancel_movie = True
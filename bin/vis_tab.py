@@ -42,6 +42,9 @@ import numpy as np
 import scipy.io
 from pyMCDS_cells import pyMCDS_cells 
 from pyMCDS import pyMCDS
+from pyMCDS_states import get_stateindex, statefile_pathfile
+from frame_cache import FrameCache, load_svg_frame, load_cells_frame, load_substrate_frame, load_graph_edges
+from positions_writer import write_positions
 import matplotlib
 matplotlib.use('Qt5Agg')
 import matplotlib.pyplot as plt
@@ -85,6 +88,10 @@ class Vis(VisBase, QWidget):
         self.timer = QtCore.QTimer()
         self.timer.timeout.connect(self.play_plot_cb)
 
+        # decoded frames, filled ahead of the playhead while animating
+        self.frame_cache = FrameCache(max_mbytes=512)
+        self.prefetch_count = 8
+
         self.fix_cmap_flag = False
         self.cell_edge = True
         self.cell_fill = True
@@ -188,21 +195,19 @@ class Vis(VisBase, QWidget):
             print("ERROR: file not found",xml_file)
             return
 
-        mcds = pyMCDS(xml_file_root, self.output_dir, microenv=False, graph=False, verbose=False)
+        mcds = pyMCDS(xml_file_root, self.output_dir, microenv=False, graph=False, verbose=False, columns=["cell_type"])
         # total_min = mcds.get_time()  # warning: can return float that's epsilon from integer value
     
-        xvals = mcds.get_cell_df()['position_x']
-        yvals = mcds.get_cell_df()['position_y']
-        cell_types = mcds.get_cell_df()["cell_type"]
+        df_cells = mcds.get_cell_df()
         self.get_cell_types_from_config()
-        csv_file = open("snap.csv", "w")
-        csv_file.write("x,y,z,type,volume,cycle entry,custom:GFP,custom:sample\n")
+        xyz = np.zeros((len(df_cells), 3))
+        xyz[:, 0] = df_cells['position_x'].values
+        xyz[:, 1] = df_cells['position_y'].values
         try:
-            for xv, yv, ct in zip(xvals, yvals, cell_types):  # DON'T do sequential idx
-                csv_file.write(f'{xv},{yv},0.0,{self.celltype_name[int(ct)]}\n')
-        except:
-            print("\nvis_tab.py:-------- Error writing snap.csv file")
-        csv_file.close()
+            write_positions("snap.csv", xyz, df_cells['cell_type'].values.astype(int), self.celltype_name,
+                            header="x,y,z,type,volume,cycle entry,custom:GFP,custom:sample")
+        except (IndexError, OSError) as e:
+            print("\nvis_tab.py:-------- Error writing snap.csv file:", e)
 
     #--------------------------------------
     def reset_axes_cb(self):
@@ -222,7 +227,18 @@ class Vis(VisBase, QWidget):
 
     # Dependent on 2D/3D
     def update_plots(self):
+        # the frame's files are parsed on the loader thread and drawn here once they are in the frame cache;
+        # while scrubbing, a frame that is passed before it is loaded is never drawn
+        jobs = self.frame_jobs(self.current_frame)
+        if self.save_frame or all(self.frame_cache.has(key, stamp_file) for key, stamp_file, loader, args in jobs):
+            self.loader.cancel('frame')
+            self.draw_plots()
+        else:
+            self.loader.submit('frame', self.frame_cache.get_all, jobs, on_done=lambda result: self.draw_plots())
+
+    def draw_plots(self):
         self.ax0.cla()
+        self.graph_cells = None
         if self.substrates_checked_flag:  # do first so cells are plotted on top
             self.plot_substrate(self.current_frame)
         
@@ -238,12 +254,7 @@ class Vis(VisBase, QWidget):
                 self.plot_cell_scalar(self.current_frame)
 
             if self.graph_display_type != 'NONE':
-                df_cells = self.get_current_cells_df()
-                if df_cells is not None:
-                    xvals = df_cells['position_x']
-                    yvals = df_cells['position_y']
-                    for c1,c2 in self.attachments:
-                        self.ax0.plot([xvals[c1], xvals[c2]], [yvals[c1], yvals[c2]], 'k-', lw=0.5)
+                self.plot_graph_overlay()
 
         # show grid(s), but only if Cells or Substrates checked?
         if self.show_voxel_grid:
@@ -258,6 +269,9 @@ class Vis(VisBase, QWidget):
         self.canvas.update()
         self.canvas.draw()
 
+        if self.animating_flag:
+            self.prefetch_frames(self.current_frame)
+
         if self.save_frame:
             self.frame_ind += 1
             frame_file = os.path.join(self.output_dir, f"frame{self.frame_ind:04d}{self.save_frame_filetype}")
@@ -269,19 +283,67 @@ class Vis(VisBase, QWidget):
             df_all_cells = mcds.get_cell_df()
         except:
             return
+        return self.filter_cells_df(df_all_cells)
+
+    def filter_cells_df(self, df_all_cells):
         if self.celltype_filter:
             return df_all_cells.loc[ df_all_cells['cell_type'].isin(self.celltype_filter) ]
         else:
             return df_all_cells
 
-    def get_current_cells_df(self):
-        xml_file_root = "output%08d.xml" % self.current_frame
-        xml_file = os.path.join(self.output_dir, xml_file_root)
-        if not Path(xml_file).is_file():
-            print("ERROR: file not found", xml_file)
+    def cell_scalar_columns(self, cell_scalar_mcds_name):
+        # only the cell variables plot_cell_scalar needs are read from the cells .mat file
+        return ('cell_type', 'total_volume', cell_scalar_mcds_name)
+
+    def physiboss_columns(self):
+        return ('cell_type', 'total_volume')
+
+    def graph_file(self, frame):
+        if self.graph_display_type == 'neighbors':
+            fname = "output%08d_cell_neighbor_graph.txt" % frame
+        elif self.graph_display_type == 'attachments':
+            fname = "output%08d_attached_cells_graph.txt" % frame
+        elif self.graph_display_type == 'spring attachments':
+            fname = "output%08d_spring_attached_cells_graph.txt" % frame
+        else:
             return None
-        mcds = pyMCDS(xml_file_root, self.output_dir, microenv=False, graph=False, verbose=False)
-        return self.get_mcds_cells_df(mcds)
+        return os.path.join(self.output_dir, fname)
+
+    def frame_jobs(self, frame):
+        # (cache key, file whose version the key is for, loader, loader args) of each piece of data draw_plots() reads
+        # through the frame cache; the loaders run on worker threads, so only plain values go into the args
+        jobs = []
+        xml_file_root = "output%08d.xml" % frame
+        xml_file = os.path.join(self.output_dir, xml_file_root)
+        if self.substrates_checked_flag:
+            mat_file = os.path.join(self.output_dir, "output%08d_microenvironment0.mat" % frame)
+            jobs.append((('substrate', xml_file, self.field_index, self.numx, self.numy), xml_file,
+                         load_substrate_frame, (xml_file, mat_file, self.field_index, self.numx, self.numy)))
+        if self.cells_checked_flag:
+            if self.plot_cells_svg:
+                svg_file = os.path.join(self.output_dir, "snapshot%08d.svg" % frame)
+                jobs.append((('svg', svg_file), svg_file, load_svg_frame, (svg_file,)))
+            else:
+                if self.physiboss_vis_flag:
+                    columns = self.physiboss_columns()
+                    state_file = statefile_pathfile(self.output_dir, frame)
+                    if state_file is not None:
+                        jobs.append((('states', state_file), state_file, get_stateindex, (self.output_dir, frame)))
+                else:
+                    cell_scalar_mcds_name = self.cell_scalar_human2mcds_dict.get(self.cell_scalar_combobox.currentText(), self.cell_scalar_combobox.currentText())
+                    columns = self.cell_scalar_columns(cell_scalar_mcds_name)
+                jobs.append((('cells', xml_file, columns), xml_file, load_cells_frame, (xml_file_root, self.output_dir, columns)))
+            graph_file = self.graph_file(frame)
+            if graph_file is not None:
+                jobs.append((('graph', graph_file), graph_file, load_graph_edges, (graph_file,)))
+        return jobs
+
+    def prefetch_frames(self, frame):
+        # decode the next frames on the worker thread while the current one is on screen
+        for next_frame in range(frame + 1, frame + 1 + self.prefetch_count):
+            for key, stamp_file, loader, args in self.frame_jobs(next_frame):
+                if key[0] != 'states':   # the state index loads its own files
+                    self.frame_cache.prefetch(key, stamp_file, loader, *args)
 
     #------------------------------
     # Depends on 2D/3D
@@ -300,25 +362,51 @@ class Vis(VisBase, QWidget):
         self.reset_model()
 
     def build_attachments(self, frame):
-        if self.graph_display_type == 'neighbors':
-            fname = "output%08d_cell_neighbor_graph.txt" % frame
-        elif self.graph_display_type == 'attachments':
-                fname = "output%08d_attached_cells_graph.txt" % frame
-        elif self.graph_display_type == 'spring attachments':
-            fname = "output%08d_spring_attached_cells_graph.txt" % frame
-        else:
+        path = self.graph_file(frame)
+        if path is None:
             print("vis_tab.py: build_attachments(): ERROR: graph_display_type not set to neighbors, attachments, or spring attachments")
             return
-        path = os.path.join(self.output_dir, fname)
-        self.attachments = set()
+        # (cell ID, cell ID) rows, each undirected edge once
+        self.attachments = np.zeros((0,2), dtype=np.int32)
 
         if Path(path).is_file():
-            with open(path, 'r') as attachments_file:
-                for line in attachments_file.readlines()[1:]:
-                    cell, atts = line.split(":")
-                    if len(atts.strip()) > 0:
-                        for att in atts.split(","):
-                            self.attachments.add(tuple(sorted([int(cell), int(att.strip())])))
+            try:
+                self.attachments = self.frame_cache.get(('graph', path), path, load_graph_edges, path)
+            except ValueError as e:
+                print("vis_tab.py: build_attachments(): ",e)
+
+    def set_graph_cells(self, ids, xvals, yvals, cell_types):
+        # the current frame's cells (all of them, not only the filtered ones), as already loaded for plotting,
+        # with the IDs sorted once so plot_graph_overlay() can find the row of each edge end by binary search
+        ids = np.asarray(ids)
+        order = np.argsort(ids, kind='stable')
+        self.graph_cells = {
+            'ids': ids[order],
+            'row': order,
+            'x': np.asarray(xvals, dtype=float),
+            'y': np.asarray(yvals, dtype=float),
+            'cell_type': np.asarray(cell_types, dtype=np.int64),
+        }
+
+    def plot_graph_overlay(self):
+        # all edges as one LineCollection; edges to a cell that is not in the frame are not drawn
+        if (self.graph_cells is None) or (len(self.attachments) == 0) or (len(self.graph_cells['ids']) == 0):
+            return
+        ids = self.graph_cells['ids']
+        pos = np.minimum(np.searchsorted(ids, self.attachments), len(ids) - 1)
+        keep = (ids[pos] == self.attachments).all(axis=1)
+        rows = self.graph_cells['row'][pos[keep]]   # (edge, end) -> row in the cell arrays
+        segments = np.stack((self.graph_cells['x'][rows], self.graph_cells['y'][rows]), axis=-1)
+
+        colors = 'k'
+        if self.graph_color_by_type:
+            # an edge between two cells of the same type gets that type's color, other edges are gray
+            types = self.graph_cells['cell_type'][rows]
+            palette = np.array(plt.get_cmap('tab10').colors)
+            same = (types[:,0] == types[:,1]) & (types[:,0] >= 0)
+            colors = np.full((len(rows), 3), 0.5)
+            colors[same] = palette[types[same,0] % len(palette)]
+        self.ax0.add_collection(LineCollection(segments, colors=colors, linewidths=0.5))
             
     #------------------------------------------------------------
     # not currently used, but maybe useful
@@ -378,15 +466,8 @@ class Vis(VisBase, QWidget):
             print("vis_tab.py: plot_svg(): Warning: full_fname not found: ",full_fname)
             return
 
-        self.title_str = ""
-
-        xlist = deque()
-        ylist = deque()
-        rlist = deque()
-        rgba_list = deque()
-
         try:
-            tree = ET.parse(full_fname)
+            svg = self.frame_cache.get(('svg', full_fname), full_fname, load_svg_frame, full_fname)
         except:
             print("------ plot_svg(): error trying to parse ",full_fname)
             msgBox = QMessageBox()
@@ -397,95 +478,46 @@ class Vis(VisBase, QWidget):
             msgBox.exec()
             return
 
-        root = tree.getroot()
-        numChildren = 0
-        for child in root:
-            if child.text and "Current time" in child.text:
-                svals = child.text.split()
-                # remove the ".00" on minutes
-                self.title_str += svals[2] + " days, " + svals[4] + " hrs, " + svals[7][:-3] + " mins"
-
-            if ('id' in child.attrib.keys()):
-                tissue_parent = child
-                break
-
-        cells_parent = None
-        for child in tissue_parent:
-            if (child.attrib['id'] == 'cells'):
-                cells_parent = child
-                break
-            numChildren += 1
-
-        num_cells = 0
+        self.title_str = svg['title_str']
+
         if self.celltype_filter:
             # if the list is not empty, filter the cells
             filtered_names = [self.cell_dict[str(k)] for k in self.celltype_filter]
-            filter_out = lambda x: x.attrib['type'] not in filtered_names
+            keep_cell = np.isin(svg['cell_type'], filtered_names)
         else:
-            filter_out = lambda x: False # don't filter anything out
+            keep_cell = np.ones(len(svg['cell_type']), dtype=bool)
+        num_cells = np.count_nonzero(keep_cell)
+
+        # map SVG coords into comp domain
+        xvals = svg['x']/self.x_range * self.x_range + self.xmin
+        yvals = svg['y']/self.y_range * self.y_range + self.ymin
+
+        # test for bogus x,y locations (rwh TODO: use max of domain?)
+        too_large_val = 10000.
+        bogus = (np.fabs(xvals) > too_large_val) | (np.fabs(yvals) > too_large_val)
+        keep = keep_cell[svg['cell_idx']] & ~bogus
+        if bogus.any():
+            print("bogus xvals,yvals=", xvals[bogus], yvals[bogus])
+            # a bogus outer circle also drops the cell's nucleus
+            keep &= ~np.isin(svg['cell_idx'], svg['cell_idx'][bogus & ~svg['nucleus']])
 
-        for child in cells_parent:
-            if filter_out(child):
-                continue
-            for circle in child:  # two circles in each child: outer + nucleus
-                try:
-                    xval = float(circle.attrib['cx'])
-                except:
-                    continue
-
-                # map SVG coords into comp domain
-                xval = xval/self.x_range * self.x_range + self.xmin
-
-                s = circle.attrib['fill']
-                if( s[0:4] == "rgba" ):
-                    # background = bgcolor[0] * 255.0; # coudl also be 255.0 for white
-                    rgba_float =list(map(float,s[5:-1].split(",")))
-                    r = rgba_float[0]
-                    g = rgba_float[1]
-                    b = rgba_float[2]                    
-                    alpha = rgba_float[3]
-                    alpha *= 2.0; # cell_alpha_toggle
-                    if( alpha > 1.0 ):
-                        alpha = 1.0
-                    rgba = [1,1,1,alpha]
-                    rgba[0:3] = [ np.round(r), np.round(g), np.round(b) ]
-                    rgba[0:3] = [x / 255. for x in rgba[0:3] ]  
-                elif (s[0:3] == "rgb"):  # if an rgb string, e.g. "rgb(175,175,80)" 
-                    rgba = [1,1,1,1.0]
-                    rgba[0:3] = list(map(int, s[4:-1].split(",")))  
-                    rgba[0:3] = [x / 255. for x in rgba[0:3] ]
-                else:     # otherwise, must be a color name
-                    rgb_tuple = mplc.to_rgb(mplc.cnames[s])  # a tuple
-                    rgba = [1,1,1,1.0]
-                    rgba[0:3] = [x for x in rgb_tuple]
-
-                # test for bogus x,y locations (rwh TODO: use max of domain?)
-                too_large_val = 10000.
-                if (np.fabs(xval) > too_large_val):
-                    print("bogus xval=", xval)
-                    break
-                yval = float(circle.attrib['cy'])
-                yval = yval/self.y_range * self.y_range + self.ymin
-                if (np.fabs(yval) > too_large_val):
-                    print("bogus yval=", yval)
-                    break
-
-                rval = float(circle.attrib['r'])
-                xlist.append(xval)
-                ylist.append(yval)
-                rlist.append(rval)
-                rgba_list.append(rgba)
-
-                # For .svg files with cells that *have* a nucleus, there will be a 2nd
-                if (not self.show_nucleus):
-                    break
-
-            num_cells += 1
-
-        xvals = np.array(xlist)
-        yvals = np.array(ylist)
-        rvals = np.array(rlist)
-        rgbas = np.array(rgba_list)
+        if self.graph_display_type != 'NONE':
+            # the outer circle of every cell; the snapshot has the cell IDs, so the full data is not needed
+            outer = ~svg['nucleus'] & ~bogus
+            type_index = {name: int(k) for k, name in self.cell_dict.items()}
+            names, itype = np.unique(svg['cell_type'].astype(str), return_inverse=True)
+            cell_types = np.array([type_index.get(name, -1) for name in names], dtype=np.int64)[itype.ravel()]
+            icell = svg['cell_idx'][outer]
+            self.set_graph_cells(svg['cell_id'][icell], xvals[outer], yvals[outer], cell_types[icell])
+
+        # For .svg files with cells that *have* a nucleus, there will be a 2nd
+        if (not self.show_nucleus):
+            keep &= ~svg['nucleus']
+
+        xvals = xvals[keep]
+        yvals = yvals[keep]
+        rvals = svg['r'][keep]
+        rgbas = svg['rgba'][keep]
 
         self.title_str += " (" + str(num_cells) + " agents)"
         self.ax0.set_title(self.title_str, fontsize=self.title_fontsize)
@@ -524,50 +556,25 @@ class Vis(VisBase, QWidget):
             print("vis_tab.py: plot_cell_physiboss(): error file not found ",xml_file)
             return
 
-        mcds = pyMCDS(xml_file_root, self.output_dir, microenv=False, graph=False, verbose=False)
-        total_min = mcds.get_time()
+        columns = self.physiboss_columns()
+        cells = self.frame_cache.get(('cells', xml_file, columns), xml_file, load_cells_frame, xml_file_root, self.output_dir, columns)
+        df_cells = cells['df']
+        total_min = cells['time']
         
-        try:
-            cell_types = mcds.get_cell_df()["cell_type"]
-            if (cell_types.index.duplicated().any()):
-                print("Warning: duplicated cell IDs found in ", xml_file_root, "; using first instance.")
-                cell_types = cell_types.groupby(cell_types.index).first()
-        except:
-            print("vis_tab.py: plot_cell_physiboss(): error performing mcds.get_cell_df()['cell_type']")
+        # the frame's state file was read on the loader thread (frame_jobs), so this is a cache hit
+        state_file = statefile_pathfile(self.output_dir, frame)
+        state_index = None
+        if state_file is not None:
+            state_index = self.frame_cache.get(('states', state_file), state_file, get_stateindex, self.output_dir, frame)
+        if (state_index is None) or (frame not in state_index.get_frames()):
+            print("vis_tab.py: plot_cell_physiboss(): error no PhysiBoSS state file found for frame ",frame)
             return
-        
-        physiboss_state_file = os.path.join(self.output_dir, "output%08d_boolean_intracellular.csv" % frame)
-        
-        if not Path(physiboss_state_file).is_file():
-            
-            physiboss_state_file = os.path.join(self.output_dir, "states_%08d.csv" % frame)
-            
-            if not Path(physiboss_state_file).is_file():
-                print("vis_tab.py: plot_cell_physiboss(): error file not found ",physiboss_state_file)
-                return
-        
-        cell_scalar = {id: 9 for id in mcds.get_cell_df().index}
-        
+
         name_cellline = list(self.physiboss_node_dict.keys())[self.physiboss_selected_cell_line]
         id_cellline = list(self.celldef_tab.param_d.keys()).index(name_cellline)
-        
-        with open(physiboss_state_file, newline='') as csvfile:
-            states_reader = csv.reader(csvfile, delimiter=',')
-                
-            for row in states_reader:
-                if row[0] != 'ID':
-                    ID = int(row[0])
-                    if cell_types[ID] == id_cellline:
-                        nodes = row[1].split(" -- ")             
-
-                        if self.physiboss_selected_node in nodes:
-                            cell_scalar.update({ID: 2})      
-                        else:
-                            cell_scalar.update({ID: 0})
-                    else:
-                        cell_scalar.update({ID: 9})
-                        
-        cell_scalar = pandas.Series(cell_scalar)
+
+        # 2 (node active), 0 (inactive) or 9 (other cell type), per cell, from the interned state codes
+        cell_scalar = state_index.get_frame_scalar(frame, df_cells.index.values, id_cellline, self.physiboss_selected_node)
             
         # To plot green/red/grey cells, we use a qualitative cell map called Set1
         cbar_name = "Set1"
@@ -575,14 +582,14 @@ class Vis(VisBase, QWidget):
         vmax = 9
         
         num_cells = len(cell_scalar)
-        cell_vol = mcds.get_cell_df()['total_volume']
+        cell_vol = df_cells['total_volume']
         
         four_thirds_pi =  4.188790204786391
         cell_radii = np.divide(cell_vol, four_thirds_pi)
         cell_radii = np.power(cell_radii, 0.333333333333333333333333333333333333333)
 
-        xvals = mcds.get_cell_df()['position_x']
-        yvals = mcds.get_cell_df()['position_y']
+        xvals = df_cells['position_x']
+        yvals = df_cells['position_y']
 
         mins = total_min
         hrs = int(mins/60)
@@ -600,8 +607,7 @@ class Vis(VisBase, QWidget):
             cell_plot = self.circles(xvals,yvals, s=cell_radii, c=cell_scalar, cmap=cbar_name, vmin=vmin, vmax=vmax)
 
         if self.graph_display_type != 'NONE':
-            for c1,c2 in self.attachments:
-                self.ax0.plot([xvals[c1], xvals[c2]], [yvals[c1], yvals[c2]], 'k-', lw=0.5)
+            self.set_graph_cells(df_cells.index.values, xvals, yvals, df_cells['cell_type'])
     
         if self.cax2:
             try:
@@ -648,9 +654,12 @@ class Vis(VisBase, QWidget):
             print("ERROR: file not found",xml_file)
             return
 
-        mcds = pyMCDS(xml_file_root, self.output_dir, microenv=False, graph=False, verbose=False)
-        df_cells = self.get_mcds_cells_df(mcds)
-        total_min = mcds.get_time()  # warning: can return float that's epsilon from integer value
+        columns = self.cell_scalar_columns(cell_scalar_mcds_name)
+        cells = self.frame_cache.get(('cells', xml_file, columns), xml_file, load_cells_frame, xml_file_root, self.output_dir, columns)
+        df_cells = self.filter_cells_df(cells['df'])
+        if self.graph_display_type != 'NONE':
+            self.set_graph_cells(cells['df'].index.values, cells['df']['position_x'], cells['df']['position_y'], cells['df']['cell_type'])
+        total_min = cells['time']  # warning: can return float that's epsilon from integer value
 
         try:
             cell_scalar = df_cells[cell_scalar_mcds_name]
@@ -752,9 +761,6 @@ class Vis(VisBase, QWidget):
         # self.title_str = '%f mins' % (total_min)  # rwh: custom
         self.title_str += " (" + str(num_cells) + " agents)"
 
-        axes_min = mcds.get_mesh()[0][0][0][0]
-        axes_max = mcds.get_mesh()[0][0][-1][0]
-
         if (self.cell_fill):
             if (self.cell_edge):
                 try:
@@ -833,36 +839,27 @@ class Vis(VisBase, QWidget):
 
         cbar_name = self.substrates_cbar_combobox.currentText()
 
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        mins = float(root.find(".//current_time").text)
-        hrs = int(mins/60)
-        days = int(hrs/24)
-        self.title_str = '%d days, %d hrs, %d mins' % (days,hrs-days*24, mins-hrs*60)
-
         fname = "output%08d_microenvironment0.mat" % frame
         full_fname = os.path.join(self.output_dir, fname)
         if not Path(full_fname).is_file():
             print("ERROR: file not found",full_fname)
             return
 
-        info_dict = {}
-        scipy.io.loadmat(full_fname, info_dict)
-        M = info_dict['multiscale_microenvironment']
-
         try:
-            xgrid = M[0, :].reshape(self.numy, self.numx)
-            ygrid = M[1, :].reshape(self.numy, self.numx)
+            substrate = self.frame_cache.get(('substrate', xml_file, self.field_index, self.numx, self.numy), xml_file,
+                                             load_substrate_frame, xml_file, full_fname, self.field_index, self.numx, self.numy)
         except:
             print("vis_tab.py: unable to reshape substrate array; return")
             return
 
-        zvals = M[self.field_index,:].reshape(self.numy,self.numx)
-        try:
-            zvals = M[self.field_index,:].reshape(self.numy,self.numx)
-        except:
-            print("vis_tab.py:  zvals Exception; return")
-            return
+        mins = substrate['mins']
+        hrs = int(mins/60)
+        days = int(hrs/24)
+        self.title_str = '%d days, %d hrs, %d mins' % (days,hrs-days*24, mins-hrs*60)
+
+        xgrid = substrate['xgrid']
+        ygrid = substrate['ygrid']
+        zvals = substrate['zvals']
 
         if (self.substrate_grad):
             try:
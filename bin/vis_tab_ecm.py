@@ -48,6 +48,7 @@ import scipy.io
 from pyMCDS_cells import pyMCDS_cells 
 # from pyMCDS import pyMCDS
 from pyMCDS_ECM import *   # custom for ECM
+from pyMCDS_states import get_stateindex
 import matplotlib
 matplotlib.use('Qt5Agg')
 import matplotlib.pyplot as plt
@@ -666,39 +667,17 @@ class Vis(VisBase, QWidget):
         total_min = mcds.get_time()
         
         if self.physiboss_vis_flag:
-            try:
-                cell_types = mcds.get_cell_df()["cell_type"]
-            except:
-                print("vis_tab.py: plot_cell_scalar(): error performing mcds.get_cell_df()['cell_type']")
+            state_index = get_stateindex(self.output_dir, frame)
+            if frame not in state_index.dd_frame:
+                print("vis_tab_ecm.py: plot_cell_scalar(): error no PhysiBoSS state file found for frame ",frame)
                 return
-            
-            physiboss_state_file = os.path.join(self.output_dir, "output%08d_boolean_intracellular.csv" % frame)
-        
-            if not Path(physiboss_state_file).is_file():
-            
-                physiboss_state_file = os.path.join(self.output_dir, "states_%08d.csv" % frame)
-                
-                if not Path(physiboss_state_file).is_file():
-                    print("vis_tab.py: plot_cell_physiboss(): error file not found ",physiboss_state_file)
-                    return
-        
-            cell_scalar = {}
-            with open(physiboss_state_file, newline='') as csvfile:
-                states_reader = csv.reader(csvfile, delimiter=',')
-                    
-                for row in states_reader:
-                    if row[0] != 'ID':
-                        ID = int(row[0])
-                        if cell_types[ID] == self.physiboss_selected_cell_line:
-                            nodes = row[1].split(" -- ")                      
-                            if self.physiboss_selected_node in nodes:
-                                cell_scalar.update({ID: 2})      
-                            else:
-                                cell_scalar.update({ID: 0})
-                        else:
-                            cell_scalar.update({ID: 9})
-                            
-            cell_scalar = pandas.Series(cell_scalar)
+
+            name_cellline = list(self.physiboss_node_dict.keys())[self.physiboss_selected_cell_line]
+            id_cellline = list(self.celldef_tab.param_d.keys()).index(name_cellline)
+
+            # 2 (node active), 0 (inactive) or 9 (other cell type), per cell, from the interned state codes
+            cell_ids = mcds.get_cell_df().index
+            cell_scalar = pandas.Series(state_index.get_frame_scalar(frame, cell_ids.values, id_cellline, self.physiboss_selected_node), index=cell_ids)
             
             # To plot green/red/grey cells, we use a qualitative cell map called Set1
             cbar_name = "Set1"
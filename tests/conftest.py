@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# synthetic PhysiCell output folders for the reader and reducer tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from scipy import io
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+
+# (label, size) in cells mat row order
+cell_labels = [('ID', 1), ('position', 3), ('total_volume', 1), ('cell_type', 1), ('cycle_model', 1),
+               ('current_phase', 1), ('is_motile', 1), ('current_death_model', 1), ('dead', 1), ('number_of_nuclei', 1)]
+substrates = ['oxygen', 'drug']
+states = ['', 'A', 'A -- B', 'B -- C']
+nx, ny, dx = 8, 6, 20.
+
+
+def write_frame(output_path, frame, num_cells, rng):
+    xs = dx/2 + dx*np.arange(nx)
+    ys = dx/2 + dx*np.arange(ny)
+    X, Y = np.meshgrid(xs, ys, indexing='xy')   # PhysiCell orders the voxels x fastest
+    mesh = np.vstack([X.ravel(), Y.ravel(), np.zeros(nx*ny), np.full(nx*ny, dx**3)])
+    io.savemat(os.path.join(output_path, 'initial_mesh0.mat'), {'mesh': mesh}, format='4')
+
+    # each frame spans a wider concentration range than the first
+    conc = rng.uniform(0, 10 * (frame + 1), (len(substrates), nx*ny))
+    io.savemat(os.path.join(output_path, f'output{frame:08d}_microenvironment0.mat'), {'multiscale_microenvironment': np.vstack([mesh, conc])}, format='4')
+
+    cells = np.zeros((sum(size for _, size in cell_labels), num_cells))
+    cells[0] = rng.permutation(num_cells) + 100   # IDs are not row numbers
+    cells[1] = rng.uniform(0, nx*dx, num_cells)
+    cells[2] = rng.uniform(0, ny*dx, num_cells)
+    cells[4] = rng.uniform(1000, 3000, num_cells)
+    cells[5] = rng.integers(0, 3, num_cells)
+    cells[6] = rng.choice([5, 100], num_cells)
+    cells[7] = rng.choice([0, 1, 14, 100], num_cells)
+    cells[8] = rng.integers(0, 2, num_cells)
+    cells[9] = rng.integers(0, 2, num_cells)
+    cells[10] = rng.integers(0, 2, num_cells)
+    cells[11] = rng.integers(1, 3, num_cells)
+    io.savemat(os.path.join(output_path, f'output{frame:08d}_cells.mat'), {'cells': cells}, format='4')
+
+    # neighbor graph: a ring; attached graph: every other cell to its successor
+    ids = cells[0].astype(int)
+    with open(os.path.join(output_path, f'output{frame:08d}_cell_neighbor_graph.txt'), 'w') as f:
+        for k, i in enumerate(ids):
+            f.write(f'{i}: {ids[k-1]},{ids[(k+1) % num_cells]}\n')
+    with open(os.path.join(output_path, f'output{frame:08d}_attached_cells_graph.txt'), 'w') as f:
+        for k, i in enumerate(ids):
+            f.write(f'{i}: {ids[(k+1) % num_cells]}\n' if k % 2 == 0 else f'{i}: \n')
+
+    # boolean network states of all but the last cell
+    with open(os.path.join(output_path, f'output{frame:08d}_boolean_intracellular.csv'), 'w') as f:
+        f.write('ID,state\n')
+        for i in ids[:-1]:
+            f.write(f'{i},{states[rng.integers(len(states))]}\n')
+
+    labels, index = [], 0
+    for name, size in cell_labels:
+        labels.append(f'<label index="{index}" size="{size}" units="none">{name}</label>')
+        index += size
+    variables = ''.join(f'<variable name="{s}" units="mmHg" ID="{k}"><physical_parameter_set><diffusion_coefficient units="micron^2/min">1000</diffusion_coefficient><decay_rate units="1/min">0.1</decay_rate></physical_parameter_set></variable>' for k, s in enumerate(substrates))
+    with open(os.path.join(output_path, f'output{frame:08d}.xml'), 'w') as f:
+        f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<MultiCellDS version="2" type="snapshot/simulation">
+<metadata><software><name>PhysiCell</name><version>1.14.0</version></software><created>now</created><last_modified>now</last_modified>
+<current_time units="min">{frame * 60.0}</current_time><current_runtime units="sec">{float(frame)}</current_runtime></metadata>
+<microenvironment><domain name="microenvironment"><mesh type="Cartesian" uniform="true" regular="true" units="micron">
+<bounding_box type="axis-aligned" units="micron">0 0 -10 {nx*dx} {ny*dx} 10</bounding_box>
+<x_coordinates delimiter=" ">{' '.join(map(str, xs))}</x_coordinates>
+<y_coordinates delimiter=" ">{' '.join(map(str, ys))}</y_coordinates>
+<z_coordinates delimiter=" ">0.0</z_coordinates>
+<voxels type="matlab"><filename>initial_mesh0.mat</filename></voxels></mesh>
+<variables>{variables}</variables>
+<data type="matlab"><filename>output{frame:08d}_microenvironment0.mat</filename></data></domain></microenvironment>
+<cellular_information><cell_populations><cell_population type="individual"><custom>
+<simplified_data type="matlab" source="PhysiCell" data_version="2"><cell_types><type ID="0" type="0">a</type><type ID="1" type="1">b</type><type ID="2" type="2">c</type></cell_types>
+<labels>{''.join(labels)}</labels><filename>output{frame:08d}_cells.mat</filename></simplified_data>
+<neighbor_graph type="text" source="PhysiCell" data_version="2"><filename>output{frame:08d}_cell_neighbor_graph.txt</filename></neighbor_graph>
+<attached_cells_graph type="text" source="PhysiCell" data_version="2"><filename>output{frame:08d}_attached_cells_graph.txt</filename></attached_cells_graph>
+</custom></cell_population></cell_populations></cellular_information></MultiCellDS>
+''')
+
+
+@pytest.fixture
+def output_path(tmp_path):
+    # three frames with a growing number of cells
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / 'output')
+    os.makedirs(path)
+    for frame in range(3):
+        write_frame(path, frame, 40 + 10*frame, rng)
+    return path
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+
+
+@pytest.fixture
+def biwt_tab(qapp):
+    # biwt_tab selects the Qt5Agg backend, which needs the QApplication first
+    import biwt_tab
+    return biwt_tab
+
+
+def apportion_spot(probs, n_per_spot):
+    # the one cell at a time loop apportion_cells replaces
+    priorities = {k: p / np.sqrt(2) for k, p in enumerate(probs)}
+    counts = {k: 0 for k in range(len(probs))}
+    for i in range(n_per_spot):
+        next_key = max(priorities, key=priorities.get)
+        counts[next_key] += 1
+        priorities[next_key] = probs[next_key] / np.sqrt((counts[next_key] + 1) * (counts[next_key] + 2))
+    return list(counts.values())
+
+
+@pytest.mark.parametrize('n_per_spot', [1, 2, 3, 7, 20])
+def test_apportion_cells(biwt_tab, n_per_spot):
+    rng = np.random.default_rng(n_per_spot)
+    prob_matrix = rng.dirichlet(np.full(5, 0.3), size=300)
+    prob_matrix[rng.random(prob_matrix.shape) < 0.3] = 0   # sparse rows, some all zero
+    prob_matrix[:10] = [0.25, 0.25, 0.25, 0.25, 0]         # ties go to the first type
+    prob_matrix[10] = 0
+    counts = biwt_tab.apportion_cells(prob_matrix, n_per_spot)
+    assert (counts.sum(axis=1) == n_per_spot).all()
+    for probs, spot_counts in zip(prob_matrix, counts):
+        assert list(spot_counts) == apportion_spot(probs, n_per_spot)
+    assert biwt_tab.apportion_cells(np.zeros((0, 5)), n_per_spot).shape == (0, 5)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+from frame_cache import load_svg_frame, load_svg_frame_etree
+
+fills = ['rgb(255,0,0)', 'rgba(0,128,255,0.25)', 'yellow', 'rgb(10,200,10)', 'rgba(10,20,30,0.9)']
+
+
+def write_svg(fname, num_cells=60, quote='"'):
+    # a PhysiCell snapshot: each cell group holds the cytoplasm and (mostly) a nucleus circle
+    rng = np.random.default_rng(num_cells)
+    q = quote
+    cells = []
+    for i in range(num_cells):
+        x, y, r = rng.uniform(0, 400), rng.uniform(0, 300), rng.uniform(2, 9)
+        circles = f'<circle cx={q}{x:.2f}{q} cy={q}{y:.2f}{q} r={q}{r:.2f}{q} fill={q}{fills[i % len(fills)]}{q} stroke="rgb(0,0,0)" stroke-width="0.5"/>'
+        if i % 7 != 3:
+            circles += f'<circle cx={q}{x:.2f}{q} cy={q}{y:.2f}{q} r={q}{r/3:.2f}{q} fill={q}{fills[(i+1) % len(fills)]}{q}/>'
+        cell_type = f' type="type{i % 3}"' if i % 11 != 5 else ''
+        cells.append(f'<g id="cell{100+i}"{cell_type}>{circles}</g>\n')
+    with open(fname, 'w') as f:
+        f.write(f'''<?xml version="1.0" standalone="no"?>
+<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">
+<svg width="400" height="370" xmlns="http://www.w3.org/2000/svg">
+<rect x="0" y="0" width="400" height="370" fill="white" stroke-width="0.5" stroke="black"/>
+<text x="10" y="345" font-family="Arial" font-size="12" fill="black">Current time: 1 days, 2 hours, and 30.00 minutes</text>
+<text x="10" y="360" font-family="Arial" font-size="12" fill="black">{num_cells} agents</text>
+<g id="tissue" transform="translate(0,370) scale(1,-1)">
+<g id="ECM">
+<circle cx="1" cy="1" r="1" fill="black"/>
+</g>
+<g id="cells">
+{''.join(cells)}</g>
+</g>
+</svg>
+''')
+
+
+@pytest.mark.parametrize('quote', ['"', "'"], ids=['regex', 'fallback'])
+def test_load_svg_frame(tmp_path, quote):
+    fname = str(tmp_path / 'snapshot00000000.svg')
+    write_svg(fname, quote=quote)
+    d_frame = load_svg_frame(fname)
+    d_reference = load_svg_frame_etree(fname)
+    assert d_frame['title_str'] == d_reference['title_str'] == '1 days, 2 hrs, 30 mins'
+    assert sorted(d_frame.keys()) == sorted(d_reference.keys())
+    for key in ['x', 'y', 'r', 'rgba', 'cell_idx', 'nucleus', 'cell_id']:
+        assert d_frame[key].dtype == d_reference[key].dtype
+        assert np.array_equal(d_frame[key], d_reference[key]), key
+    assert list(d_frame['cell_type']) == list(d_reference['cell_type'])
+    assert len(d_frame['cell_id']) == 60 and d_frame['nucleus'].sum() == 60 - 9
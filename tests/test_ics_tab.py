@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+
+cell_types = ['tumor', 'T cell', '50%']
+
+
+@pytest.fixture
+def ics_tab(qapp):
+    # ics_tab selects the Qt5Agg backend, which needs the QApplication first
+    import ics_tab
+    return ics_tab
+
+
+def make_placer(ics_tab, **kwargs):
+    # just the state the ICs generators read, with add_cells storing the chunk without drawing
+    placer = SimpleNamespace(cell_radius=8.0, spacing=1.0, r1_value=200.0, r2_value=150.0, r3_value=20.0,
+                             x0_value=10.5, y0_value=-20.0, z0_value=30.0, o1_value=0.0, o2_value=360.0,
+                             plot_xmin=-160.0, plot_xmax=170.0, plot_ymin=-130.0, plot_ymax=140.0,
+                             celltype_combobox=SimpleNamespace(currentIndex=lambda: 2),
+                             zeq0=SimpleNamespace(isChecked=lambda: True),
+                             num_cells=SimpleNamespace(text=lambda: '300'),
+                             odelw=SimpleNamespace(text=lambda: '2'),
+                             cells=ics_tab.CellChunks())
+    placer.__dict__.update(kwargs)
+    for s_method in ['hex_lattice', 'in_plot_range', 'hex_pts_box', 'hex_pts_annulus', 'uniform_random_pts_box',
+                     'uniform_random_pts_annulus', 'ring']:
+        setattr(placer, s_method, getattr(ics_tab.ICs, s_method).__get__(placer))
+
+    def add_cells(xvals, yvals, zvals, cell_type_index):
+        xyzt = np.column_stack([xvals, yvals, np.broadcast_to(zvals, np.shape(xvals)), np.full(len(xvals), cell_type_index)])
+        placer.cells.append(xyzt, np.full(len(xvals), placer.cell_radius))
+    placer.add_cells = add_cells
+    return placer
+
+
+def in_range(p, xval, yval):
+    return p.plot_xmin <= xval <= p.plot_xmax and p.plot_ymin <= yval <= p.plot_ymax
+
+
+def hex_box_loop(p, clip):
+    # the one cell at a time loops the generators replace
+    l_xyz = []
+    y_idx = 0
+    for yval in np.arange(-p.r2_value, p.r2_value, p.cell_radius * 1.7320508 * p.spacing):
+        y_idx += 1
+        for xval in np.arange(-p.r1_value, p.r1_value, p.cell_radius * 2 * p.spacing):
+            xval_offset = xval + (y_idx%2) * p.cell_radius + p.x0_value
+            yval_offset = yval + p.y0_value
+            if (not clip) or in_range(p, xval_offset, yval_offset):
+                l_xyz.append([xval_offset, yval_offset, 0.0 if clip else p.z0_value])
+    return np.array(l_xyz)
+
+
+def hex_annulus_loop(p):
+    l_xyz = []
+    y_idx = 0
+    for yval in np.arange(-p.r2_value, p.r2_value, p.cell_radius * np.sqrt(3) * p.spacing):
+        y_idx += 1
+        for xval in np.arange(-p.r2_value, p.r2_value, p.cell_radius * 2 * p.spacing):
+            xval_offset = xval + (y_idx%2) * p.cell_radius
+            dist = np.sqrt(xval_offset*xval_offset + yval*yval)
+            if (dist >= p.r1_value) and (dist <= p.r2_value):
+                xval_offset += p.x0_value
+                yval_offset = yval + p.y0_value
+                if in_range(p, xval_offset, yval_offset):
+                    l_xyz.append([xval_offset, yval_offset, 0.0])
+    return np.array(l_xyz)
+
+
+def ring_loop(p, rmod):
+    l_xyz = []
+    delta_theta = np.arcsin(p.cell_radius / p.r2_value) * p.spacing
+    for theta in np.arange(p.o1_value * np.pi/180., p.o2_value * np.pi/180., rmod*2*delta_theta):
+        xval = p.x0_value + p.r2_value * np.cos(theta)
+        yval = p.y0_value + p.r2_value * np.sin(theta)
+        if in_range(p, xval, yval):
+            l_xyz.append([xval, yval, 0.0])
+    return np.array(l_xyz)
+
+
+def test_cell_chunks(ics_tab):
+    cells = ics_tab.CellChunks()
+    xyzt, radii = cells.arrays()
+    assert xyzt.shape == (0, 4) and radii.shape == (0,)
+    assert len(cells) == 0 and cells.pop() is None
+
+    l_chunk = [np.full((n, 4), float(n)) for n in [3, 0, 5]]
+    for chunk in l_chunk:
+        cells.append(chunk, chunk[:, 0] / 2)
+    xyzt, radii = cells.arrays()
+    assert len(cells) == 8 and cells.arrays()[0] is xyzt
+    assert np.array_equal(xyzt, np.concatenate(l_chunk)) and np.array_equal(radii, xyzt[:, 0] / 2)
+
+    # undo drops whole actions, last first
+    assert cells.pop() == 5
+    xyzt, radii = cells.arrays()
+    assert np.array_equal(xyzt, l_chunk[0]) and len(radii) == 3
+    assert cells.pop() == 0 and cells.pop() == 3 and cells.pop() is None
+    assert cells.arrays()[0].shape == (0, 4)
+
+
+@pytest.mark.parametrize('is_2d', [True, False], ids=['2D', '3D'])
+def test_hex_pts_box(ics_tab, is_2d):
+    p = make_placer(ics_tab, zeq0=SimpleNamespace(isChecked=lambda: is_2d))
+    p.hex_pts_box()
+    xyzt, radii = p.cells.arrays()
+    assert np.array_equal(xyzt[:, :3], hex_box_loop(p, clip=is_2d))
+    assert (xyzt[:, 3] == 2).all() and (radii == p.cell_radius).all()
+
+
+@pytest.mark.parametrize('spacing', [1.0, 1.3])
+def test_hex_pts_annulus(ics_tab, spacing):
+    p = make_placer(ics_tab, r1_value=60.0, spacing=spacing)
+    p.hex_pts_annulus()
+    assert np.array_equal(p.cells.arrays()[0][:, :3], hex_annulus_loop(p))
+
+
+@pytest.mark.parametrize('rmod', [1, 3])
+def test_ring(ics_tab, rmod):
+    p = make_placer(ics_tab, o1_value=30.0, o2_value=300.0, odelw=SimpleNamespace(text=lambda: str(rmod)))
+    p.ring()
+    assert np.array_equal(p.cells.arrays()[0][:, :3], ring_loop(p, rmod))
+
+
+def test_uniform_random_pts(ics_tab):
+    np.random.seed(0)
+    p = make_placer(ics_tab, r1_value=60.0)
+    p.uniform_random_pts_annulus()
+    xyzt = p.cells.arrays()[0]
+    dist = np.hypot(xyzt[:, 0] - p.x0_value, xyzt[:, 1] - p.y0_value)
+    assert len(xyzt) == 300 and (dist >= p.r1_value).all() and (dist <= p.r2_value).all()
+
+    p.uniform_random_pts_box()
+    xyzt = p.cells.arrays()[0][300:]
+    assert len(xyzt) == 300
+    for i_axis, (r_ctr, r_half) in enumerate([(p.x0_value, p.r1_value), (p.y0_value, p.r2_value), (p.z0_value, p.r3_value)]):
+        assert (np.abs(xyzt[:, i_axis] - r_ctr) <= r_half).all()
+
+    # no cells is no Plot action
+    p.num_cells = SimpleNamespace(text=lambda: '0')
+    p.uniform_random_pts_annulus()
+    assert len(p.cells.chunks) == 2
+
+
+def test_read_cells_csv_errors(tmp_path, ics_tab):
+    fname = str(tmp_path / 'v2.csv')
+    with open(fname, 'w') as f:
+        f.write('x,y,z,type,volume\n1,2,3,tumor,10\n1,two,3,tumor,10\n\n4,5,6, T cell,10\n7,8,9,macrophage,10\n')
+    xyzt, errors = ics_tab.read_cells_csv(fname, cell_types)
+    assert np.array_equal(xyzt, [[1, 2, 3, 0], [4, 5, 6, 1]])
+    assert errors == ["line 3: invalid x,y,z", "line 6: invalid cell type 'macrophage'"]
+
+    fname = str(tmp_path / 'v1.csv')
+    with open(fname, 'w') as f:
+        f.write('1,2,3,0\n4,5,6,2\n7,8,9,3\n7,8,9,1.5\n')
+    xyzt, errors = ics_tab.read_cells_csv(fname, cell_types)
+    assert np.array_equal(xyzt, [[1, 2, 3, 0], [4, 5, 6, 2]])
+    assert errors == ["line 3: invalid cell type '3'", "line 4: invalid cell type '1.5'"]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+import output_archiver
+
+
+def make_output(root, num_files=3, size=3 * output_archiver.chunk_size + 123):
+    # compressible text (several chunks), an incompressible .mat (stored) and an empty file
+    rng = np.random.default_rng(0)
+    os.makedirs(root, exist_ok=True)
+    contents = {}
+    for i in range(num_files):
+        text = ''.join(f'{x:.6f},' for x in rng.random(size // 9)).encode()[:size]
+        contents[f'output{i:08d}.xml'] = text
+    contents['output00000000_cells.mat'] = rng.bytes(50000)
+    contents['empty.txt'] = b''
+    for name, data in contents.items():
+        with open(os.path.join(root, name), 'wb') as f:
+            f.write(data)
+    return contents
+
+
+def check_archive(zip_path, contents):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == sorted(contents.keys())
+        for name, data in contents.items():
+            assert zf.read(name) == data
+        assert zf.getinfo('output00000000_cells.mat').compress_type == zipfile.ZIP_STORED
+
+
+@pytest.fixture(params=[True, False], ids=['parallel', 'zipfile'])
+def parallel(request, monkeypatch):
+    # the parallel deflate (DeflatedMember) and the zipfile-only fallback for unchecked Python versions
+    if not request.param:
+        monkeypatch.setattr(output_archiver, 'deflated_member_versions', ((0, 0), (0, 0)))
+    return request.param
+
+
+def test_round_trip(tmp_path, parallel):
+    root = str(tmp_path / 'output')
+    contents = make_output(root)
+    zip_path = str(tmp_path / 'out.zip')
+    assert output_archiver.update_archive(zip_path, root, ['*'], num_workers=2)
+    check_archive(zip_path, contents)
+    assert sorted(output_archiver.read_index(zip_path).keys()) == sorted(contents.keys())
+
+
+def test_append_new_files(tmp_path, parallel):
+    root = str(tmp_path / 'output')
+    contents = make_output(root, num_files=2)
+    zip_path = str(tmp_path / 'out.zip')
+    assert output_archiver.update_archive(zip_path, root, ['*'], num_workers=2)
+    with zipfile.ZipFile(zip_path) as zf:
+        offsets = {zinfo.filename: zinfo.header_offset for zinfo in zf.infolist()}
+
+    # a growing output folder: the archived members stay where they are, the new file is appended
+    new_data = b'<MultiCellDS>' * 200000
+    with open(os.path.join(root, 'output00000002.xml'), 'wb') as f:
+        f.write(new_data)
+    contents['output00000002.xml'] = new_data
+    assert output_archiver.update_archive(zip_path, root, ['*'], num_workers=2)
+    check_archive(zip_path, contents)
+    with zipfile.ZipFile(zip_path) as zf:
+        for name, offset in offsets.items():
+            assert zf.getinfo(name).header_offset == offset
+
+    # a changed file can't be replaced in place, so the archive is rebuilt
+    changed = b'changed'
+    with open(os.path.join(root, 'output00000000.xml'), 'wb') as f:
+        f.write(changed)
+    contents['output00000000.xml'] = changed
+    assert output_archiver.update_archive(zip_path, root, ['*'], num_workers=2)
+    check_archive(zip_path, contents)
+
+
+def test_cancel_keeps_complete_members(tmp_path, parallel):
+    root = str(tmp_path / 'output')
+    contents = make_output(root, num_files=4)
+    zip_path = str(tmp_path / 'out.zip')
+
+    def progress(done, total):
+        return done < total // 2
+
+    assert not output_archiver.update_archive(zip_path, root, ['*'], num_workers=2, progress=progress)
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        for name in names:
+            assert zf.read(name) == contents[name]
+    assert 0 < len(names) < len(contents)
+    assert sorted(output_archiver.read_index(zip_path).keys()) == sorted(names)
+
+    # the next export completes the archive
+    assert output_archiver.update_archive(zip_path, root, ['*'], num_workers=2)
+    check_archive(zip_path, contents)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+from positions_writer import format_chunk, write_positions, read_sidecar, sidecar_file
+
+cell_types = ['tumor', 'T cell', '50%']
+
+
+@pytest.fixture
+def ics_tab(qapp):
+    # ics_tab selects the Qt5Agg backend, which needs the QApplication first
+    import ics_tab
+    return ics_tab
+
+
+def random_cells(num_cells=500):
+    rng = np.random.default_rng(1)
+    xyz = rng.normal(scale=300, size=(num_cells, 3))
+    xyz[:5] = [[0, -0., 1e-300], [1e22, -2.5, 1/3], [7, 8, 9], [np.pi, -np.e, 0.1], [1e-7, 123456789.125, -0.0]]
+    codes = rng.integers(len(cell_types), size=num_cells)
+    return xyz, codes
+
+
+def test_format_chunk():
+    xyz, codes = random_cells()
+    text = ''.join(f'{x},{y},{z},{cell_types[k]}\n' for (x, y, z), k in zip(xyz, codes))
+    assert format_chunk(xyz, codes, cell_types) == text
+
+
+@pytest.mark.parametrize('fname', ['cells.csv', 'cells.csv.gz'])
+def test_write_read_cells_csv(tmp_path, ics_tab, fname):
+    xyz, codes = random_cells()
+    fname = str(tmp_path / fname)
+    write_positions(fname, xyz, codes, cell_types, sidecar=True)
+
+    # the binary sidecar and the text give the same cells
+    assert read_sidecar(fname) is not None
+    xyzt, errors = ics_tab.read_cells_csv(fname, cell_types)
+    assert errors == []
+    assert np.array_equal(xyzt, np.column_stack([xyz, codes]))
+    os.remove(fname + '.npz')
+    xyzt, errors = ics_tab.read_cells_csv(fname, cell_types)
+    assert errors == []
+    assert np.array_equal(xyzt, np.column_stack([xyz, codes]))
+
+    # an append leaves no stale sidecar
+    write_positions(fname, xyz[:2], codes[:2], cell_types, sidecar=True)
+    write_positions(fname, xyz[2:4], codes[2:4], cell_types, mode='a')
+    assert read_sidecar(fname) is None
+    xyzt, errors = ics_tab.read_cells_csv(fname, cell_types)
+    assert np.array_equal(xyzt, np.column_stack([xyz[:4], codes[:4]]))
+
+
+def test_read_sidecar_stale(tmp_path):
+    xyz, codes = random_cells()
+    fname = str(tmp_path / 'cells.csv')
+    write_positions(fname, xyz, codes, cell_types, sidecar=True)
+    st = os.stat(fname)
+
+    # an edit within the same mtime tick, seen by the size only
+    with open(fname, 'a') as f:
+        f.write('1,2,3,tumor\n')
+    os.utime(fname, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert read_sidecar(fname) is None
+
+    # the same size, but written later
+    write_positions(fname, xyz, codes, cell_types, sidecar=True)
+    assert read_sidecar(fname) is not None
+    os.utime(fname, ns=(st.st_atime_ns, os.stat(fname).st_mtime_ns + 1))
+    assert read_sidecar(fname) is None
+
+    # a sidecar without the stored stat
+    write_positions(fname, xyz, codes, cell_types, sidecar=True)
+    with open(sidecar_file(fname), 'wb') as f:
+        np.savez(f, xyz=xyz, codes=codes, names=np.array(cell_types))
+    assert read_sidecar(fname) is None
+
+
+def test_save_cb_v1_removes_sidecar(tmp_path, ics_tab):
+    xyz, codes = random_cells(20)
+    use_names = [True]
+    tab = SimpleNamespace(csv_array=np.column_stack([xyz, codes]),
+                          csv_folder=SimpleNamespace(text=lambda: str(tmp_path)),
+                          output_file=SimpleNamespace(text=lambda: 'cells.csv'),
+                          use_names=SimpleNamespace(isChecked=lambda: use_names[0]),
+                          save_sidecar=SimpleNamespace(isChecked=lambda: True),
+                          xml_creator=SimpleNamespace(celldef_tab=SimpleNamespace(param_d={name: {} for name in cell_types})))
+    fname = str(tmp_path / 'cells.csv')
+    ics_tab.ICs.save_cb(tab)
+    assert read_sidecar(fname) is not None
+
+    # a v1 save over it leaves no binary copy of the v2 cells
+    use_names[0] = False
+    ics_tab.ICs.save_cb(tab)
+    assert not os.path.exists(sidecar_file(fname))
+    xyzt, errors = ics_tab.read_cells_csv(fname, cell_types)
+    assert errors == [] and np.array_equal(xyzt, tab.csv_array)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import numpy as np
+from scipy import io
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+from pyMCDS import pyMCDS, graphfile_csr_parser, graphfile_parser, matfile_v4_parser, voxel_ijk_parser
+
+
+def voxel_ijk_loop(ar_mnp_coordinate, lar_mnp_axis):
+    # the per voxel np.where search voxel_ijk_parser replaces
+    lai_ijk = [[], [], []]
+    for vox_idx in range(ar_mnp_coordinate.shape[1]):
+        ar_center = ar_mnp_coordinate[:, vox_idx]
+        for i_axis in range(3):
+            lai_ijk[i_axis].append(np.where(np.abs(ar_center[i_axis] - lar_mnp_axis[i_axis]) < 1e-10)[0][0])
+    return tuple(np.array(li_ijk) for li_ijk in lai_ijk)
+
+
+def test_voxel_ijk_parser():
+    rng = np.random.default_rng(0)
+    lar_mnp_axis = [np.arange(-195., 200., 10.), np.arange(-95., 100., 10.) / 3, np.arange(5., 40., 10.)]
+    aar_grid = np.array(np.meshgrid(*lar_mnp_axis, indexing='ij')).reshape(3, -1)
+    # mat file columns in any order, and centers a few ulps off the axis values
+    ar_mnp_coordinate = aar_grid[:, rng.permutation(aar_grid.shape[1])]
+    ar_mnp_coordinate = ar_mnp_coordinate + rng.choice([-1, 0, 1], ar_mnp_coordinate.shape) * 1e-12
+    tai_ijk = voxel_ijk_parser(ar_mnp_coordinate, lar_mnp_axis)
+    for ai_index, ai_reference in zip(tai_ijk, voxel_ijk_loop(ar_mnp_coordinate, lar_mnp_axis)):
+        assert np.array_equal(ai_index, ai_reference)
+
+
+def test_substrate_scatter(output_path):
+    mcds = pyMCDS('output00000001.xml', output_path, graph=False, verbose=False)
+    me_data = io.loadmat(os.path.join(output_path, 'output00000001_microenvironment0.mat'))['multiscale_microenvironment']
+    ai_i, ai_j, ai_k = voxel_ijk_loop(mcds.data['mesh']['mnp_coordinate'], mcds.data['mesh']['mnp_axis'])
+    for i_s, s_substrate in enumerate(['oxygen', 'drug']):
+        aar_conc = np.zeros(mcds.data['mesh']['mnp_grid'][0].shape)
+        aar_conc[ai_j, ai_i, ai_k] = me_data[4+i_s, :]
+        assert np.array_equal(mcds.get_concentration(s_substrate), aar_conc)
+
+
+def test_matfile_v4_parser(output_path):
+    s_pathfile = os.path.join(output_path, 'output00000001_cells.mat')
+    aar_cells = io.loadmat(s_pathfile)['cells']
+    assert np.array_equal(matfile_v4_parser(s_pathfile, 'cells', [0, 5, 11]), aar_cells[[0, 5, 11]])
+    assert matfile_v4_parser(s_pathfile, 'mesh', [0]) is None
+
+
+def test_columns(output_path):
+    df_full = pyMCDS('output00000001.xml', output_path, microenv=False, graph=False, verbose=False).get_cell_df()
+    df_cell = pyMCDS('output00000001.xml', output_path, microenv=False, graph=False, verbose=False, columns=['cell_type', 'total_volume']).get_cell_df()
+    # ID and position are always loaded
+    assert {'cell_type', 'total_volume', 'position_x', 'position_y', 'position_z'}.issubset(df_cell.columns)
+    assert 'current_phase' not in df_cell.columns
+    for s_column in df_cell.columns:
+        assert np.array_equal(df_cell[s_column].values, df_full[s_column].values), s_column
+
+
+def test_graphfile_csr_parser(output_path):
+    s_pathfile = os.path.join(output_path, 'output00000000_attached_cells_graph.txt')
+    dei_graph = {}
+    with open(s_pathfile) as f:
+        for s_line in f:
+            s_id, s_neighbor = s_line.split(':')
+            dei_graph[int(s_id)] = set(int(s) for s in s_neighbor.split(',') if s.strip())
+    ai_id, ai_indptr, ai_indices = graphfile_csr_parser(s_pathfile)
+    assert list(ai_id) == list(dei_graph.keys())
+    for i_row, i_id in enumerate(ai_id):
+        assert set(ai_indices[ai_indptr[i_row]:ai_indptr[i_row+1]]) == dei_graph[i_id]
+    assert dict(graphfile_parser(s_pathfile)) == dei_graph
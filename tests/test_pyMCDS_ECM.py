@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+import pyMCDS_ECM
+from pyMCDS_ECM import ecm_mesh_parser
+
+
+def ecm_centers(i_seed, r_dx=20.0):
+    # ECM voxel centers of a 2D mesh, in mat file column order (shuffled)
+    rng = np.random.default_rng(i_seed)
+    ar_x = np.arange(-490., 500., r_dx)
+    ar_y = np.arange(-290., 300., r_dx)
+    aar_grid = np.array([a.ravel() for a in np.meshgrid(ar_x, ar_y, [0.0])])
+    return aar_grid[:, rng.permutation(aar_grid.shape[1])]
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    pyMCDS_ECM.do_ecm_mesh.clear()
+    yield
+    pyMCDS_ECM.do_ecm_mesh.clear()
+
+
+def test_ecm_mesh_parser():
+    aar_center = ecm_centers(0)
+    d_ecm_mesh = ecm_mesh_parser(aar_center)
+    lar_axis = [np.unique(aar_center[i_axis, :]) for i_axis in range(3)]
+    for s_axis, ar_axis, aar_mesh in zip('xyz', lar_axis, np.meshgrid(*lar_axis)):
+        assert np.array_equal(d_ecm_mesh[f'{s_axis}_coordinates_vec'], ar_axis)
+        assert np.array_equal(d_ecm_mesh[f'{s_axis}_coordinates_mesh'], aar_mesh)
+        assert not d_ecm_mesh[f'{s_axis}_coordinates_mesh'].flags.writeable
+
+    # the per voxel np.where placement ai_flat replaces
+    ai_flat = d_ecm_mesh['ai_flat']
+    shape = d_ecm_mesh['x_coordinates_mesh'].shape
+    for i_voxel in range(aar_center.shape[1]):
+        i, j, k = [np.where(lar_axis[i_axis] == aar_center[i_axis, i_voxel])[0][0] for i_axis in range(3)]
+        assert ai_flat[i_voxel] == np.ravel_multi_index((j, i, k), shape)
+
+
+def test_ecm_mesh_registry():
+    aar_center = ecm_centers(0)
+    d_ecm_mesh = ecm_mesh_parser(aar_center)
+    assert ecm_mesh_parser(aar_center.copy()) is d_ecm_mesh
+    d_ecm_mesh_b = ecm_mesh_parser(ecm_centers(1))
+    assert ecm_mesh_parser(aar_center) is d_ecm_mesh   # now the most recently used
+    ecm_mesh_parser(ecm_centers(2, r_dx=10.0))
+    # only the two most recently used meshes are kept
+    assert len(pyMCDS_ECM.do_ecm_mesh) == pyMCDS_ECM.I_ECM_MESH_MAX == 2
+    assert ecm_mesh_parser(aar_center) is d_ecm_mesh
+    assert ecm_mesh_parser(ecm_centers(1)) is not d_ecm_mesh_b
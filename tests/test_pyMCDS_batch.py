@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+from pyMCDS import pyMCDS
+import pyMCDS_batch
+
+
+def load_frames(output_path):
+    return [pyMCDS(f'output{frame:08d}.xml', output_path, graph=False, verbose=False) for frame in range(3)]
+
+
+def test_histogram_spec_parser():
+    assert pyMCDS_batch.histogram_spec_parser('oxygen') == ('oxygen', 10, None, None)
+    assert pyMCDS_batch.histogram_spec_parser('oxygen:20') == ('oxygen', 20, None, None)
+    assert pyMCDS_batch.histogram_spec_parser('oxygen:20:0:38') == ('oxygen', 20, 0.0, 38.0)
+    for s_spec in ['oxygen:20:0', 'oxygen:a', 'oxygen:1:2:3:4']:
+        with pytest.raises(ValueError):
+            pyMCDS_batch.histogram_spec_parser(s_spec)
+
+
+def test_frame_reducer(output_path):
+    lt_row = pyMCDS_batch.frame_reducer(output_path, 'output00000001.xml', ls_count=['cell_type', 'current_phase'], ls_mean=['total_volume'],
+                                        ls_substrate=['oxygen'], lt_histogram=[('drug', 4, 0.0, 10.0)], live=True)
+    df = pd.DataFrame(lt_row, columns=pyMCDS_batch.LS_TABLE_COLUMN)
+    assert (df['frame'] == 1).all() and (df['time'] == 60.0).all()
+
+    mcds = load_frames(output_path)[1]
+    df_cell = mcds.get_cell_df()
+    df_cell = df_cell[df_cell['cycle_model'] < 100]
+    for s_variable in ['cell_type', 'current_phase']:
+        d_count = df[(df['variable'] == s_variable) & (df['statistic'] == 'count')].set_index('group')['value'].to_dict()
+        assert d_count == df_cell[s_variable].astype(int).value_counts().astype(float).to_dict()
+    d_mean = df[(df['variable'] == 'total_volume') & (df['statistic'] == 'mean')].set_index('group')['value']
+    ar_mean = df_cell.groupby(df_cell['cell_type'].astype(int))['total_volume'].mean()
+    assert np.allclose(d_mean.sort_index().values, ar_mean.sort_index().values)
+
+    ar_conc = mcds.get_concentration('oxygen')
+    d_stat = df[df['variable'] == 'oxygen'].set_index('statistic')['value']
+    assert np.allclose([d_stat['min'], d_stat['max'], d_stat['mean'], d_stat['total']],
+                       [ar_conc.min(), ar_conc.max(), ar_conc.mean(), ar_conc.sum() * mcds.get_voxel_volume()])
+
+    # voxels beyond the explicit edges are not counted
+    df_hist = df[df['statistic'] == 'histogram'].sort_values('group')
+    ai_count, _ = np.histogram(mcds.get_concentration('drug').ravel(), bins=np.linspace(0, 10, 5))
+    assert np.array_equal(df_hist['value'].values, ai_count)
+    assert df_hist['value'].sum() < ar_conc.size
+
+
+def test_batch_reducer_histogram_edges(output_path):
+    df = pyMCDS_batch.batch_reducer([output_path], ls_histogram=['oxygen:5'], workers=1, verbose=False)
+    l_mcds = load_frames(output_path)
+    r_lo = min(mcds.get_concentration('oxygen').min() for mcds in l_mcds)
+    r_hi = max(mcds.get_concentration('oxygen').max() for mcds in l_mcds)
+    assert np.isclose(df['bin_lo'].min(), r_lo) and np.isclose(df['bin_hi'].max(), r_hi)
+    # the edges span all frames, so every frame counts all its voxels
+    for i_frame, df_frame in df.groupby('frame'):
+        assert df_frame['value'].sum() == l_mcds[i_frame].get_concentration('oxygen').size
+        assert len(df_frame) == 5
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+from pyMCDS import pyMCDS
+import pyMCDS_states
+
+
+def load_frames(output_path):
+    return [pyMCDS(f'output{frame:08d}.xml', output_path, graph=False, verbose=False) for frame in range(3)]
+
+
+def read_states(output_path, frame):
+    # {cell ID: state}, the reference for the state index
+    df = pd.read_csv(os.path.join(output_path, f'output{frame:08d}_boolean_intracellular.csv'), dtype=str, keep_default_na=False)
+    return dict(zip(df['ID'].astype(int), df['state']))
+
+
+def test_states_get_counts(output_path):
+    si = pyMCDS_states.pyMCDS_states(output_path)
+    assert si.update() == [0, 1, 2]
+    l_df = [mcds.get_cell_df() for mcds in load_frames(output_path)]
+    for i_cell_type in range(3):
+        aai_count, ls_state = si.get_counts(i_cell_type)
+        for i_frame, df_cell in enumerate(l_df):
+            d_state = read_states(output_path, i_frame)
+            ls_type_state = [d_state[i_id] for i_id in df_cell.index[df_cell['cell_type'] == i_cell_type].astype(int) if i_id in d_state]
+            assert list(aai_count[i_frame]) == [ls_type_state.count(s_state) for s_state in ls_state]
+
+
+def test_states_get_frame_scalar(output_path):
+    si = pyMCDS_states.pyMCDS_states(output_path)
+    si.update()
+    df_cell = load_frames(output_path)[2].get_cell_df()
+    d_state = read_states(output_path, 2)
+    ai_id = df_cell.index.astype(int).values[::-1]   # plot order differs from the state file order
+    ai_type = df_cell['cell_type'].astype(int).values[::-1]
+    ai_scalar = si.get_frame_scalar(2, ai_id, 1, 'B')
+    for i_id, i_type, i_scalar in zip(ai_id, ai_type, ai_scalar):
+        if (i_type != 1) or (i_id not in d_state):
+            assert i_scalar == 9
+        else:
+            assert i_scalar == (2 if 'B' in d_state[i_id].split(' -- ') else 0)
+    assert (si.get_frame_scalar(7, ai_id, 1, 'B') == 9).all()
+
+
+def test_get_stateindex_partial(output_path):
+    si = pyMCDS_states.get_stateindex(output_path, 0)
+    assert pyMCDS_states.get_stateindex(output_path) is si
+    assert si.get_frames() == [0, 1, 2]
+
+    # a frame still being written is skipped, and its stored version kept
+    s_pathfile = pyMCDS_states.statefile_pathfile(output_path, 2)
+    d_frame = si.dd_frame[2]
+    with open(s_pathfile, 'w') as f:
+        pass
+    assert pyMCDS_states.get_stateindex(output_path, 2) is si
+    assert si.dd_frame[2] is d_frame
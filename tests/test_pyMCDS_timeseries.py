@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin'))
+from conftest import write_frame
+from pyMCDS import pyMCDS
+import pyMCDS_timeseries
+
+
+def load_frames(output_path):
+    return [pyMCDS(f'output{frame:08d}.xml', output_path, graph=False, verbose=False) for frame in range(3)]
+
+
+def test_timeseries_get_counts(output_path):
+    ts = pyMCDS_timeseries.pyMCDS_timeseries(output_path)
+    ts.update()
+    assert ts.get_xmlfiles() == [f'output{frame:08d}.xml' for frame in range(3)]
+    assert list(ts.get_times()) == [0.0, 60.0, 120.0]
+
+    l_df = [mcds.get_cell_df() for mcds in load_frames(output_path)]
+    li_value = [14, 0, 1, 7]
+    aai_count = ts.get_counts('current_phase', li_value, celltype_filter=[0, 2], r_cycle_model_max=100)
+    for i_frame, df_cell in enumerate(l_df):
+        df_cell = df_cell[df_cell['cell_type'].isin([0, 2]) & (df_cell['cycle_model'] < 100)]
+        assert list(aai_count[i_frame]) == [int((df_cell['current_phase'] == i_value).sum()) for i_value in li_value]
+    aai_count = ts.get_counts('cell_type', [0, 1, 2])
+    assert list(aai_count.sum(axis=1)) == [len(df_cell) for df_cell in l_df]
+
+
+def test_timeseries_update(output_path):
+    ts = pyMCDS_timeseries.get_timeseries(output_path)
+    assert pyMCDS_timeseries.get_timeseries(output_path) is ts
+    assert len(ts.get_xmlfiles()) == 3
+
+    # a new frame is loaded, a deleted one is dropped, the others are kept
+    write_frame(output_path, 3, 70, np.random.default_rng(3))
+    os.remove(os.path.join(output_path, 'output00000000.xml'))
+    assert ts.update() == ['output00000003.xml']
+    assert ts.get_xmlfiles() == [f'output{frame:08d}.xml' for frame in range(1, 4)]
+    assert list(ts.get_counts('cell_type', [0, 1, 2]).sum(axis=1)) == [50, 60, 70]